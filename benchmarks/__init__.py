@@ -0,0 +1,9 @@
+"""
+Standalone benchmarks, run from the project root, e.g.:
+
+    python -m benchmarks.search --rows 1000000
+
+Every benchmark works on a throwaway test database, so the development
+database is never touched. The exception is benchmarks.load, which
+sends HTTP requests to an already running server.
+"""
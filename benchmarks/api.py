@@ -0,0 +1,305 @@
+"""
+Latency, queries and memory of the API hot paths, in-process through the
+DRF test client on a dataset generated by seed_library:
+
+    python -m benchmarks.api --borrowings 100000 --output after.json
+    python -m benchmarks.api --borrowings 100000 --compare before.json
+
+Every scenario records p50/p95 latency, queries per request and the peak
+of memory allocated during a request (tracemalloc, measured in separate
+requests because tracing slows everything down). Results are written as
+JSON, --compare prints the change against an earlier run.
+"""
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from benchmarks.utils import percentiles, setup_django, test_database
+
+BORROWING_FILTERS = [
+    {},
+    {"is_active": "true"},
+    {"is_active": "false"},
+    {"user_id": None},
+    {"is_active": "true", "user_id": None},
+    {"is_active": "false", "user_id": None},
+]
+
+
+class Context:
+    """Clients and objects shared by the scenarios"""
+
+    def __init__(self):
+        from rest_framework.test import APIClient
+
+        from book.models import Book
+        from user.models import Customer
+        from user.serializers import CustomerTokenObtainPairSerializer
+
+        self.admin = Customer.objects.create_superuser(
+            email="benchmark-admin@example.com", password="pass1234"
+        )
+        # generated customers are ordered by activity, the first borrows most
+        self.customer = Customer.objects.filter(is_staff=False).order_by("id").first()
+        self.book = Book.objects.order_by("id").first()
+
+        self.anonymous = APIClient()
+        self.admin_client = APIClient()
+        self.customer_client = APIClient()
+        for client, user in (
+            (self.admin_client, self.admin),
+            (self.customer_client, self.customer),
+        ):
+            token = CustomerTokenObtainPairSerializer.get_token(user)
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {token.access_token}")
+        self.refresh = str(CustomerTokenObtainPairSerializer.get_token(self.customer))
+
+
+def get(client, url, params=None):
+    return lambda: client.get(url, params or {})
+
+
+def post(client, url, data):
+    return lambda: client.post(url, data, format="json")
+
+
+def book_scenarios(context: Context, count: int) -> dict:
+    from django.urls import reverse
+
+    url = reverse("book:book-list")
+    detail_url = reverse("book:book-detail", args=[context.book.id])
+    return {
+        "book_list": [get(context.anonymous, url)] * count,
+        "book_list_search": [get(context.anonymous, url, {"q": "war pea"})] * count,
+        "book_list_cursor": [get(context.anonymous, url, {"pagination": "cursor"})]
+        * count,
+        "book_retrieve": [get(context.anonymous, detail_url)] * count,
+    }
+
+
+def borrowing_scenarios(context: Context, count: int) -> dict:
+    from django.urls import reverse
+
+    from book.models import Book
+    from borrowing.models import Borrowing
+
+    url = reverse("borrowing:borrowing-list")
+    scenarios = {}
+    for filters in BORROWING_FILTERS:
+        params = {
+            name: context.customer.id if value is None else value
+            for name, value in filters.items()
+        }
+        name = "_".join(["borrowing_list_admin", *filters]) or "borrowing_list_admin"
+        scenarios[name] = [get(context.admin_client, url, params)] * count
+    scenarios["borrowing_list_customer"] = [get(context.customer_client, url)] * count
+    scenarios["borrowing_list_customer_is_active"] = [
+        get(context.customer_client, url, {"is_active": "true"})
+    ] * count
+
+    Book.objects.filter(id=context.book.id).update(inventory=count * 2)
+    today = datetime.date.today().isoformat()
+    scenarios["borrowing_create"] = [
+        post(
+            context.customer_client,
+            url,
+            {
+                "book": context.book.id,
+                "borrow_date": today,
+                "expected_return_date": today,
+            },
+        )
+    ] * count
+
+    # one active borrowing per return request
+    borrowings = Borrowing.objects.bulk_create(
+        Borrowing(
+            borrow_date=today,
+            expected_return_date=today,
+            book=context.book,
+            user=context.customer,
+        )
+        for _ in range(count)
+    )
+    scenarios["borrowing_return"] = [
+        post(
+            context.customer_client,
+            reverse("borrowing:borrowing-return", args=[borrowing.id]),
+            {"actual_return_date": today},
+        )
+        for borrowing in borrowings
+    ]
+
+    return scenarios
+
+
+def user_scenarios(context: Context, count: int) -> dict:
+    from django.urls import reverse
+
+    credentials = {"email": context.customer.email, "password": "pass1234"}
+    return {
+        "token_obtain": [
+            post(context.anonymous, reverse("user:token_obtain_pair"), credentials)
+        ]
+        * count,
+        "token_refresh": [
+            post(
+                context.anonymous,
+                reverse("user:token_refresh"),
+                {"refresh": context.refresh},
+            )
+        ]
+        * count,
+        "user_register": [
+            post(
+                context.anonymous,
+                reverse("user:register"),
+                {"email": f"benchmark{number}@example.com", "password": "pass1234"},
+            )
+            for number in range(count)
+        ],
+        "user_me": [get(context.customer_client, reverse("user:manage"))] * count,
+    }
+
+
+def run_scenario(requests: list, repeat: int, warmup: int, memory: int) -> dict:
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    # throttling history lives in the cache
+    cache.clear()
+    for request in requests[:warmup]:
+        request()
+
+    timings, queries, statuses = [], [], set()
+    for request in requests[warmup : warmup + repeat]:
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = request()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured))
+        statuses.add(response.status_code)
+
+    peaks = []
+    tracemalloc.start()
+    for request in requests[warmup + repeat : warmup + repeat + memory]:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        request()
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    latency = percentiles(timings)
+    return {
+        "p50_ms": round(latency["p50"], 3),
+        "p95_ms": round(latency["p95"], 3),
+        "queries": statistics.median(queries),
+        "max_queries": max(queries),
+        "peak_memory_kb": round(statistics.median(peaks) / 1024, 1) if peaks else None,
+        "statuses": sorted(statuses),
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, previous: dict) -> None:
+    print(
+        f"\n{'scenario':<42}{'p50 before':>12}{'after':>10}{'change':>9}{'queries':>10}"
+    )
+    for name, result in results.items():
+        before = previous.get(name)
+        if before is None:
+            continue
+        change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+        queries = f"{before['queries']:g}->{result['queries']:g}"
+        print(
+            f"{name:<42}{before['p50_ms']:>12.2f}{result['p50_ms']:>10.2f}"
+            f"{change:>8.0f}%{queries:>10}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--borrowings", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--memory", type=int, default=5, help="traced requests")
+    parser.add_argument("--only", help="run scenarios whose name contains this")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", help="JSON of an earlier run")
+    args = parser.parse_args()
+
+    setup_django()
+
+    import django
+    from django.core.management import call_command
+
+    count = args.warmup + args.repeat + args.memory
+    results = {}
+    with test_database():
+        call_command(
+            "seed_library",
+            customers=args.customers,
+            books=args.books,
+            borrowings=args.borrowings,
+        )
+        context = Context()
+
+        print(f"{'scenario':<42}{'p50':>9}{'p95':>9}{'queries':>9}{'peak KB':>10}")
+        for scenarios in (book_scenarios, borrowing_scenarios, user_scenarios):
+            for name, requests in scenarios(context, count).items():
+                if args.only and args.only not in name:
+                    continue
+                result = run_scenario(requests, args.repeat, args.warmup, args.memory)
+                results[name] = result
+                print(
+                    f"{name:<42}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                    f"{result['queries']:>9g}{result['peak_memory_kb']:>10}"
+                )
+
+    report = {
+        "meta": {
+            "commit": get_commit(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "dataset": {
+                "customers": args.customers,
+                "books": args.books,
+                "borrowings": args.borrowings,
+            },
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file)["results"])
+
+
+if __name__ == "__main__":
+    main()
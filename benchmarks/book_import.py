@@ -0,0 +1,47 @@
+"""Throughput of the bulk book import (rows per second), new and existing books"""
+import argparse
+import tempfile
+import time
+
+from benchmarks.utils import setup_django, test_database
+
+
+def write_csv(file, rows: int):
+    file.write(b"isbn,title,author,cover,inventory,daily_fee\n")
+    for number in range(rows):
+        cover = "Hard" if number % 2 else "Soft"
+        file.write(
+            f"978{number:010},Title {number},Author {number % 5000},"
+            f"{cover},{number % 20},{number % 100}.50\n".encode()
+        )
+    file.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from book.importer import import_books, read_rows
+
+    with test_database(), tempfile.NamedTemporaryFile(suffix=".csv") as file:
+        write_csv(file, args.rows)
+
+        # first run creates every book, second one updates them
+        for run in ("create", "update"):
+            with open(file.name, "rb") as source:
+                start = time.perf_counter()
+                result = import_books(read_rows(source, "csv"))
+                elapsed = time.perf_counter() - start
+
+            print(
+                f"{run:<8}{args.rows / elapsed:>12.0f} rows/s  "
+                f"({elapsed:.1f}s, created {result['created']}, "
+                f"updated {result['updated']}, failed {result['failed']})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Concurrent borrow throughput under the database profiles of
+library.database. Threads borrow and return books through the API, like
+the workers of a threaded server, and connections are closed (or kept)
+after every request as Django does with CONN_MAX_AGE:
+
+    python -m benchmarks.database --threads 8 --requests 100
+
+SQLite runs on a temporary file, without and with the PRAGMAs. With
+DB_ENGINE=postgresql (see .env.sample) the configured server is used,
+with a new connection per request and with the configured persistent
+connections (or pool, with DB_POOL_SIZE).
+"""
+import argparse
+import datetime
+import tempfile
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+from pathlib import Path
+
+from benchmarks.utils import percentiles, setup_django, test_database
+
+
+def get_profiles(settings_dict) -> list:
+    """(name, changes of the database settings)"""
+    from library.database import SQLITE_PRAGMAS
+
+    if settings_dict["ENGINE"] == "django.db.backends.sqlite3":
+        return [
+            ("sqlite", {"PRAGMAS": {}}),
+            ("sqlite tuned", {"PRAGMAS": SQLITE_PRAGMAS}),
+        ]
+
+    return [
+        (
+            "postgresql, connection per request",
+            {"ENGINE": "django.db.backends.postgresql", "CONN_MAX_AGE": 0},
+        ),
+        (
+            "postgresql, pooled"
+            if "POOL_OPTIONS" in settings_dict
+            else f"postgresql, CONN_MAX_AGE={settings_dict['CONN_MAX_AGE']}",
+            {},
+        ),
+    ]
+
+
+def run(threads: int, requests: int) -> dict:
+    """Borrow and return in threads, returns timings and statuses"""
+    from django.db import close_old_connections, connections
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from book.models import Book
+    from book.stats import create_stats
+    from user.models import Customer
+
+    Book.objects.bulk_create(
+        Book(
+            title=f"Title {number}",
+            author="Author",
+            cover=Book.Cover.HARD,
+            inventory=1_000_000,
+            daily_fee=Decimal("1.00"),
+        )
+        for number in range(20)
+    )
+    create_stats(Book.objects.all())
+    book_ids = list(Book.objects.values_list("id", flat=True))
+    customers = [
+        Customer.objects.create_user(email=f"bench{number}@example.com")
+        for number in range(threads)
+    ]
+    connections.close_all()
+
+    today = datetime.date.today()
+    timings, statuses = [], Counter()
+    lock = threading.Lock()
+
+    def request(client, url, data):
+        # what the request_started and request_finished signals do
+        close_old_connections()
+        start = time.perf_counter()
+        try:
+            response = client.post(url, data)
+            status = response.status_code
+        except Exception as exc:
+            response, status = None, type(exc).__name__
+        elapsed = (time.perf_counter() - start) * 1000
+        close_old_connections()
+
+        with lock:
+            timings.append(elapsed)
+            statuses[status] += 1
+
+        return response
+
+    def work(number: int):
+        client = APIClient()
+        client.force_authenticate(customers[number])
+        for index in range(requests):
+            response = request(
+                client,
+                reverse("borrowing:borrowing-list"),
+                {
+                    "book": book_ids[(number + index) % len(book_ids)],
+                    "borrow_date": today,
+                    "expected_return_date": today + datetime.timedelta(days=7),
+                },
+            )
+            if response is not None and response.status_code == 201:
+                request(
+                    client,
+                    reverse("borrowing:borrowing-return", args=[response.data["id"]]),
+                    {"actual_return_date": today},
+                )
+        connections.close_all()
+
+    workers = [threading.Thread(target=work, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    return {
+        "seconds": time.perf_counter() - start,
+        "timings": timings,
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.db import connections
+
+    # as in production: no debug toolbar, no query log
+    settings.DEBUG = False
+    settings_dict = connections["default"].settings_dict
+    original = dict(settings_dict)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if settings_dict["ENGINE"] == "django.db.backends.sqlite3":
+            # threads need a file, not the shared in-memory test database
+            settings_dict["TEST"]["NAME"] = str(Path(directory) / "benchmark.sqlite3")
+
+        print(f"{'profile':>36}{'requests/s':>12}{'p50':>8}{'p95':>8}  (ms)  statuses")
+        for name, changes in get_profiles(settings_dict):
+            settings_dict.update(original, **changes)
+            connections.close_all()
+            with test_database():
+                result = run(args.threads, args.requests)
+
+            latency = percentiles(result["timings"])
+            print(
+                f"{name:>36}"
+                f"{len(result['timings']) / result['seconds']:>12.0f}"
+                f"{latency['p50']:>8.1f}{latency['p95']:>8.1f}"
+                f"        {dict(result['statuses'])}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Load test GET endpoints over HTTP with many concurrent keep-alive
+connections, e.g. to compare the three ways of serving the catalog:
+
+    gunicorn library.wsgi -w 4 --threads 8 -b :8001            # sync WSGI
+    uvicorn library.asgi:application --workers 4 --port 8002   # ASGI
+
+    python -m benchmarks.load \\
+        http://127.0.0.1:8001/books/ \\
+        http://127.0.0.1:8002/books/ \\
+        http://127.0.0.1:8002/books/async/ \\
+        --connections 1000 --requests 50000
+
+The second URL is the sync DRF view under ASGI (runs in a thread per
+request), the third the native async view. Unlike the other benchmarks
+this one needs a running server with data. Servers are not part of
+requirements.txt, install them separately. Under ASGI a single sync
+only middleware makes Django run every request, async views included,
+through a thread: MetricsMiddleware and ReadYourWritesMiddleware run in
+either mode, but the debug_toolbar middleware is sync only, remove it
+from MIDDLEWARE first.
+Mind the throttle rates, throttled requests show up as 429 in the status
+counts.
+"""
+import argparse
+import asyncio
+import resource
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from benchmarks.utils import percentiles
+
+
+async def read_response(reader) -> int:
+    """Read one HTTP/1.1 response, returns its status code"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = dict(
+        (name.strip().lower(), value.strip())
+        for name, _, value in (line.partition(":") for line in lines[1:] if line)
+    )
+
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.read()
+
+    return status
+
+
+async def connection(url, token, remaining: list, timings: list, statuses: Counter):
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    request = (
+        f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+        + (f"Authorization: Bearer {token}\r\n" if token else "")
+        + "Accept: application/json\r\n\r\n"
+    ).encode()
+
+    reader = writer = None
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(
+                    parts.hostname, parts.port or 80
+                )
+            writer.write(request)
+            await writer.drain()
+            status = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+            statuses[type(exc).__name__] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+
+        timings.append((time.perf_counter() - start) * 1000)
+        statuses[status] += 1
+
+    if writer is not None:
+        writer.close()
+
+
+async def run(url, connections: int, requests: int, token) -> dict:
+    timings, statuses = [], Counter()
+    remaining = [requests]
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            connection(url, token, remaining, timings, statuses)
+            for _ in range(connections)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    return {
+        "rps": len(timings) / elapsed,
+        **(percentiles(timings) if timings else {"p50": 0, "p95": 0}),
+        "statuses": dict(statuses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("urls", nargs="+")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--token", help="JWT access token for /borrowings/")
+    args = parser.parse_args()
+
+    # one file descriptor per connection
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < args.connections + 100:
+        resource.setrlimit(
+            resource.RLIMIT_NOFILE, (min(hard, args.connections + 100), hard)
+        )
+
+    print(f"{'url':<45}{'req/s':>10}{'p50':>10}{'p95':>10}  (ms)  statuses")
+    for url in args.urls:
+        result = asyncio.run(run(url, args.connections, args.requests, args.token))
+        print(
+            f"{url:<45}{result['rps']:>10.0f}{result['p50']:>10.2f}"
+            f"{result['p95']:>10.2f}  {result['statuses']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
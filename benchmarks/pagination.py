@@ -0,0 +1,66 @@
+"""Compare page number and keyset pagination of /borrowings/ at deep pages"""
+import argparse
+
+from benchmarks.utils import measure, setup_django, test_database
+
+PAGES = [1, 100, 1_000, 10_000]
+PAGE_SIZE = 10
+
+
+def populate(rows: int):
+    from django.core.management import call_command
+
+    from user.models import Customer
+
+    call_command("seed_library", customers=1000, books=1000, borrowings=rows, days=8000)
+    return Customer.objects.create_superuser(email="admin@example.com", password="1")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from borrowing.models import Borrowing
+    from borrowing.views import BorrowingKeysetPagination
+
+    with test_database():
+        client = APIClient()
+        client.force_authenticate(populate(args.rows))
+        url = reverse("borrowing:borrowing-list")
+        keyset = BorrowingKeysetPagination()
+
+        print(f"{'page':>8}{'page number p50':>18}{'keyset p50':>14}  (ms)")
+        for page in PAGES:
+            # the cursor a client would hold after walking to this page
+            previous = (
+                Borrowing.objects.order_by("-borrow_date", "-id").values_list(
+                    "borrow_date", "id"
+                )[(page - 1) * PAGE_SIZE - 1]
+                if page > 1
+                else None
+            )
+            cursor = keyset.encode_cursor(list(previous)) if previous else ""
+
+            numbered = measure(
+                lambda: client.get(url, {"page": page, "page_size": PAGE_SIZE}),
+                args.repeat,
+            )
+            seek = measure(
+                lambda: client.get(
+                    url,
+                    {"pagination": "cursor", "cursor": cursor, "page_size": PAGE_SIZE},
+                ),
+                args.repeat,
+            )
+            print(f"{page:>8}{numbered['p50']:>18.2f}{seek['p50']:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compare DRF's JSONRenderer with the orjson backed FastJSONRenderer on
+pages of 100 books and 100 borrowings as the API serializes them. Only
+rendering is timed, both renderers produce the same bytes:
+
+    python -m benchmarks.renderers --repeat 1000
+"""
+import argparse
+
+from benchmarks.utils import measure, setup_django, test_database
+
+PAGE_SIZE = 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.core.management import call_command
+    from rest_framework.renderers import JSONRenderer
+
+    from book.models import Book
+    from book.serializers import BookListSerializer
+    from borrowing.models import Borrowing
+    from borrowing.serializers import BorrowingListSerializer, BorrowingSerializer
+    from library.renderers import FastJSONRenderer, orjson
+
+    if orjson is None:
+        print("orjson isn't installed, FastJSONRenderer falls back to json")
+
+    with test_database():
+        call_command(
+            "seed_library", customers=100, books=PAGE_SIZE, borrowings=1000, verbosity=0
+        )
+        books = Book.objects.select_related("stats").order_by("id")[:PAGE_SIZE]
+        borrowings = Borrowing.objects.order_by("-borrow_date", "-id").values(
+            *BorrowingListSerializer.columns
+        )[:PAGE_SIZE]
+        pages = {
+            "books": BookListSerializer(books, many=True).data,
+            "borrowings": BorrowingSerializer(list(borrowings), many=True).data,
+        }
+
+        print(f"{'page':>12}{'json p50':>12}{'orjson p50':>12}{'speedup':>10}  (ms)")
+        for name, data in pages.items():
+            json_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+            assert json_renderer.render(data) == fast_renderer.render(data)
+
+            before = measure(lambda: json_renderer.render(data), args.repeat)
+            after = measure(lambda: fast_renderer.render(data), args.repeat)
+            print(
+                f"{name:>12}{before['p50']:>12.3f}{after['p50']:>12.3f}"
+                f"{before['p50'] / after['p50']:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Compare full-text book search with icontains lookups"""
+import argparse
+
+from benchmarks.utils import measure, setup_django, test_database
+
+# words of the titles and authors generated by seed_library
+QUERIES = ["peace", "gold riv", "tolst war", "kaf", "hidden star iron"]
+
+
+def populate(rows: int) -> None:
+    from django.core.management import call_command
+
+    call_command("seed_library", books=rows, batch_size=50_000)
+
+
+def icontains(queryset, query):
+    from django.db.models import Q
+
+    for term in query.split():
+        queryset = queryset.filter(Q(title__icontains=term) | Q(author__icontains=term))
+
+    return queryset
+
+
+def first_page(queryset):
+    """Same work as the API does for page 1: COUNT(*) plus 10 rows"""
+    return queryset.count(), list(queryset[:10])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from book.models import Book
+    from book.search import search_books
+
+    with test_database():
+        populate(args.rows)
+        queryset = Book.objects.order_by("title", "author")
+
+        print(f"{'query':<20}{'fts p50':>12}{'icontains p50':>16}  (ms)")
+        for query in QUERIES:
+            fts = measure(
+                lambda: first_page(search_books(queryset, query)), args.repeat
+            )
+            scan = measure(lambda: first_page(icontains(queryset, query)), args.repeat)
+            print(f"{query:<20}{fts['p50']:>12.2f}{scan['p50']:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
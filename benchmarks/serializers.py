@@ -0,0 +1,63 @@
+"""
+Compare the two ways of rendering a page of /borrowings/: model
+instances through the nested BorrowingSerializer fields and rows of
+values() through the flat path of BorrowingListSerializer. Both fetch the
+page with a single joined query and render the same JSON:
+
+    python -m benchmarks.serializers --rows 10000
+"""
+import argparse
+
+from benchmarks.utils import measure, setup_django, test_database
+
+PAGE_SIZES = [10, 100]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.core.management import call_command
+    from rest_framework.renderers import JSONRenderer
+
+    from borrowing.models import Borrowing
+    from borrowing.serializers import BorrowingListSerializer, BorrowingSerializer
+
+    with test_database():
+        call_command(
+            "seed_library", customers=100, books=100, borrowings=args.rows, verbosity=0
+        )
+        queryset = Borrowing.objects.select_related("book", "user").order_by(
+            "-borrow_date", "-id"
+        )
+        renderer = JSONRenderer()
+
+        def instances(page_size):
+            data = BorrowingSerializer(list(queryset[:page_size]), many=True).data
+            return renderer.render(data)
+
+        def rows(page_size):
+            page = list(queryset.values(*BorrowingListSerializer.columns)[:page_size])
+            return renderer.render(BorrowingSerializer(page, many=True).data)
+
+        print(
+            f"{'page size':>10}{'instances p50':>16}{'rows p50':>12}"
+            f"{'speedup':>10}  (ms)"
+        )
+        for page_size in PAGE_SIZES:
+            assert instances(page_size) == rows(page_size)
+
+            before = measure(lambda: instances(page_size), args.repeat)
+            after = measure(lambda: rows(page_size), args.repeat)
+            print(
+                f"{page_size:>10}{before['p50']:>16.2f}{after['p50']:>12.2f}"
+                f"{before['p50'] / after['p50']:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
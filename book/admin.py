@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Book
+from .models import Book, BookStats
 
 
 admin.site.register(Book)
+admin.site.register(BookStats)
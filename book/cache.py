@@ -0,0 +1,116 @@
+"""
+Read-through cache for the public book catalog.
+
+Cached responses are keyed by version numbers kept in the cache itself:
+one for the whole catalog (used by lists), one per book and one for all
+books (both used by details). Invalidation deletes the versions, so the
+next read starts a new key space and stale entries simply expire. Only
+the Django cache API is used, so any backend works (locmem, Redis, ...).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOG_VERSION_KEY = "book:version:catalog"
+BOOK_VERSION_KEY = "book:version:{}"
+ALL_BOOKS_VERSION_KEY = "book:version:all"
+HITS_KEY = "book:cache:hits"
+MISSES_KEY = "book:cache:misses"
+
+
+def get_version(key: str) -> int:
+    return get_versions([key])[0]
+
+
+def get_versions(keys: list) -> list:
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # time based, so a new version never collides with an old one
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+
+    return [versions[key] for key in keys]
+
+
+def get_list_key(request) -> str:
+    return f"book:list:{get_version(CATALOG_VERSION_KEY)}:{get_params_hash(request)}"
+
+
+def get_detail_key(request, book_id) -> str:
+    version, all_version = get_versions(
+        [BOOK_VERSION_KEY.format(book_id), ALL_BOOKS_VERSION_KEY]
+    )
+    return f"book:detail:{book_id}:{version}:{all_version}:{get_params_hash(request)}"
+
+
+def get_params_hash(request) -> str:
+    # host is part of the key because responses contain absolute links,
+    # media type because the ETag depends on the renderer
+    params = sorted(request.query_params.lists())
+    key = f"{request.get_host()}{request.accepted_media_type}{params}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def get_response_data(key: str):
+    data = cache.get(key)
+    count(HITS_KEY if data is not None else MISSES_KEY)
+
+    return data
+
+
+def set_response_data(key: str, data) -> None:
+    cache.set(key, data, timeout=settings.BOOK_CACHE_TIMEOUT)
+
+
+def count(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_stats() -> dict:
+    stats = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = stats.get(HITS_KEY, 0), stats.get(MISSES_KEY, 0)
+
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+    }
+
+
+def invalidate_books(book_ids) -> None:
+    """
+    Drop cached lists and details of the given books, right away and once
+    more after commit, so a response built from data read before the
+    commit can't stay in the cache under the new versions
+    """
+    book_ids = list(book_ids)
+
+    def invalidate():
+        cache.delete_many(
+            [CATALOG_VERSION_KEY]
+            + [BOOK_VERSION_KEY.format(book_id) for book_id in book_ids]
+        )
+
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def invalidate_all_books() -> None:
+    """
+    Same as invalidate_books() for every book, a single delete
+    for bulk changes instead of one per book
+    """
+
+    def invalidate():
+        cache.delete_many([CATALOG_VERSION_KEY, ALL_BOOKS_VERSION_KEY])
+
+    invalidate()
+    transaction.on_commit(invalidate)
@@ -0,0 +1,277 @@
+"""
+Bulk import of books from CSV or NDJSON (one JSON object per line).
+
+Files are parsed as a stream and handled in batches: every batch is
+validated column by column, then upserted with a single statement
+keyed by isbn (existing books are updated), so memory depends on the
+batch size only. No Book instances are saved, so no signals are sent,
+the search index, stats of new books and the book cache are updated
+per batch instead.
+"""
+import codecs
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from book import cache, search, stats
+from book.models import Book
+
+FORMATS = ("csv", "ndjson")
+FIELDS = ("isbn", "title", "author", "cover", "inventory", "daily_fee")
+# isbn__in of a batch has to fit into 32766 SQLite query parameters
+MAX_PARAMS = 32766
+BATCH_SIZE = 5000
+MAX_ERRORS = 1000
+
+# values, names and labels, e.g. "1", "hard", "Hard"
+COVERS = {}
+for cover in Book.Cover:
+    for key in (str(cover.value), cover.name, cover.label):
+        COVERS[key.lower()] = cover.value
+
+
+def get_format(name: str) -> str:
+    """Format of a file by its name, csv unless it ends with .ndjson or .jsonl"""
+    return "ndjson" if name.lower().endswith((".ndjson", ".jsonl")) else "csv"
+
+
+def check_encoding(file, chunk_size: int = 1024 * 1024) -> None:
+    """
+    Raise ValueError unless the whole binary file is UTF-8, before
+    anything is imported from it, and rewind it
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    try:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise ValueError("File must be UTF-8 encoded.")
+    finally:
+        file.seek(0)
+
+
+def read_rows(file, input_format: str):
+    """Rows of a binary file as dicts, without reading it into memory"""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    if input_format == "csv":
+        yield from csv.DictReader(text)
+        return
+
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        # a broken line is reported as a row without fields
+        yield row if isinstance(row, dict) else {}
+
+
+def to_text(values, max_length: int, errors: dict, field: str) -> list:
+    result = []
+    for position, value in enumerate(values):
+        value = "" if value is None else str(value).strip()
+        if not value:
+            errors.setdefault(position, {})[field] = ["This field is required."]
+        elif len(value) > max_length:
+            errors.setdefault(position, {})[field] = [
+                f"Ensure this field has no more than {max_length} characters."
+            ]
+        result.append(value)
+
+    return result
+
+
+def to_cover(values, errors: dict) -> list:
+    result = []
+    for position, value in enumerate(values):
+        cover = COVERS.get(str(value).strip().lower())
+        if cover is None:
+            errors.setdefault(position, {})["cover"] = [
+                f"Unknown cover: {value!r}, expected one of "
+                f"{', '.join(Book.Cover.labels)}."
+            ]
+        result.append(cover)
+
+    return result
+
+
+def to_inventory(values, errors: dict) -> list:
+    result = []
+    for position, value in enumerate(values):
+        try:
+            inventory = int(str(value).strip())
+        except ValueError:
+            inventory = None
+        if inventory is None or inventory < 0:
+            errors.setdefault(position, {})["inventory"] = [
+                "Ensure this value is a non-negative integer."
+            ]
+        result.append(inventory)
+
+    return result
+
+
+def to_daily_fee(values, errors: dict) -> list:
+    field = Book._meta.get_field("daily_fee")
+    limit = Decimal(10) ** (field.max_digits - field.decimal_places)
+    exponent = Decimal(10) ** -field.decimal_places
+
+    result = []
+    for position, value in enumerate(values):
+        try:
+            fee = Decimal(str(value).strip())
+            valid = (
+                fee.is_finite() and 0 <= fee < limit and fee == fee.quantize(exponent)
+            )
+        except InvalidOperation:
+            fee, valid = None, False
+        if not valid:
+            errors.setdefault(position, {})["daily_fee"] = [
+                "Ensure this value is a non-negative number "
+                f"with at most {field.decimal_places} decimal places."
+            ]
+        result.append(fee)
+
+    return result
+
+
+def validate_batch(rows: list):
+    """
+    Books (tuples of FIELDS values) from the valid rows and
+    {position: {field: [errors]}} for the rest,
+    each check runs over a whole column of the batch
+    """
+    columns = {field: [row.get(field) for row in rows] for field in FIELDS}
+    errors = {}
+    isbn_length = Book._meta.get_field("isbn").max_length
+
+    values = zip(
+        to_text(columns["isbn"], isbn_length, errors, "isbn"),
+        to_text(columns["title"], 255, errors, "title"),
+        to_text(columns["author"], 255, errors, "author"),
+        to_cover(columns["cover"], errors),
+        to_inventory(columns["inventory"], errors),
+        to_daily_fee(columns["daily_fee"], errors),
+    )
+
+    books = {}
+    for position, book in enumerate(values):
+        if position in errors:
+            continue
+        # the last row of an isbn wins, like it would with one row per upsert
+        books.pop(book[0], None)
+        books[book[0]] = book
+
+    return list(books.values()), errors
+
+
+def save_batch(books: list) -> int:
+    """
+    Upsert books (tuples of FIELDS values) by isbn,
+    returns number of books that were created
+    """
+    with transaction.atomic():
+        existing = {
+            isbn: (book_id, title, author)
+            for book_id, isbn, title, author in Book.objects.filter(
+                isbn__in=[book[0] for book in books]
+            ).values_list("id", "isbn", "title", "author")
+        }
+        # new books get ids above the current maximum, on SQLite (the only
+        # database with a separate search index) the transaction keeps
+        # other writers out until commit
+        last_id = Book.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+        upsert(books)
+
+        search.index_rows(
+            [
+                (existing[isbn][0], title, author)
+                for isbn, title, author, *_ in books
+                if isbn in existing and existing[isbn][1:] != (title, author)
+            ]
+        )
+        search.index_new_books(Book.objects.filter(id__gt=last_id))
+        stats.create_stats(Book.objects.filter(id__gt=last_id))
+        cache.invalidate_all_books()
+
+    return len(books) - len(existing)
+
+
+def upsert(books: list) -> None:
+    fields = FIELDS + ("updated_at",)
+    updated_at = timezone.now()
+
+    if connection.vendor not in ("sqlite", "postgresql"):
+        Book.objects.bulk_create(
+            [Book(**dict(zip(fields, book + (updated_at,)))) for book in books],
+            update_conflicts=True,
+            unique_fields=["isbn"],
+            update_fields=fields[1:],
+        )
+        return
+
+    # same statement as bulk_create(update_conflicts=True), but without
+    # preparing every value through the ORM, which is several times slower
+    quote = connection.ops.quote_name
+    columns = [quote(Book._meta.get_field(field).column) for field in fields]
+    updated_at = Book._meta.get_field("updated_at").get_db_prep_save(
+        updated_at, connection
+    )
+    # multi-row statements instead of executemany(), which the SQL panel
+    # of the debug toolbar can't log (TypeError under DEBUG)
+    chunk_size = MAX_PARAMS // len(columns)
+    with connection.cursor() as cursor:
+        for start in range(0, len(books), chunk_size):
+            chunk = books[start : start + chunk_size]
+            cursor.execute(
+                f"INSERT INTO {quote(Book._meta.db_table)} ({', '.join(columns)}) "
+                "VALUES "
+                + ", ".join([f"({', '.join(['%s'] * len(columns))})"] * len(chunk))
+                + f" ON CONFLICT ({columns[0]}) DO UPDATE SET "
+                + ", ".join(f"{column} = excluded.{column}" for column in columns[1:]),
+                [value for book in chunk for value in book + (updated_at,)],
+            )
+
+
+def import_books(rows, batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Import rows (dicts with FIELDS) in batches, returns counters and
+    errors of the first MAX_ERRORS failed rows (row numbers start at 1)
+    """
+    result = {"created": 0, "updated": 0, "failed": 0, "errors": []}
+
+    def handle(batch: list, first_row: int):
+        books, errors = validate_batch(batch)
+        if books:
+            created = save_batch(books)
+            # rows repeating an isbn of the batch count as updates
+            result["created"] += created
+            result["updated"] += len(batch) - len(errors) - created
+
+        result["failed"] += len(errors)
+        for position in sorted(errors):
+            if len(result["errors"]) == MAX_ERRORS:
+                break
+            result["errors"].append(
+                {"row": first_row + position, "errors": errors[position]}
+            )
+
+    batch, first_row = [], 1
+    for number, row in enumerate(rows, start=1):
+        batch.append(row)
+        if len(batch) == batch_size:
+            handle(batch, first_row)
+            batch, first_row = [], number + 1
+
+    if batch:
+        handle(batch, first_row)
+
+    return result
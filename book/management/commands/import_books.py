@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from book.importer import (
+    BATCH_SIZE,
+    FORMATS,
+    check_encoding,
+    get_format,
+    import_books,
+    read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import books from a CSV or NDJSON file with columns isbn, title, "
+        "author, cover, inventory, daily_fee. Books are matched by isbn, "
+        "existing ones are updated"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--input",
+            choices=FORMATS,
+            help="File format, by default guessed from the file name",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["input"] or get_format(path)
+
+        try:
+            with open(path, "rb") as file:
+                try:
+                    check_encoding(file)
+                except ValueError as e:
+                    raise CommandError(e)
+
+                result = import_books(
+                    read_rows(file, input_format), batch_size=options["batch_size"]
+                )
+        except OSError as e:
+            raise CommandError(e)
+
+        for error in result["errors"]:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {result['created']}, updated {result['updated']}, "
+                f"failed {result['failed']} books"
+            )
+        )
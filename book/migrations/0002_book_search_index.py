@@ -0,0 +1,46 @@
+from django.db import migrations
+
+FTS_TABLE = "book_book_fts"
+PG_INDEX = "book_book_search_idx"
+PG_VECTOR = (
+    "to_tsvector('simple', coalesce(book_book.title, '') "
+    "|| ' ' || coalesce(book_book.author, ''))"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "title, author, tokenize = 'unicode61 remove_diacritics 2', "
+            "prefix = '2 3')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, author) "
+            "SELECT id, title, author FROM book_book"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE INDEX {PG_INDEX} ON book_book USING GIN (({PG_VECTOR}))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {PG_INDEX}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("book", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
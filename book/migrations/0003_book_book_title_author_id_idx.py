@@ -0,0 +1,18 @@
+# Generated by Django 4.2.4 on 2026-10-18 04:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("book", "0002_book_search_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["title", "author", "id"], name="book_title_author_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.4 on 2026-10-18 04:31
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("book", "0003_book_book_title_author_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="updated_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                help_text="Time of the last change (used for ETag and Last-Modified)",
+            ),
+        ),
+    ]
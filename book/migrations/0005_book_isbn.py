@@ -0,0 +1,23 @@
+# Generated by Django 4.2.4 on 2026-10-18 04:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("book", "0004_book_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="isbn",
+            field=models.CharField(
+                blank=True,
+                help_text="ISBN of the book, identifies it in imports (optional)",
+                max_length=17,
+                null=True,
+                unique=True,
+            ),
+        ),
+    ]
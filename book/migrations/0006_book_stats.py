@@ -0,0 +1,141 @@
+# Generated by Django 4.2.4 on 2026-10-18 05:17
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min, Q, Sum
+from django.utils import timezone
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def fill_book_stats(apps, schema_editor):
+    Book = apps.get_model("book", "Book")
+    BookStats = apps.get_model("book", "BookStats")
+    Borrowing = apps.get_model("borrowing", "Borrowing")
+
+    today = timezone.localdate()
+    active = Q(actual_return_date__isnull=True)
+    returned = Q(actual_return_date__isnull=False)
+    rows = (
+        Borrowing.objects.order_by()
+        .values("book_id")
+        .annotate(
+            borrowed_total=Count("id"),
+            borrowed_last_30_days=Count(
+                "id", filter=Q(borrow_date__gt=today - datetime.timedelta(days=30))
+            ),
+            borrowed_last_365_days=Count(
+                "id", filter=Q(borrow_date__gt=today - datetime.timedelta(days=365))
+            ),
+            currently_out=Count("id", filter=active),
+            next_return_date=Min("expected_return_date", filter=active),
+            returned_total=Count("id", filter=returned),
+            loan_duration=Sum(
+                F("actual_return_date") - F("borrow_date"), filter=returned
+            ),
+        )
+    )
+    stats = {}
+    for row in rows:
+        duration = row.pop("loan_duration")
+        row["loan_days_total"] = duration.days if duration else 0
+        stats[row.pop("book_id")] = row
+
+    BookStats.objects.bulk_create(
+        (
+            BookStats(book_id=book_id, **stats.get(book_id, {}))
+            for book_id in Book.objects.values_list("id", flat=True)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("book", "0005_book_isbn"),
+        ("borrowing", "0006_fines"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookStats",
+            fields=[
+                (
+                    "book",
+                    models.OneToOneField(
+                        help_text="ID of the book",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="book.book",
+                    ),
+                ),
+                (
+                    "borrowed_total",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of all borrowings of the book"
+                    ),
+                ),
+                (
+                    "borrowed_last_30_days",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Number of borrowings in the last 30 days (popularity)",
+                    ),
+                ),
+                (
+                    "borrowed_last_365_days",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of borrowings in the last 365 days"
+                    ),
+                ),
+                (
+                    "currently_out",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Number of copies that are not returned yet",
+                    ),
+                ),
+                (
+                    "next_return_date",
+                    models.DateField(
+                        blank=True,
+                        help_text="Earliest expected return date of the copies that are out",
+                        null=True,
+                    ),
+                ),
+                (
+                    "returned_total",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of returned borrowings"
+                    ),
+                ),
+                (
+                    "loan_days_total",
+                    models.PositiveBigIntegerField(
+                        default=0, help_text="Days between borrowing and return, summed"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        help_text="Time of the last change (used for ETag and Last-Modified)",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "book stats",
+                "indexes": [
+                    models.Index(
+                        fields=["-borrowed_last_30_days", "book"],
+                        name="book_stats_popularity_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_book_stats, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 
 class Book(models.Model):
@@ -29,10 +30,105 @@ class Book(models.Model):
         validators=[MinValueValidator(limit_value=0)],
         help_text="Amount of daily fee when book is borrowed (positive)",
     )
+    isbn = models.CharField(
+        max_length=17,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text="ISBN of the book, identifies it in imports (optional)",
+    )
+    updated_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        help_text="Time of the last change (used for ETag and Last-Modified)",
+    )
+
+    class Meta:
+        indexes = [
+            # ordering of the book list, used by keyset pagination
+            models.Index(
+                fields=["title", "author", "id"], name="book_title_author_id_idx"
+            ),
+        ]
 
     def __str__(self):
         return f'"{self.title}" by {self.author}'
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
+    def save(self, *args, validate=True, **kwargs):
+        """Pass validate=False only when the data has already been validated"""
+        # blank isbn would clash with other blank ones in the unique index
+        self.isbn = self.isbn or None
+        if validate:
+            self.full_clean()
+        self.updated_at = timezone.now()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "updated_at"}
         super().save(*args, **kwargs)
+
+
+class BookStats(models.Model):
+    """
+    Availability and popularity of a book, kept up to date by borrowings
+    and returns and refreshed daily by borrowing.book_stats (borrowings
+    leave the rolling windows by the passing of time alone)
+    """
+
+    # field name: days, a borrowing counts while borrow_date > today - days
+    WINDOWS = {"borrowed_last_30_days": 30, "borrowed_last_365_days": 365}
+
+    book = models.OneToOneField(
+        Book,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        help_text="ID of the book",
+    )
+    borrowed_total = models.PositiveIntegerField(
+        default=0, help_text="Number of all borrowings of the book"
+    )
+    borrowed_last_30_days = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of borrowings in the last 30 days (popularity)",
+    )
+    borrowed_last_365_days = models.PositiveIntegerField(
+        default=0, help_text="Number of borrowings in the last 365 days"
+    )
+    currently_out = models.PositiveIntegerField(
+        default=0, help_text="Number of copies that are not returned yet"
+    )
+    next_return_date = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Earliest expected return date of the copies that are out",
+    )
+    returned_total = models.PositiveIntegerField(
+        default=0, help_text="Number of returned borrowings"
+    )
+    loan_days_total = models.PositiveBigIntegerField(
+        default=0, help_text="Days between borrowing and return, summed"
+    )
+    updated_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        help_text="Time of the last change (used for ETag and Last-Modified)",
+    )
+
+    class Meta:
+        verbose_name_plural = "book stats"
+        indexes = [
+            # ?ordering=popularity of the book list
+            models.Index(
+                fields=["-borrowed_last_30_days", "book"],
+                name="book_stats_popularity_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Stats of book {self.book_id}"
+
+    @property
+    def average_loan_days(self):
+        if not self.returned_total:
+            return None
+
+        return round(self.loan_days_total / self.returned_total, 1)
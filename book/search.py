@@ -0,0 +1,152 @@
+"""
+Full-text search over book titles and authors.
+
+SQLite keeps an FTS5 table (book_book_fts) whose rowid is the book id,
+it is synced from Book post_save/post_delete signals.
+PostgreSQL uses a GIN expression index over to_tsvector(), which the
+database keeps up to date by itself.
+Other databases fall back to icontains lookups.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from book.models import Book
+
+FTS_TABLE = "book_book_fts"
+PG_INDEX = "book_book_search_idx"
+PG_VECTOR = (
+    "to_tsvector('simple', coalesce(book_book.title, '') "
+    "|| ' ' || coalesce(book_book.author, ''))"
+)
+MAX_TERMS = 10
+# rows per statement when indexing, 3 parameters each have to fit into
+# the 32766 SQLite query parameters
+CHUNK_SIZE = 10000
+
+
+def get_terms(query: str) -> list:
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def search_books(queryset, query: str):
+    """
+    Filter queryset by every term of query as a prefix of a word
+    in title or author, best matches first
+    """
+    terms = get_terms(query)
+    if not terms:
+        return queryset.none()
+
+    if connection.vendor == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        # join the FTS table so MATCH and bm25() run once per query,
+        # bm25() is negative, the lower the better
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[
+                f"{FTS_TABLE} MATCH %s",
+                f"{FTS_TABLE}.rowid = {Book._meta.db_table}.id",
+            ],
+            params=[match],
+            select={"search_rank": f"bm25({FTS_TABLE})"},
+        ).order_by("search_rank", "title", "author", "id")
+
+    if connection.vendor == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        return (
+            queryset.filter(
+                RawSQL(
+                    f"{PG_VECTOR} @@ to_tsquery('simple', %s)",
+                    [tsquery],
+                    output_field=BooleanField(),
+                )
+            )
+            .annotate(
+                search_rank=RawSQL(
+                    f"ts_rank({PG_VECTOR}, to_tsquery('simple', %s))",
+                    [tsquery],
+                    output_field=FloatField(),
+                )
+            )
+            .order_by("-search_rank", "title", "author", "id")
+        )
+
+    for term in terms:
+        queryset = queryset.filter(Q(title__icontains=term) | Q(author__icontains=term))
+
+    return queryset
+
+
+def get_chunks(rows: list) -> list:
+    return [
+        rows[start : start + CHUNK_SIZE] for start in range(0, len(rows), CHUNK_SIZE)
+    ]
+
+
+def index_books(books) -> None:
+    """Add or refresh books in the SQLite FTS table"""
+    index_rows([(book.id, book.title, book.author) for book in books])
+
+
+def index_rows(rows) -> None:
+    """Same as index_books() for (id, title, author) tuples"""
+    if connection.vendor != "sqlite":
+        return
+
+    # a statement per chunk instead of executemany(), which the SQL panel
+    # of the debug toolbar can't log (TypeError under DEBUG)
+    with connection.cursor() as cursor:
+        for chunk in get_chunks(rows):
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN "
+                f"({', '.join(['%s'] * len(chunk))})",
+                [row[0] for row in chunk],
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, author) VALUES "
+                + ", ".join(["(%s, %s, %s)"] * len(chunk)),
+                [value for row in chunk for value in row],
+            )
+
+
+def index_new_books(queryset) -> None:
+    """Add books of queryset that are not in the index yet, without loading them"""
+    if connection.vendor != "sqlite":
+        return
+
+    sql, params = queryset.values_list("id", "title", "author").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE} (rowid, title, author) {sql}", params)
+
+
+def unindex_books(book_ids) -> None:
+    """Remove books from the SQLite FTS table"""
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        for chunk in get_chunks(list(book_ids)):
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN "
+                f"({', '.join(['%s'] * len(chunk))})",
+                chunk,
+            )
+
+
+def rebuild_index() -> int:
+    """Rebuild the search index from scratch, returns number of books"""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, author) "
+                f"SELECT id, title, author FROM {Book._meta.db_table}"
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        elif connection.vendor == "postgresql":
+            cursor.execute(f"REINDEX INDEX {PG_INDEX}")
+
+    return Book.objects.count()
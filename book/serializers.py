@@ -1,6 +1,8 @@
 from rest_framework import serializers
 
-from book.models import Book
+from book.importer import FORMATS, check_encoding
+from book.models import Book, BookStats
+from library.sparse_fields import SparseFieldsSerializerMixin
 
 
 class BookSerializer(serializers.ModelSerializer):
@@ -9,17 +11,67 @@ class BookSerializer(serializers.ModelSerializer):
         fields = ["id", "title", "author", "cover", "inventory", "daily_fee"]
 
 
-class BookListSerializer(serializers.ModelSerializer):
+class BookStatsSerializer(serializers.ModelSerializer):
+    average_loan_days = serializers.FloatField(
+        read_only=True, help_text="Average days between borrowing and return"
+    )
+
+    class Meta:
+        model = BookStats
+        fields = [
+            "borrowed_total",
+            "borrowed_last_30_days",
+            "borrowed_last_365_days",
+            "currently_out",
+            "next_return_date",
+            "average_loan_days",
+        ]
+
+
+class BookListSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     cover = serializers.CharField(source="get_cover_display")
+    # null for books whose stats haven't been created yet
+    stats = BookStatsSerializer(read_only=True, default=None)
 
     class Meta:
         model = Book
-        fields = ["id", "title", "author", "cover", "inventory", "daily_fee"]
+        fields = ["id", "title", "author", "cover", "inventory", "daily_fee", "stats"]
+
+
+class BookDetailSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    cover = serializers.CharField(source="get_cover_display")
+    stats = BookStatsSerializer(read_only=True, default=None)
 
+    class Meta:
+        model = Book
+        fields = ["id", "title", "author", "cover", "inventory", "daily_fee", "stats"]
+
+
+class BookSummarySerializer(serializers.ModelSerializer):
+    """Book nested in other resources (borrowings), without stats"""
 
-class BookDetailSerializer(serializers.ModelSerializer):
     cover = serializers.CharField(source="get_cover_display")
 
     class Meta:
         model = Book
         fields = ["id", "title", "author", "cover", "inventory", "daily_fee"]
+
+
+class BookImportSerializer(serializers.Serializer):
+    file = serializers.FileField(
+        help_text="CSV or NDJSON with columns isbn, title, author, cover, "
+        "inventory, daily_fee"
+    )
+    input = serializers.ChoiceField(
+        choices=FORMATS,
+        required=False,
+        help_text="File format, by default guessed from the file name",
+    )
+
+    def validate_file(self, file):
+        try:
+            check_encoding(file)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+        return file
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from book import cache, search
+from book.models import Book, BookStats
+
+
+@receiver(post_save, sender=Book)
+def index_book(sender, instance, created, **kwargs):
+    if created:
+        BookStats.objects.create(book=instance)
+    search.index_books([instance])
+    cache.invalidate_books([instance.id])
+
+
+@receiver(post_delete, sender=Book)
+def unindex_book(sender, instance, **kwargs):
+    search.unindex_books([instance.id])
+    cache.invalidate_books([instance.id])
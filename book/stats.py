@@ -0,0 +1,31 @@
+"""
+Precomputed stats of books (BookStats), joined into book lists and
+details. Every book gets its row on creation, borrowings and returns
+change them in borrowing.book_stats.
+"""
+from book.models import BookStats
+
+POPULARITY = "popularity"
+# ends with the book id as a column of BookStats, so the ordering
+# matches book_stats_popularity_idx as a whole
+POPULARITY_ORDERING = ("-stats__borrowed_last_30_days", "stats__book_id")
+
+
+def create_stats(books) -> None:
+    """Create empty stats of the books (a queryset) that have none yet"""
+    BookStats.objects.bulk_create(
+        [
+            BookStats(book_id=book_id)
+            for book_id in books.filter(stats__isnull=True).values_list("id", flat=True)
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def order_by_popularity(queryset):
+    """
+    Most borrowed books of the last 30 days first, the inner join lets
+    the database walk book_stats_popularity_idx
+    """
+    return queryset.filter(stats__isnull=False).order_by(*POPULARITY_ORDERING)
@@ -0,0 +1,118 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from book.cache import invalidate_all_books
+from borrowing.models import Borrowing
+from ..models import Book
+
+
+class BookCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.book = Book.objects.create(
+            title="Test title",
+            author="Test author",
+            cover=Book.Cover.HARD,
+            inventory=5,
+            daily_fee=Decimal("1.00"),
+        )
+        self.list_url = reverse("book:book-list")
+        self.detail_url = reverse("book:book-detail", args=[self.book.id])
+
+    def test_list_and_detail_are_cached(self):
+        for url in (self.list_url, self.detail_url):
+            first = self.client.get(url)
+            second = self.client.get(url)
+
+            self.assertEqual(first["X-Cache"], "MISS")
+            self.assertEqual(second["X-Cache"], "HIT")
+            self.assertEqual(first.data, second.data)
+
+    def test_query_params_are_part_of_key(self):
+        self.client.get(self.list_url, {"page_size": 5})
+        response = self.client.get(self.list_url, {"page_size": 6})
+
+        self.assertEqual(response["X-Cache"], "MISS")
+
+    def test_book_save_invalidates_cache(self):
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+
+        self.book.title = "New title"
+        self.book.save()
+
+        response = self.client.get(self.list_url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"][0]["title"], "New title")
+
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["title"], "New title")
+
+    def test_other_book_detail_stays_cached(self):
+        self.client.get(self.detail_url)
+        other = Book.objects.create(
+            title="Other title",
+            author="Other author",
+            cover=Book.Cover.SOFT,
+            inventory=1,
+            daily_fee=Decimal("1.00"),
+        )
+        other.delete()
+
+        self.assertEqual(self.client.get(self.detail_url)["X-Cache"], "HIT")
+
+    def test_invalidate_all_books(self):
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+
+        invalidate_all_books()
+
+        self.assertEqual(self.client.get(self.list_url)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(self.detail_url)["X-Cache"], "MISS")
+
+    def test_borrow_and_return_invalidate_cache(self):
+        user = get_user_model().objects.create_user(
+            email="test@example.com", password="pass1234"
+        )
+        self.client.force_authenticate(user)
+        self.client.get(self.detail_url)
+
+        self.client.post(
+            reverse("borrowing:borrowing-list"),
+            {
+                "book": self.book.id,
+                "borrow_date": "2023-01-01",
+                "expected_return_date": "2023-01-02",
+            },
+        )
+        self.assertEqual(self.client.get(self.detail_url).data["inventory"], 4)
+
+        borrowing = Borrowing.objects.get()
+        self.client.post(
+            reverse("borrowing:borrowing-return", args=[borrowing.id]),
+            {"actual_return_date": "2023-01-02"},
+        )
+        self.assertEqual(self.client.get(self.detail_url).data["inventory"], 5)
+
+    def test_cache_stats(self):
+        self.client.get(self.list_url)
+        self.client.get(self.list_url)
+
+        url = reverse("book:book-cache-stats")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="pass1234"
+        )
+        self.client.force_authenticate(admin)
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["hits"], 1)
+        self.assertEqual(response.data["misses"], 1)
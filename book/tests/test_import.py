@@ -0,0 +1,231 @@
+import json
+from decimal import Decimal
+from io import BytesIO, StringIO
+from tempfile import NamedTemporaryFile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .. import importer
+from ..importer import check_encoding, import_books, read_rows
+from ..models import Book
+from ..search import search_books
+
+IMPORT_URL = reverse("book:book-import")
+
+CSV = (
+    "isbn,title,author,cover,inventory,daily_fee\n"
+    "978-0-00-000001-1,Anna Karenina,Leo Tolstoy,Hard,3,1.50\n"
+    "978-0-00-000002-2,War and Peace,Leo Tolstoy,soft,0,2\n"
+    "978-0-00-000003-3,,Nobody,Paper,-1,abc\n"
+)
+
+
+def read_csv(content: str, **kwargs) -> dict:
+    return import_books(read_rows(BytesIO(content.encode()), "csv"), **kwargs)
+
+
+class ImportBooksTests(TestCase):
+    def test_import_csv(self):
+        result = read_csv(CSV)
+
+        self.assertEqual(result["created"], 2)
+        self.assertEqual(result["updated"], 0)
+        self.assertEqual(result["failed"], 1)
+
+        book = Book.objects.get(isbn="978-0-00-000001-1")
+        self.assertEqual(book.title, "Anna Karenina")
+        self.assertEqual(book.cover, Book.Cover.HARD)
+        self.assertEqual(book.inventory, 3)
+        self.assertEqual(book.daily_fee, Decimal("1.50"))
+        self.assertEqual(
+            Book.objects.get(isbn="978-0-00-000002-2").cover, Book.Cover.SOFT
+        )
+
+    def test_import_reports_row_errors(self):
+        result = read_csv(CSV)
+
+        self.assertEqual(len(result["errors"]), 1)
+        self.assertEqual(result["errors"][0]["row"], 3)
+        self.assertEqual(
+            set(result["errors"][0]["errors"]),
+            {"title", "cover", "inventory", "daily_fee"},
+        )
+
+    def test_import_updates_books_by_isbn(self):
+        book = Book.objects.create(
+            isbn="978-0-00-000001-1",
+            title="Old title",
+            author="Old author",
+            cover=Book.Cover.SOFT,
+            inventory=1,
+            daily_fee=Decimal("1.00"),
+        )
+
+        result = read_csv(CSV)
+        book.refresh_from_db()
+
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(result["updated"], 1)
+        self.assertEqual(book.title, "Anna Karenina")
+        self.assertEqual(Book.objects.count(), 2)
+
+    def test_import_in_batches(self):
+        rows = "".join(
+            f"{number},Title {number},Author,1,1,1.00\n" for number in range(25)
+        )
+        # the last row of the same isbn wins
+        rows += "0,New title,Author,2,5,1.00\n"
+
+        result = read_csv(
+            "isbn,title,author,cover,inventory,daily_fee\n" + rows, batch_size=10
+        )
+
+        self.assertEqual(result["created"], 25)
+        self.assertEqual(result["updated"], 1)
+        self.assertEqual(Book.objects.count(), 25)
+        self.assertEqual(Book.objects.get(isbn="0").title, "New title")
+
+    def test_import_ndjson(self):
+        lines = [
+            json.dumps(
+                {
+                    "isbn": "1",
+                    "title": "Anna Karenina",
+                    "author": "Leo Tolstoy",
+                    "cover": 1,
+                    "inventory": 2,
+                    "daily_fee": "0.50",
+                }
+            ),
+            "not json",
+        ]
+
+        result = import_books(read_rows(BytesIO("\n".join(lines).encode()), "ndjson"))
+
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(result["failed"], 1)
+        self.assertEqual(result["errors"][0]["row"], 2)
+
+    def test_imported_books_are_searchable(self):
+        read_csv(CSV)
+
+        titles = [book.title for book in search_books(Book.objects.all(), "karen")]
+
+        self.assertEqual(titles, ["Anna Karenina"])
+
+    def test_upsert_in_several_statements(self):
+        # 7 parameters per row, 2 rows per statement
+        with mock.patch.object(importer, "MAX_PARAMS", 14):
+            read_csv(CSV)
+            result = read_csv(CSV.replace("Leo Tolstoy", "Lev Tolstoy"))
+
+        self.assertEqual(result["updated"], 2)
+        self.assertEqual(Book.objects.filter(author="Lev Tolstoy").count(), 2)
+        self.assertEqual(search_books(Book.objects.all(), "lev").count(), 2)
+
+    def test_check_encoding(self):
+        file = BytesIO("isbn,title\n1,Café\n".encode())
+        file.read()
+        check_encoding(file)
+        self.assertEqual(file.tell(), 0)
+
+        with self.assertRaisesMessage(ValueError, "UTF-8"):
+            check_encoding(BytesIO("isbn,title\n1,Café\n".encode("latin-1")))
+
+    def test_import_command_with_other_encoding(self):
+        with NamedTemporaryFile("wb", suffix=".csv") as file:
+            file.write(CSV.replace("Anna", "Анна").encode("cp1251"))
+            file.flush()
+
+            with self.assertRaisesMessage(CommandError, "UTF-8"):
+                call_command("import_books", file.name, stdout=StringIO())
+
+        self.assertEqual(Book.objects.count(), 0)
+
+    def test_import_command(self):
+        with NamedTemporaryFile("w", suffix=".csv") as file:
+            file.write(CSV)
+            file.flush()
+            out, err = StringIO(), StringIO()
+            call_command("import_books", file.name, stdout=out, stderr=err)
+
+        self.assertIn("Created 2, updated 0, failed 1 books", out.getvalue())
+        self.assertIn("Row 3:", err.getvalue())
+
+
+class ImportBooksViewSetTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="pass1234"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_import_books(self):
+        file = SimpleUploadedFile("books.csv", CSV.encode(), content_type="text/csv")
+        response = self.client.post(IMPORT_URL, {"file": file}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["errors"][0]["row"], 3)
+        self.assertEqual(Book.objects.count(), 2)
+
+    @override_settings(DEBUG=True)
+    def test_import_books_with_debug_toolbar(self):
+        # the toolbar records queries of requests from 127.0.0.1
+        for author in ("Leo Tolstoy", "Lev Tolstoy"):
+            file = SimpleUploadedFile(
+                "books.csv",
+                CSV.replace("Leo Tolstoy", author).encode(),
+                content_type="text/csv",
+            )
+            response = self.client.post(IMPORT_URL, {"file": file}, format="multipart")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(search_books(Book.objects.all(), "lev").count(), 2)
+
+    def test_import_books_with_other_encoding(self):
+        file = SimpleUploadedFile(
+            "books.csv",
+            CSV.replace("Anna", "Анна").encode("cp1251"),
+            content_type="text/csv",
+        )
+        response = self.client.post(IMPORT_URL, {"file": file}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["file"], ["File must be UTF-8 encoded."])
+        self.assertEqual(Book.objects.count(), 0)
+
+    def test_import_books_invalidates_cache(self):
+        self.client.get(reverse("book:book-list"))
+
+        file = SimpleUploadedFile("books.csv", CSV.encode(), content_type="text/csv")
+        self.client.post(IMPORT_URL, {"file": file}, format="multipart")
+        response = self.client.get(reverse("book:book-list"))
+
+        self.assertEqual(response.data["count"], 2)
+
+    def test_import_books_without_file(self):
+        response = self.client.post(IMPORT_URL, {}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_books_for_user(self):
+        user = get_user_model().objects.create_user(
+            email="test@example.com", password="pass1234"
+        )
+        self.client.force_authenticate(user)
+
+        file = SimpleUploadedFile("books.csv", CSV.encode(), content_type="text/csv")
+        response = self.client.post(IMPORT_URL, {"file": file}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Book.objects.count(), 0)
@@ -0,0 +1,118 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from library.tests.query_budget import QueryBudgetTestMixin
+
+from ..models import Book
+from ..search import rebuild_index
+from ..stats import create_stats
+from ..views import BookViewSet
+
+BOOK_URL = reverse("book:book-list")
+
+
+def detail_url(book_id):
+    return reverse("book:book-detail", args=[book_id])
+
+
+class BookQueryBudgetTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        Book.objects.bulk_create(
+            Book(
+                title=f"Title {number}",
+                author=f"Author {number}",
+                cover=Book.Cover.HARD,
+                inventory=1,
+                daily_fee=Decimal("1.00"),
+            )
+            for number in range(100)
+        )
+        rebuild_index()
+        self.book = Book.objects.first()
+
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="pass1234"
+        )
+        self.client.force_authenticate(self.user)
+
+    def get_page(self, **params):
+        def get(page_size):
+            response = self.client.get(BOOK_URL, {**params, "page_size": page_size})
+            self.assertEqual(len(response.data["results"]), page_size)
+
+        return get
+
+    def test_list(self):
+        self.assertConstantQueries(BookViewSet, "list", self.get_page())
+
+    def test_list_search(self):
+        self.assertConstantQueries(BookViewSet, "list", self.get_page(q="title"))
+
+    def test_list_keyset_pagination(self):
+        self.assertConstantQueries(
+            BookViewSet, "list", self.get_page(pagination="cursor")
+        )
+
+    def test_list_by_popularity(self):
+        create_stats(Book.objects.all())
+        self.assertConstantQueries(
+            BookViewSet, "list", self.get_page(ordering="popularity")
+        )
+        self.assertConstantQueries(
+            BookViewSet,
+            "list",
+            self.get_page(ordering="popularity", pagination="cursor"),
+        )
+
+    def test_retrieve(self):
+        self.assertWithinQueryBudget(
+            BookViewSet, "retrieve", lambda: self.client.get(detail_url(self.book.id))
+        )
+
+    def test_create(self):
+        payload = {
+            "title": "New title",
+            "author": "New author",
+            "cover": Book.Cover.SOFT,
+            "inventory": 1,
+            "daily_fee": "1.00",
+        }
+        self.assertWithinQueryBudget(
+            BookViewSet, "create", lambda: self.client.post(BOOK_URL, payload)
+        )
+
+    def test_update(self):
+        payload = {
+            "title": "New title",
+            "author": "New author",
+            "cover": Book.Cover.SOFT,
+            "inventory": 1,
+            "daily_fee": "1.00",
+        }
+        self.assertWithinQueryBudget(
+            BookViewSet,
+            "update",
+            lambda: self.client.put(detail_url(self.book.id), payload),
+        )
+        self.assertWithinQueryBudget(
+            BookViewSet,
+            "partial_update",
+            lambda: self.client.patch(detail_url(self.book.id), {"inventory": 5}),
+        )
+
+    def test_destroy(self):
+        self.assertWithinQueryBudget(
+            BookViewSet, "destroy", lambda: self.client.delete(detail_url(self.book.id))
+        )
+
+    def test_cache_stats(self):
+        self.assertWithinQueryBudget(
+            BookViewSet,
+            "cache_stats",
+            lambda: self.client.get(reverse("book:book-cache-stats")),
+        )
@@ -8,6 +8,15 @@ from ..serializers import (
     BookDetailSerializer,
 )
 
+EMPTY_STATS = {
+    "borrowed_total": 0,
+    "borrowed_last_30_days": 0,
+    "borrowed_last_365_days": 0,
+    "currently_out": 0,
+    "next_return_date": None,
+    "average_loan_days": None,
+}
+
 
 class BookSerializerTests(TestCase):
     def test_book_serializer(self):
@@ -40,6 +49,7 @@ class BookListSerializerTests(TestCase):
 
         payload["id"] = book.id
         payload["cover"] = Book.Cover.HARD.label
+        payload["stats"] = EMPTY_STATS
 
         self.assertDictEqual(serializer.data, payload)
 
@@ -59,5 +69,6 @@ class BookDetailSerializerTests(TestCase):
 
         payload["id"] = book.id
         payload["cover"] = Book.Cover.HARD.label
+        payload["stats"] = EMPTY_STATS
 
         self.assertDictEqual(serializer.data, payload)
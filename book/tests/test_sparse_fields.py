@@ -0,0 +1,148 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from library.tests.query_budget import QueryTestMixin
+
+from ..models import Book
+from ..search import rebuild_index
+from ..stats import create_stats
+
+BOOK_URL = reverse("book:book-list")
+
+
+def detail_url(book_id):
+    return reverse("book:book-detail", args=[book_id])
+
+
+class SparseFieldsBookViewSetTests(QueryTestMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.books = Book.objects.bulk_create(
+            Book(
+                title=f"Title {number}",
+                author=f"Author {number}",
+                cover=Book.Cover.HARD,
+                inventory=number,
+                daily_fee=Decimal("1.00"),
+            )
+            for number in range(5)
+        )
+        create_stats(Book.objects.all())
+        rebuild_index()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="test@example.com", password="pass1234"
+            )
+        )
+
+    def test_list_fields(self):
+        full, full_queries = self.getWithQueries(BOOK_URL)
+        sparse, sparse_queries = self.getWithQueries(
+            BOOK_URL, {"fields": "id,title,inventory"}
+        )
+
+        self.assertEqual(
+            sparse.data["results"][0],
+            {"id": self.books[0].id, "title": "Title 0", "inventory": 0},
+        )
+        self.assertEqual(sparse.data["count"], 5)
+        self.assertEqual(len(sparse_queries), len(full_queries))
+        # the last query loads the rows, a list counts them first
+        self.assertIn("book_bookstats", full_queries[-1])
+        self.assertNotIn("book_bookstats", sparse_queries[-1])
+        # id, title, inventory and updated_at for the ETag
+        self.assertEqual(sparse_queries.columns[-1], 4)
+        self.assertLess(sparse_queries.columns[-1], full_queries.columns[-1])
+        self.assertLess(len(sparse.content), len(full.content) / 3)
+
+    def test_list_fields_with_stats(self):
+        response, queries = self.getWithQueries(BOOK_URL, {"fields": "id,stats"})
+
+        self.assertEqual(set(response.data["results"][0]), {"id", "stats"})
+        self.assertEqual(response.data["results"][0]["stats"]["currently_out"], 0)
+        self.assertIn("book_bookstats", queries[-1])
+
+    def test_list_fields_with_keyset_pagination(self):
+        ids = []
+        params = {"fields": "id", "pagination": "cursor", "page_size": 2}
+        url = BOOK_URL
+        while url:
+            response, queries = self.getWithQueries(url, params)
+            # the cursor doesn't load title and author again
+            self.assertEqual(len(queries), 1)
+            ids += [book["id"] for book in response.data["results"]]
+            url, params = response.data["next"], None
+
+        self.assertEqual(ids, [book.id for book in self.books])
+
+    def test_list_fields_by_popularity(self):
+        params = {
+            "fields": "id",
+            "ordering": "popularity",
+            "pagination": "cursor",
+            "page_size": 2,
+        }
+        response, queries = self.getWithQueries(BOOK_URL, params)
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            response.data["results"], [{"id": book.id} for book in self.books[:2]]
+        )
+        self.assertIsNotNone(response.data["next"])
+
+    def test_list_search_fields(self):
+        response, queries = self.getWithQueries(
+            BOOK_URL, {"q": "title", "fields": "title"}
+        )
+
+        self.assertEqual(response.data["results"][0], {"title": "Title 0"})
+        # search_rank, id, title and updated_at for the ETag
+        self.assertEqual(queries.columns[-1], 4)
+
+    def test_retrieve_fields(self):
+        book = self.books[0]
+        response, queries = self.getWithQueries(
+            detail_url(book.id), {"fields": "title,cover"}
+        )
+
+        self.assertEqual(response.data, {"title": "Title 0", "cover": "Hard"})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("book_bookstats", queries[-1])
+
+    def test_conditional_get_with_fields(self):
+        url = detail_url(self.books[0].id)
+        etag = self.client.get(url)["ETag"]
+        sparse_etag = self.client.get(url, {"fields": "id"})["ETag"]
+
+        self.assertNotEqual(sparse_etag, etag)
+        response = self.client.get(
+            url, {"fields": "id"}, HTTP_IF_NONE_MATCH=sparse_etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_unknown_fields(self):
+        response = self.client.get(BOOK_URL, {"fields": "id,isbn,secret"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["fields"], "Unknown fields: isbn, secret")
+
+    def test_nothing_to_expand(self):
+        response = self.client.get(BOOK_URL, {"expand": "stats"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("expand", response.data)
+
+    def test_async_list_fields(self):
+        response = self.client.get(
+            reverse("book:book-async-list"), {"fields": "id,title"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()["results"][0], {"id": self.books[0].id, "title": "Title 0"}
+        )
@@ -1,6 +1,13 @@
+import asyncio
 from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -11,6 +18,7 @@ from ..serializers import (
     BookListSerializer,
     BookDetailSerializer,
 )
+from ..views import BookKeysetPagination, BookViewSet
 
 
 class AdminBookViewSetTests(APITestCase):
@@ -206,3 +214,319 @@ class AnonymousBookViewSetTests(APITestCase):
         response = self.client.delete(url)
 
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SearchBookViewSetTests(APITestCase):
+    def setUp(self):
+        for title, author in [
+            ("War and Peace", "Leo Tolstoy"),
+            ("Anna Karenina", "Leo Tolstoy"),
+            ("Peace Talks", "Jim Butcher"),
+        ]:
+            Book.objects.create(
+                title=title,
+                author=author,
+                cover=Book.Cover.HARD,
+                inventory=1,
+                daily_fee=Decimal("1.00"),
+            )
+        self.url = reverse("book:book-list")
+
+    def search(self, query):
+        response = self.client.get(self.url, {"q": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [book["title"] for book in response.data["results"]]
+
+    def test_search_by_title_and_author_prefixes(self):
+        self.assertEqual(self.search("tolst pea"), ["War and Peace"])
+        self.assertEqual(self.search("Leo"), ["Anna Karenina", "War and Peace"])
+        self.assertEqual(self.search("nothing"), [])
+
+    def test_search_index_follows_updates_and_deletes(self):
+        book = Book.objects.get(title="Peace Talks")
+        book.title = "Skin Game"
+        book.save()
+
+        self.assertEqual(self.search("peace"), ["War and Peace"])
+        self.assertEqual(self.search("skin"), ["Skin Game"])
+
+        book.delete()
+
+        self.assertEqual(self.search("skin"), [])
+
+    def test_search_ranks_best_match_first(self):
+        Book.objects.create(
+            title="Peace Peace Peace",
+            author="Jim Butcher",
+            cover=Book.Cover.SOFT,
+            inventory=1,
+            daily_fee=Decimal("1.00"),
+        )
+
+        self.assertEqual(self.search("peace")[0], "Peace Peace Peace")
+
+    def test_rebuild_index_command(self):
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM book_book_fts")
+
+        call_command("rebuild_book_index", stdout=StringIO())
+
+        self.assertEqual(self.search("karen"), ["Anna Karenina"])
+
+
+@override_settings(DEBUG=True)
+class DebugToolbarBookViewSetTests(APITestCase):
+    """
+    Writes under DEBUG, the debug toolbar records the queries of requests
+    from INTERNAL_IPS (the test client's 127.0.0.1)
+    """
+
+    def setUp(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_superuser(
+                email="admin@example.com", password="pass1234"
+            )
+        )
+
+    def search(self, query):
+        response = self.client.get(reverse("book:book-list"), {"q": query})
+        return [book["title"] for book in response.data["results"]]
+
+    def test_create_update_and_delete(self):
+        url = reverse("book:book-list")
+        response = self.client.post(
+            url,
+            {
+                "title": "War and Peace",
+                "author": "Leo Tolstoy",
+                "cover": Book.Cover.HARD,
+                "inventory": 1,
+                "daily_fee": "1.00",
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        url = reverse("book:book-detail", args=[response.data["id"]])
+        response = self.client.patch(url, {"title": "Anna Karenina"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.search("karen"), ["Anna Karenina"])
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.search("karen"), [])
+
+
+class KeysetPaginationBookViewSetTests(APITestCase):
+    def setUp(self):
+        for title in ["B", "A", "C", "A", "B"]:
+            Book.objects.create(
+                title=title,
+                author="Test author",
+                cover=Book.Cover.HARD,
+                inventory=1,
+                daily_fee=Decimal("1.00"),
+            )
+        self.url = reverse("book:book-list")
+
+    def test_walk_all_pages_in_list_order(self):
+        expected = list(
+            Book.objects.order_by("title", "author", "id").values_list("id", flat=True)
+        )
+
+        ids = []
+        url = self.url + "?pagination=cursor&page_size=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+
+            ids += [book["id"] for book in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertEqual(ids, expected)
+
+    def test_page_without_count_query(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url, {"pagination": "cursor"})
+
+        self.assertFalse(
+            any("COUNT(" in query["sql"] for query in context.captured_queries)
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor(self):
+        paginator = BookKeysetPagination()
+        for values in [
+            ["A", "Test author", "x"],
+            ["A", "Test author", {"id": 1}],
+            ["A", None, 1],
+            [None, None, None],
+        ]:
+            with self.subTest(values=values):
+                response = self.client.get(
+                    self.url, {"cursor": paginator.encode_cursor(values)}
+                )
+
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+                self.assertEqual(response.data["detail"], "Invalid cursor")
+
+    def test_cursor_with_numbers_as_strings(self):
+        first = Book.objects.order_by("title", "author", "id").first()
+        cursor = BookKeysetPagination().encode_cursor(
+            [first.title, first.author, str(first.id)]
+        )
+        response = self.client.get(self.url, {"cursor": cursor})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 4)
+
+    def test_search_with_cursor(self):
+        response = self.client.get(self.url, {"q": "b", "pagination": "cursor"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("q", response.data)
+
+
+class ConditionalGetBookViewSetTests(APITestCase):
+    def setUp(self):
+        self.book = Book.objects.create(
+            title="Test title",
+            author="Test author",
+            cover=Book.Cover.HARD,
+            inventory=1,
+            daily_fee=Decimal("1.00"),
+        )
+
+    def test_retrieve_if_none_match(self):
+        url = reverse("book:book-detail", args=[self.book.pk])
+        response = self.client.get(url)
+
+        self.assertIn("Last-Modified", response)
+        etag = response["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+        self.book.inventory = 2
+        self.book.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_retrieve_if_modified_since(self):
+        url = reverse("book:book-detail", args=[self.book.pk])
+        last_modified = self.client.get(url)["Last-Modified"]
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_etag_follows_create_and_delete(self):
+        url = reverse("book:book-list")
+        etag = self.client.get(url)["ETag"]
+
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+
+        other = Book.objects.create(
+            title="Other title",
+            author="Other author",
+            cover=Book.Cover.SOFT,
+            inventory=1,
+            daily_fee=Decimal("1.00"),
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        other.delete()
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+
+
+class AsyncBookViewTests(APITestCase):
+    def setUp(self):
+        for number in range(15):
+            Book.objects.create(
+                title=f"Test title {number}",
+                author="Test author",
+                cover=Book.Cover.HARD,
+                inventory=1,
+                daily_fee=Decimal("10.00"),
+            )
+        self.book = Book.objects.get(title="Test title 1")
+
+    def test_list_matches_sync_list(self):
+        for params in ({}, {"page": 2}, {"page_size": 3, "page": "last"}, {"q": "1"}):
+            response = self.client.get(reverse("book:book-list"), params)
+            async_response = self.client.get(reverse("book:book-async-list"), params)
+
+            self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+            self.assertEqual(async_response.json()["count"], response.data["count"])
+            self.assertEqual(async_response.json()["results"], response.data["results"])
+
+    def test_list_links_point_to_async_view(self):
+        url = reverse("book:book-async-list")
+        response = self.client.get(url, {"page": 2})
+
+        self.assertEqual(response.json()["previous"], f"http://testserver{url}")
+        self.assertIsNone(response.json()["next"])
+
+    def test_list_invalid_page(self):
+        response = self.client.get(reverse("book:book-async-list"), {"page": 3})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_book(self):
+        url = reverse("book:book-async-detail", args=[self.book.id])
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), BookDetailSerializer(self.book).data)
+
+    def test_list_with_admin_token(self):
+        get_user_model().objects.create_superuser(
+            email="admin@example.com", password="pass1234"
+        )
+        access = self.client.post(
+            reverse("user:token_obtain_pair"),
+            {"email": "admin@example.com", "password": "pass1234"},
+        ).data["access"]
+
+        # the claims of admins are checked against the database
+        response = self.client.get(
+            reverse("book:book-async-list"), HTTP_AUTHORIZATION=f"Bearer {access}"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_initial_off_event_loop(self):
+        loops = []
+
+        def check_throttles(viewset, request):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+
+        with mock.patch.object(BookViewSet, "check_throttles", check_throttles):
+            self.client.get(reverse("book:book-async-list"))
+
+        self.assertEqual(loops, [None])
+
+    def test_retrieve_missing_book(self):
+        for pk in (0, "abc"):
+            url = reverse("book:book-async-detail", args=[pk])
+            response = self.client.get(url)
+
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
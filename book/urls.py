@@ -1,10 +1,15 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from book.views import BookViewSet
+from book.views import BookAsyncView, BookViewSet
 
 app_name = "book"
 
 router = DefaultRouter()
 router.register("", BookViewSet)
 
-urlpatterns = router.urls
+urlpatterns = [
+    # before the router, its detail route would match "async"
+    path("async/", BookAsyncView.as_view(), name="book-async-list"),
+    path("async/<pk>/", BookAsyncView.as_view(), name="book-async-detail"),
+] + router.urls
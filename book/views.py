@@ -1,30 +1,95 @@
-from drf_spectacular.utils import extend_schema_view, extend_schema
+from django.utils.http import parse_http_date
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (
+    extend_schema_view,
+    extend_schema,
+    OpenApiParameter,
+)
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
 
+from book import cache, stats
+from book.importer import get_format, import_books, read_rows
 from book.models import Book
 from book.permissions import IsAdminOrReadOnly
+from book.search import search_books
 from book.serializers import (
     BookSerializer,
     BookListSerializer,
     BookDetailSerializer,
+    BookImportSerializer,
 )
+from library.async_views import AsyncReadOnlyView
+from library.conditional import ConditionalGetMixin
+from library.metrics import SerializerTimingMixin
+from library.pagination import KeysetPagination, KeysetPaginationMixin
+from library.replicas import ReplicaReadsMixin, read_from_primary
+from library.sparse_fields import SparseFieldsMixin
 
 
 class BookPagination(PageNumberPagination):
     page_size = 10
     max_page_size = 100
+    page_size_query_param = "page_size"
+
+
+class BookKeysetPagination(KeysetPagination):
+    page_size = 10
+    max_page_size = 100
+    ordering = ("title", "author", "id")
+
+
+class BookPopularityKeysetPagination(BookKeysetPagination):
+    ordering = stats.POPULARITY_ORDERING
+
+
+FIELDS_PARAMETER = OpenApiParameter(
+    "fields",
+    type=OpenApiTypes.STR,
+    description="Comma separated fields to return, all by default "
+    "(ex. ?fields=id,title,inventory)",
+)
 
 
 @extend_schema_view(
     list=extend_schema(
         summary="List all books",
         description="Get a paginated list of all books",
+        parameters=[
+            OpenApiParameter(
+                "q",
+                type=OpenApiTypes.STR,
+                description="Search by prefixes of words in title or author, "
+                "best matches first (ex. ?q=tolst war)",
+            ),
+            OpenApiParameter(
+                "ordering",
+                type=OpenApiTypes.STR,
+                enum=[stats.POPULARITY],
+                description="Most borrowed books of the last 30 days first "
+                "(ex. ?ordering=popularity), by title by default",
+            ),
+            OpenApiParameter(
+                "pagination",
+                type=OpenApiTypes.STR,
+                enum=["cursor"],
+                description="Use keyset pagination: no total count, follow "
+                "the next link to get the following page (ex. ?pagination=cursor), "
+                "not available with ?q=",
+            ),
+            FIELDS_PARAMETER,
+        ],
     ),
     create=extend_schema(summary="Create a new book", description="Create a new book"),
     retrieve=extend_schema(
         summary="Retrieve a book",
         description="Get detailed information about a book",
+        parameters=[FIELDS_PARAMETER],
     ),
     update=extend_schema(summary="Update a book", description="Update a book"),
     partial_update=extend_schema(
@@ -32,17 +97,161 @@ class BookPagination(PageNumberPagination):
         description="Update one or more fields of a book",
     ),
     destroy=extend_schema(summary="Delete a book", description="Delete a book"),
+    import_books=extend_schema(
+        summary="Import books",
+        description="Create or update books from a CSV or NDJSON file, "
+        "books are matched by isbn. Returns counters and errors of invalid "
+        "rows (for admins only)",
+    ),
+    cache_stats=extend_schema(
+        summary="Book cache statistics",
+        description="Hits and misses of the book list and detail cache "
+        "(for admins only)",
+    ),
 )
-class BookViewSet(viewsets.ModelViewSet):
-    queryset = Book.objects.order_by("title", "author")
+class BookViewSet(
+    SerializerTimingMixin,
+    ReplicaReadsMixin,
+    SparseFieldsMixin,
+    ConditionalGetMixin,
+    KeysetPaginationMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Book.objects.order_by("title", "author", "id")
     serializer_class = BookSerializer
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = BookPagination
+    # stats change with borrowings, not with the book
+    version_fields = ("updated_at", "stats.updated_at")
+    # see library.query_budget, the search index is updated by signals
+    query_budget = {
+        "list": 2,
+        "retrieve": 1,
+        "create": 4,
+        "update": 4,
+        "partial_update": 4,
+        "destroy": 5,
+        "cache_stats": 0,
+        # import_books runs a few queries per BATCH_SIZE rows, no budget
+    }
+
+    @property
+    def keyset_pagination_class(self):
+        if self.is_ordered_by_popularity():
+            return BookPopularityKeysetPagination
+
+        return BookKeysetPagination
+
+    def is_ordered_by_popularity(self) -> bool:
+        return (
+            self.action == "list"
+            and self.request.query_params.get("ordering") == stats.POPULARITY
+        )
+
+    def get_queryset(self):
+        queryset = self.queryset
+        if self.action in ("list", "retrieve"):
+            queryset = queryset.select_related("stats")
+
+        query = self.request.query_params.get("q")
+        if query and self.action == "list":
+            if isinstance(self.paginator, KeysetPagination):
+                # the keyset ordering would replace the ranking
+                raise ValidationError(
+                    {"q": "Search results can't be paginated with a cursor."}
+                )
+            queryset = search_books(queryset, query)
+
+        if self.is_ordered_by_popularity():
+            queryset = stats.order_by_popularity(queryset)
+
+        return self.get_sparse_queryset(queryset)
 
     def get_serializer_class(self):
         if self.action == "list":
             return BookListSerializer
         elif self.action == "retrieve":
             return BookDetailSerializer
+        elif self.action == "import_books":
+            return BookImportSerializer
 
         return BookSerializer
+
+    def list(self, request, *args, **kwargs):
+        key = cache.get_list_key(request)
+        return self.get_cached_response(
+            key, lambda: super(BookViewSet, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        key = cache.get_detail_key(request, self.kwargs["pk"])
+        return self.get_cached_response(
+            key, lambda: super(BookViewSet, self).retrieve(request, *args, **kwargs)
+        )
+
+    def get_cached_response(self, key, get_response):
+        """Serve response data from cache, fill the cache on miss"""
+        cached = cache.get_response_data(key)
+        if cached is not None:
+            data, etag, last_modified = cached
+            not_modified = self.get_not_modified_response(etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+
+            response = Response(data, headers={"X-Cache": "HIT"})
+            return self.set_validators(response, etag, last_modified)
+
+        # the cached copy is served until the next invalidation, it mustn't
+        # come from a lagging replica
+        with read_from_primary():
+            response = get_response()
+        if response.status_code == 200:
+            last_modified = response.get("Last-Modified")
+            cache.set_response_data(
+                key,
+                (
+                    response.data,
+                    response["ETag"],
+                    last_modified and parse_http_date(last_modified),
+                ),
+            )
+        response["X-Cache"] = "MISS"
+
+        return response
+
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="import",
+        url_name="import",
+        permission_classes=[IsAdminUser],
+        parser_classes=[MultiPartParser],
+    )
+    def import_books(self, request):
+        """Endpoint for creating or updating books from a file"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # large uploads are kept in a temporary file, not in memory
+        file = serializer.validated_data["file"]
+        input_format = serializer.validated_data.get("input") or get_format(file.name)
+        result = import_books(read_rows(file, input_format))
+
+        return Response(result)
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="cache-stats",
+        url_name="cache-stats",
+        permission_classes=[IsAdminUser],
+    )
+    def cache_stats(self, request):
+        """Endpoint for hit/miss counters of the book cache"""
+        return Response(cache.get_stats())
+
+
+class BookAsyncView(AsyncReadOnlyView):
+    """Native async list and retrieve of books, for ASGI deployments"""
+
+    viewset_class = BookViewSet
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
-from borrowing.models import Borrowing
+from borrowing.models import Borrowing, Fine
 
 admin.site.register(Borrowing)
+admin.site.register(Fine)
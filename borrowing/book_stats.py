@@ -0,0 +1,182 @@
+"""
+Availability and popularity stats of books (book.models.BookStats).
+
+Checkouts and returns change the stats of their books with F() updates
+in the same transaction as the borrowings, so book lists and details
+read them from a single joined row. Borrowings leave the rolling windows
+(BookStats.WINDOWS) by the passing of time alone: refresh() recomputes
+the books that had a borrowing age out since its previous run (the
+watermark), run it daily, e.g. with the refresh_book_stats command from
+cron. refresh(full=True) rebuilds the stats of every book, e.g. after
+borrowings were changed in the admin.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import Count, F, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from book.cache import invalidate_all_books
+from book.models import Book, BookStats
+from book.stats import create_stats
+from borrowing.models import Borrowing, Watermark
+
+WATERMARK = "book.stats"
+# BookStats fields computed by refresh()
+FIELDS = (
+    "borrowed_total",
+    *BookStats.WINDOWS,
+    "currently_out",
+    "next_return_date",
+    "returned_total",
+    "loan_days_total",
+)
+# stats of a book without borrowings
+EMPTY_STATS = {**dict.fromkeys(FIELDS, 0), "next_return_date": None}
+
+
+def get_window_start(today: datetime.date, days: int) -> datetime.date:
+    """Borrowings of a window have borrow_date after this day"""
+    return today - datetime.timedelta(days=days)
+
+
+def add_borrowings(book_id, borrowings: list) -> None:
+    """Count new borrowings of a book, (borrow_date, expected_return_date) pairs"""
+    today = timezone.localdate()
+    next_return_date = Value(min(expected for _, expected in borrowings))
+    windows = {
+        field: F(field)
+        + sum(
+            borrow_date > get_window_start(today, days) for borrow_date, _ in borrowings
+        )
+        for field, days in BookStats.WINDOWS.items()
+    }
+
+    BookStats.objects.filter(book_id=book_id).update(
+        borrowed_total=F("borrowed_total") + len(borrowings),
+        currently_out=F("currently_out") + len(borrowings),
+        # LEAST() is NULL with a NULL argument on some databases
+        next_return_date=Coalesce(
+            Least(F("next_return_date"), next_return_date), next_return_date
+        ),
+        updated_at=timezone.now(),
+        **windows,
+    )
+
+
+def remove_borrowings(book_id, loan_days: list) -> None:
+    """
+    Count returned borrowings of a book, loan_days has days between
+    borrowing and return of each of them
+    """
+    BookStats.objects.filter(book_id=book_id).update(
+        currently_out=Greatest(F("currently_out") - len(loan_days), Value(0)),
+        returned_total=F("returned_total") + len(loan_days),
+        loan_days_total=F("loan_days_total") + sum(loan_days),
+        # the returned copy may have been the next one
+        next_return_date=Subquery(
+            Borrowing.objects.filter(
+                book_id=OuterRef("book_id"), actual_return_date__isnull=True
+            )
+            .order_by()
+            .values("book_id")
+            .annotate(next_return_date=Min("expected_return_date"))
+            .values("next_return_date")
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def get_stats(borrowings, today: datetime.date) -> dict:
+    """Values of FIELDS by book id, from a queryset of borrowings"""
+    active = Q(actual_return_date__isnull=True)
+    returned = Q(actual_return_date__isnull=False)
+    rows = (
+        borrowings.order_by()
+        .values("book_id")
+        .annotate(
+            borrowed_total=Count("id"),
+            **{
+                field: Count(
+                    "id", filter=Q(borrow_date__gt=get_window_start(today, days))
+                )
+                for field, days in BookStats.WINDOWS.items()
+            },
+            currently_out=Count("id", filter=active),
+            next_return_date=Min("expected_return_date", filter=active),
+            returned_total=Count("id", filter=returned),
+            loan_duration=Sum(
+                F("actual_return_date") - F("borrow_date"), filter=returned
+            ),
+        )
+    )
+
+    stats = {}
+    for row in rows:
+        duration = row.pop("loan_duration")
+        row["loan_days_total"] = duration.days if duration else 0
+        stats[row.pop("book_id")] = row
+
+    return stats
+
+
+def refresh(today: datetime.date = None, full: bool = False) -> int:
+    """
+    Recompute stats of books whose borrowings left a window since the
+    last run (of every book if full), returns number of changed books
+    """
+    today = today or timezone.localdate()
+
+    last_run = None
+    if not full:
+        last_run = (
+            Watermark.objects.filter(name=WATERMARK)
+            .values_list("value", flat=True)
+            .first()
+        )
+
+    books = Book.objects.all()
+    if last_run is not None:
+        last_run = timezone.localdate(last_run)
+        aged = Q()
+        for days in BookStats.WINDOWS.values():
+            aged |= Q(
+                borrow_date__gt=get_window_start(last_run, days),
+                borrow_date__lte=get_window_start(today, days),
+            )
+        books = books.filter(id__in=Borrowing.objects.filter(aged).values("book_id"))
+
+    with transaction.atomic():
+        create_stats(books)
+        # locked first: a concurrent checkout either committed before the
+        # borrowings are counted below, or waits and adds itself after
+        current = {
+            stats.book_id: stats
+            for stats in BookStats.objects.select_for_update().filter(book__in=books)
+        }
+        new = get_stats(Borrowing.objects.filter(book__in=books), today)
+
+        now = timezone.now()
+        changed = []
+        for book_id, stats in current.items():
+            values = new.get(book_id, EMPTY_STATS)
+            if any(getattr(stats, field) != values[field] for field in FIELDS):
+                for field in FIELDS:
+                    setattr(stats, field, values[field])
+                stats.updated_at = now
+                changed.append(stats)
+
+        BookStats.objects.bulk_update(changed, [*FIELDS, "updated_at"], batch_size=1000)
+        Watermark.objects.update_or_create(
+            name=WATERMARK,
+            defaults={
+                "value": timezone.make_aware(
+                    datetime.datetime.combine(today, datetime.time())
+                )
+            },
+        )
+        if changed:
+            invalidate_all_books()
+
+    return len(changed)
@@ -0,0 +1,124 @@
+"""
+Active and overdue borrowings per customer, kept on Customer rows.
+
+Counters are changed with conditional F() updates in the same
+transaction as the borrowings themselves, so the loan limit
+(MAX_ACTIVE_BORROWINGS) is checked without counting borrowings and two
+concurrent checkouts can't both take the last free slot.
+
+A borrowing becomes overdue by the passing of time alone: the overdue
+counter is exact after reconcile() has run on the same day (run the
+reconcile_borrowing_counters command daily, shortly after midnight),
+checkouts and returns keep it up to date in between.
+"""
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from borrowing.models import Borrowing
+from user.cache import invalidate_customer
+from user.models import Customer
+
+
+def get_limit_error() -> str:
+    return (
+        f"You can't have more than {settings.MAX_ACTIVE_BORROWINGS} "
+        "active borrowings, return a book first"
+    )
+
+
+def is_overdue(expected_return_date) -> bool:
+    return expected_return_date < timezone.localdate()
+
+
+def get_free_slots(user_id):
+    """
+    Number of borrowings a customer can still take, None without a limit.
+    Locks the customer row until the end of the transaction
+    """
+    limit = settings.MAX_ACTIVE_BORROWINGS
+    if not limit:
+        return None
+
+    active = (
+        Customer.objects.select_for_update()
+        .filter(id=user_id)
+        .values_list("active_borrowings_count", flat=True)
+        .first()
+    )
+    return max(limit - (active or 0), 0)
+
+
+def add_borrowings(user_id, count: int = 1, overdue: int = 0) -> bool:
+    """
+    Count new active borrowings of a customer, False (and nothing
+    changes) if that would take more than MAX_ACTIVE_BORROWINGS
+    """
+    customers = Customer.objects.filter(id=user_id)
+    limit = settings.MAX_ACTIVE_BORROWINGS
+    if limit:
+        customers = customers.filter(active_borrowings_count__lte=limit - count)
+
+    # updated_at stays, counters aren't part of any ETag
+    updated = customers.update(
+        active_borrowings_count=F("active_borrowings_count") + count,
+        overdue_borrowings_count=F("overdue_borrowings_count") + overdue,
+    )
+    if updated:
+        invalidate_customer(user_id)
+
+    return bool(updated)
+
+
+def remove_borrowings(user_id, count: int = 1, overdue: int = 0) -> None:
+    """Count returned borrowings of a customer"""
+    # never below zero, e.g. if a borrowing turned overdue after reconcile()
+    Customer.objects.filter(id=user_id).update(
+        active_borrowings_count=Greatest(
+            F("active_borrowings_count") - count, Value(0)
+        ),
+        overdue_borrowings_count=Greatest(
+            F("overdue_borrowings_count") - overdue, Value(0)
+        ),
+    )
+    invalidate_customer(user_id)
+
+
+def reconcile() -> int:
+    """
+    Rebuild counters of all customers from borrowings,
+    returns number of customers whose counters were wrong
+    """
+    today = timezone.localdate()
+    counts = (
+        Borrowing.objects.filter(
+            user_id=OuterRef("id"), actual_return_date__isnull=True
+        )
+        .order_by()
+        .values("user_id")
+    )
+    active = counts.annotate(count=Count("id")).values("count")
+    overdue = (
+        counts.filter(expected_return_date__lt=today)
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+
+    customers = Customer.objects.annotate(
+        active=Coalesce(Subquery(active), 0), overdue=Coalesce(Subquery(overdue), 0)
+    ).filter(
+        ~Q(active_borrowings_count=F("active"))
+        | ~Q(overdue_borrowings_count=F("overdue"))
+    )
+    user_ids = list(customers.values_list("id", flat=True))
+
+    # a single statement, nothing can change between counting and writing
+    Customer.objects.update(
+        active_borrowings_count=Coalesce(Subquery(active), 0),
+        overdue_borrowings_count=Coalesce(Subquery(overdue), 0),
+    )
+    for user_id in user_ids:
+        invalidate_customer(user_id)
+
+    return len(user_ids)
@@ -0,0 +1,184 @@
+"""
+Overdue days and fines of borrowings, computed as a batch job.
+
+A run upserts rows of the Fine table with a single INSERT ... SELECT for
+the borrowings changed since the previous run (the watermark, by
+Borrowing.updated_at) plus the active ones, whose fines grow every day.
+Fines of changed borrowings that turned out not to be overdue (e.g. a
+corrected date) are deleted. Returned borrowings don't change, their
+fines are final. Run compute_fines() daily, e.g. with the compute_fines
+command from cron.
+
+fine = overdue days * daily fee of the book * FINE_MULTIPLIER, rounded
+half up to cents. SQLite has no decimal type, there the amount is
+computed in whole cents with integer arithmetic.
+"""
+import datetime
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from borrowing.models import Borrowing, Fine, Watermark
+
+WATERMARK = "borrowing.fines"
+# a transaction that started before a run can commit rows with an
+# updated_at older than the new watermark, the next run looks back a bit
+WATERMARK_OVERLAP = datetime.timedelta(minutes=5)
+
+
+def get_multiplier() -> Decimal:
+    return Decimal(str(settings.FINE_MULTIPLIER))
+
+
+def get_amount(daily_fee: Decimal, overdue_days: int) -> Decimal:
+    return (daily_fee * overdue_days * get_multiplier()).quantize(
+        Decimal("0.01"), rounding=ROUND_HALF_UP
+    )
+
+
+def compute_fines(today: datetime.date = None, full: bool = False) -> dict:
+    """
+    Update fines for today, from the last watermark unless full,
+    returns numbers of updated and deleted fines
+    """
+    today = today or timezone.localdate()
+    started_at = timezone.now()
+
+    since = None
+    if not full:
+        since = (
+            Watermark.objects.filter(name=WATERMARK)
+            .values_list("value", flat=True)
+            .first()
+        )
+    if since is not None:
+        since -= WATERMARK_OVERLAP
+
+    with transaction.atomic():
+        if connection.vendor in ("sqlite", "postgresql"):
+            updated = upsert_fines(today, since, started_at)
+            deleted = delete_fines(today, since)
+        else:
+            updated, deleted = compute_in_python(today, since, started_at)
+
+        Watermark.objects.update_or_create(
+            name=WATERMARK, defaults={"value": started_at}
+        )
+
+    return {"updated": updated, "deleted": deleted}
+
+
+def get_sql_parts(today: datetime.date, since) -> dict:
+    quote = connection.ops.quote_name
+    if connection.vendor == "sqlite":
+        overdue_days = (
+            "CAST(julianday(COALESCE(b.actual_return_date, %s)) "
+            "- julianday(b.expected_return_date) AS INTEGER)"
+        )
+        numerator, denominator = get_multiplier().as_integer_ratio()
+        amount = (
+            "(CAST(ROUND(daily_fee * 100) AS INTEGER) * overdue_days * %s * 2 + %s)"
+            " / (%s * 2) / 100.0"
+        )
+        amount_params = [numerator, denominator, denominator]
+    else:
+        overdue_days = "(COALESCE(b.actual_return_date, %s) - b.expected_return_date)"
+        amount = "ROUND(daily_fee * overdue_days * %s, 2)"
+        amount_params = [get_multiplier()]
+
+    changed, changed_params = "TRUE", []
+    if since is not None:
+        changed = "(b.updated_at > %s OR b.actual_return_date IS NULL)"
+        changed_params = [since]
+
+    return {
+        "borrowings": quote(Borrowing._meta.db_table),
+        "books": quote(Borrowing._meta.get_field("book").related_model._meta.db_table),
+        "fines": quote(Fine._meta.db_table),
+        "overdue_days": overdue_days,
+        "overdue_days_params": [today],
+        "amount": amount,
+        "amount_params": amount_params,
+        "changed": changed,
+        "changed_params": changed_params,
+    }
+
+
+def upsert_fines(today: datetime.date, since, now) -> int:
+    sql = get_sql_parts(today, since)
+    updated_at = Fine._meta.get_field("updated_at").get_db_prep_save(now, connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {sql['fines']} "
+            "(borrowing_id, overdue_days, amount, computed_on, updated_at) "
+            f"SELECT id, overdue_days, {sql['amount']}, %s, %s FROM ("
+            f"SELECT b.id, book.daily_fee, {sql['overdue_days']} AS overdue_days "
+            f"FROM {sql['borrowings']} b "
+            f"INNER JOIN {sql['books']} book ON book.id = b.book_id "
+            f"WHERE {sql['changed']}"
+            ") overdue WHERE overdue_days > 0 "
+            "ON CONFLICT (borrowing_id) DO UPDATE SET "
+            "overdue_days = excluded.overdue_days, amount = excluded.amount, "
+            "computed_on = excluded.computed_on, updated_at = excluded.updated_at "
+            # unchanged fines keep their updated_at (and ETags)
+            f"WHERE {sql['fines']}.overdue_days <> excluded.overdue_days "
+            f"OR {sql['fines']}.amount <> excluded.amount",
+            sql["amount_params"]
+            + [today, updated_at]
+            + sql["overdue_days_params"]
+            + sql["changed_params"],
+        )
+        return cursor.rowcount
+
+
+def delete_fines(today: datetime.date, since) -> int:
+    sql = get_sql_parts(today, since)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {sql['fines']} WHERE borrowing_id IN ("
+            f"SELECT b.id FROM {sql['borrowings']} b "
+            f"WHERE {sql['changed']} AND {sql['overdue_days']} <= 0)",
+            sql["changed_params"] + sql["overdue_days_params"],
+        )
+        return cursor.rowcount
+
+
+def compute_in_python(today: datetime.date, since, now) -> tuple:
+    """Same as upsert_fines() and delete_fines() for other databases"""
+    borrowings = Borrowing.objects.all()
+    if since is not None:
+        borrowings = borrowings.filter(
+            Q(updated_at__gt=since) | Q(actual_return_date__isnull=True)
+        )
+
+    fines, not_overdue = [], []
+    for borrowing_id, expected, returned, daily_fee in borrowings.values_list(
+        "id", "expected_return_date", "actual_return_date", "book__daily_fee"
+    ).iterator():
+        overdue_days = ((returned or today) - expected).days
+        if overdue_days > 0:
+            fines.append(
+                Fine(
+                    borrowing_id=borrowing_id,
+                    overdue_days=overdue_days,
+                    amount=get_amount(daily_fee, overdue_days),
+                    computed_on=today,
+                    updated_at=now,
+                )
+            )
+        else:
+            not_overdue.append(borrowing_id)
+
+    Fine.objects.bulk_create(
+        fines,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["borrowing"],
+        update_fields=["overdue_days", "amount", "computed_on", "updated_at"],
+    )
+    deleted, _ = Fine.objects.filter(borrowing_id__in=not_overdue).delete()
+
+    return len(fines), deleted
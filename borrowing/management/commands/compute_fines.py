@@ -0,0 +1,36 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from borrowing.fines import compute_fines
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute overdue days and fines of borrowings changed since the last "
+        "run and of all active borrowings. Run it daily"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="Compute fines as of this day (YYYY-MM-DD), today by default",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recompute fines of all borrowings, not only the changed ones",
+        )
+
+    def handle(self, *args, **options):
+        today = None
+        if options["date"]:
+            try:
+                today = datetime.date.fromisoformat(options["date"])
+            except ValueError as e:
+                raise CommandError(e)
+
+        result = compute_fines(today=today, full=options["full"])
+        self.stdout.write(
+            f"Updated {result['updated']}, deleted {result['deleted']} fines"
+        )
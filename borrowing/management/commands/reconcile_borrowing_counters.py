@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from borrowing.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild active and overdue borrowing counters of all customers from "
+        "borrowings. Run it daily, shortly after midnight: borrowings become "
+        "overdue with time, not with a checkout or a return"
+    )
+
+    def handle(self, *args, **options):
+        fixed = reconcile()
+        self.stdout.write(f"Fixed counters of {fixed} customers")
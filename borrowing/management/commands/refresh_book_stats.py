@@ -0,0 +1,35 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from borrowing.book_stats import refresh
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute availability and popularity stats of books whose "
+        "borrowings left a rolling window since the last run. Run it daily"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="Compute stats as of this day (YYYY-MM-DD), today by default",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recompute stats of all books, e.g. after borrowings were "
+            "changed outside of the API",
+        )
+
+    def handle(self, *args, **options):
+        today = None
+        if options["date"]:
+            try:
+                today = datetime.date.fromisoformat(options["date"])
+            except ValueError as e:
+                raise CommandError(e)
+
+        changed = refresh(today=today, full=options["full"])
+        self.stdout.write(f"Updated stats of {changed} books")
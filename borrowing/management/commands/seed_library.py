@@ -0,0 +1,220 @@
+import datetime
+import itertools
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from book.cache import invalidate_all_books
+from book.models import Book
+from book.search import rebuild_index
+from borrowing import book_stats
+from borrowing.counters import reconcile
+from borrowing.models import Borrowing
+from user.models import Customer
+
+WORDS = (
+    "war peace anna night day river king queen house garden road star "
+    "shadow light winter summer city island sea mountain storm glass iron "
+    "golden silent last first secret lost hidden old new long dark bright"
+).split()
+NAMES = (
+    "tolstoy dostoevsky austen dickens tolkien orwell huxley woolf joyce "
+    "kafka hemingway faulkner steinbeck twain melville bronte hugo dumas"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database quickly: load a fixture (e.g. library_db_data_json) "
+        "and/or generate customers, books and borrowings, where a few popular "
+        "books get most of the borrowings. Rows are inserted with bulk_create() "
+        "and constraint checks are deferred to the end of the load"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fixture", help="Django JSON fixture to load first")
+        parser.add_argument("--customers", type=int, default=0)
+        parser.add_argument("--books", type=int, default=0)
+        parser.add_argument("--borrowings", type=int, default=0)
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=1.1,
+            help="Zipf exponent of book popularity, 0 for uniform",
+        )
+        parser.add_argument(
+            "--password",
+            default="pass1234",
+            help="Password of generated customers",
+        )
+        parser.add_argument("--days", type=int, default=5 * 365)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+
+        # SQLite can't switch foreign keys off inside a transaction
+        with connection.constraint_checks_disabled():
+            with transaction.atomic():
+                if options["fixture"]:
+                    self.load_fixture(options["fixture"])
+                self.create_customers(options["customers"], options["password"])
+                self.create_books(options["books"])
+                self.create_borrowings(
+                    options["borrowings"], options["skew"], options["days"]
+                )
+                connection.check_constraints(
+                    table_names=[
+                        model._meta.db_table for model in (Customer, Book, Borrowing)
+                    ]
+                )
+                # bulk_create() skips the per-customer counters and book stats
+                reconcile()
+                book_stats.refresh(full=True)
+
+        rebuild_index()
+        invalidate_all_books()
+
+    def bulk_create(self, model, objects) -> int:
+        """Insert objects in batches, without keeping them all in memory"""
+        count = 0
+        objects = iter(objects)
+        while batch := list(itertools.islice(objects, self.batch_size)):
+            model.objects.bulk_create(batch)
+            count += len(batch)
+
+        return count
+
+    def load_fixture(self, path: str) -> None:
+        try:
+            with open(path) as fixture:
+                objects = list(serializers.deserialize("json", fixture))
+        except (OSError, serializers.base.DeserializationError) as e:
+            raise CommandError(e)
+
+        models = []
+        for model, group in itertools.groupby(objects, lambda obj: type(obj.object)):
+            group = list(group)
+            self.bulk_create(model, (obj.object for obj in group))
+            for obj in group:
+                for field, values in (obj.m2m_data or {}).items():
+                    getattr(obj.object, field).set(values)
+            models.append(model)
+
+        # explicit ids leave sequences behind (PostgreSQL)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+
+        self.stdout.write(f"Loaded {len(objects)} objects from {path}")
+
+    def create_customers(self, count: int, password: str) -> None:
+        if not count:
+            return
+
+        # hashing is slow on purpose, every customer gets the same hash
+        password = make_password(password)
+        start = Customer.objects.count()
+        now = timezone.now()
+
+        created = self.bulk_create(
+            Customer,
+            (
+                Customer(
+                    email=f"customer{number}@example.com",
+                    password=password,
+                    first_name=self.rng.choice(NAMES).title(),
+                    last_name=self.rng.choice(NAMES).title(),
+                    date_joined=now,
+                    updated_at=now,
+                )
+                for number in range(start, start + count)
+            ),
+        )
+        self.stdout.write(f"Created {created} customers")
+
+    def create_books(self, count: int) -> None:
+        if not count:
+            return
+
+        now = timezone.now()
+        created = self.bulk_create(
+            Book,
+            (
+                Book(
+                    title=" ".join(
+                        self.rng.choices(WORDS, k=self.rng.randint(2, 5))
+                    ).title(),
+                    author=f"{self.rng.choice(NAMES).title()} "
+                    f"{self.rng.choice(NAMES).title()}",
+                    cover=self.rng.choice(Book.Cover.values),
+                    inventory=self.rng.randint(0, 20),
+                    daily_fee=f"{self.rng.randint(1, 10)}."
+                    f"{self.rng.choice(['00', '50'])}",
+                    updated_at=now,
+                )
+                for _ in range(count)
+            ),
+        )
+        self.stdout.write(f"Created {created} books")
+
+    def create_borrowings(self, count: int, skew: float, days: int) -> None:
+        if not count:
+            return
+
+        customer_ids = list(Customer.objects.values_list("id", flat=True))
+        book_ids = list(Book.objects.values_list("id", flat=True))
+        if not customer_ids or not book_ids:
+            raise CommandError("Borrowings need customers and books")
+
+        # the book of rank n is borrowed ~1/n^skew as often as the first one
+        self.rng.shuffle(book_ids)
+        book_weights = list(
+            itertools.accumulate(
+                1 / rank**skew for rank in range(1, len(book_ids) + 1)
+            )
+        )
+        # milder skew for customers, some read more than others
+        customer_weights = list(
+            itertools.accumulate(
+                1 / rank**0.5 for rank in range(1, len(customer_ids) + 1)
+            )
+        )
+
+        today = timezone.localdate()
+        now = timezone.now()
+
+        def borrowings():
+            for _ in range(count):
+                borrow_date = today - datetime.timedelta(days=self.rng.randint(0, days))
+                expected_return_date = borrow_date + datetime.timedelta(
+                    days=self.rng.randint(7, 30)
+                )
+                # recent borrowings are often still active
+                actual_return_date = None
+                if (today - borrow_date).days > 30 or self.rng.random() < 0.5:
+                    actual_return_date = min(
+                        today,
+                        borrow_date + datetime.timedelta(days=self.rng.randint(1, 40)),
+                    )
+
+                yield Borrowing(
+                    borrow_date=borrow_date,
+                    expected_return_date=expected_return_date,
+                    actual_return_date=actual_return_date,
+                    book_id=self.rng.choices(book_ids, cum_weights=book_weights)[0],
+                    user_id=self.rng.choices(
+                        customer_ids, cum_weights=customer_weights
+                    )[0],
+                    updated_at=now,
+                )
+
+        created = self.bulk_create(Borrowing, borrowings())
+        self.stdout.write(f"Created {created} borrowings")
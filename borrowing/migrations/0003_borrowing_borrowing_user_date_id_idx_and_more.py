@@ -0,0 +1,25 @@
+# Generated by Django 4.2.4 on 2026-10-18 04:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("borrowing", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="borrowing",
+            index=models.Index(
+                fields=["user", "-borrow_date", "-id"],
+                name="borrowing_user_date_id_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="borrowing",
+            index=models.Index(
+                fields=["-borrow_date", "-id"], name="borrowing_date_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.4 on 2026-10-18 04:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("borrowing", "0003_borrowing_borrowing_user_date_id_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="borrowing",
+            name="borrowing_user_date_id_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="borrowing",
+            name="borrowing_date_id_idx",
+        ),
+        migrations.AddIndex(
+            model_name="borrowing",
+            index=models.Index(
+                fields=["user", "-borrow_date", "-id", "actual_return_date"],
+                name="borrowing_user_date_id_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="borrowing",
+            index=models.Index(
+                fields=["-borrow_date", "-id", "actual_return_date"],
+                name="borrowing_date_id_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="borrowing",
+            index=models.Index(
+                condition=models.Q(("actual_return_date__isnull", True)),
+                fields=["user", "-borrow_date", "-id"],
+                name="borrowing_user_active_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="borrowing",
+            index=models.Index(
+                condition=models.Q(("actual_return_date__isnull", True)),
+                fields=["-borrow_date", "-id"],
+                name="borrowing_active_idx",
+            ),
+        ),
+    ]
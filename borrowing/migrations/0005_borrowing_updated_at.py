@@ -0,0 +1,22 @@
+# Generated by Django 4.2.4 on 2026-10-18 04:31
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("borrowing", "0004_borrowing_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="borrowing",
+            name="updated_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                help_text="Time of the last change (used for ETag and Last-Modified)",
+            ),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.4 on 2026-10-18 05:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("borrowing", "0005_borrowing_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Fine",
+            fields=[
+                (
+                    "borrowing",
+                    models.OneToOneField(
+                        help_text="ID of overdue borrowing",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="fine",
+                        serialize=False,
+                        to="borrowing.borrowing",
+                    ),
+                ),
+                (
+                    "overdue_days",
+                    models.PositiveIntegerField(
+                        help_text="Days past the expected return date"
+                    ),
+                ),
+                (
+                    "amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        help_text="Overdue days * daily fee of the book * FINE_MULTIPLIER",
+                        max_digits=10,
+                    ),
+                ),
+                (
+                    "computed_on",
+                    models.DateField(help_text="Day the fine was computed for"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        help_text="Time of the last change (used for ETag and Last-Modified)",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Watermark",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                (
+                    "value",
+                    models.DateTimeField(
+                        help_text="Rows changed before this time have been processed"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="borrowing",
+            index=models.Index(fields=["updated_at"], name="borrowing_updated_at_idx"),
+        ),
+    ]
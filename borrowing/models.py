@@ -1,8 +1,17 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 
 from book.models import Book
 from user.models import Customer
 
+EXPECTED_RETURN_DATE_ERROR = (
+    "Expected return date should be greater or equal then borrow date"
+)
+ACTUAL_RETURN_DATE_ERROR = (
+    "Actual return date should be greater or equal then borrow date"
+)
+
 
 class Borrowing(models.Model):
     borrow_date = models.DateField(
@@ -30,27 +39,125 @@ class Borrowing(models.Model):
         related_name="borrowings",
         help_text="ID of customer",
     )
+    updated_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        help_text="Time of the last change (used for ETag and Last-Modified)",
+    )
 
     class Meta:
+        indexes = [
+            # every index matches the ordering of the borrowing list
+            # (-borrow_date, -id), actual_return_date at the end makes them
+            # covering for the is_active filter and COUNT(*)
+            models.Index(
+                fields=["user", "-borrow_date", "-id", "actual_return_date"],
+                name="borrowing_user_date_id_idx",
+            ),
+            models.Index(
+                fields=["-borrow_date", "-id", "actual_return_date"],
+                name="borrowing_date_id_idx",
+            ),
+            # active borrowings are a small part of the history
+            models.Index(
+                fields=["user", "-borrow_date", "-id"],
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_user_active_idx",
+            ),
+            models.Index(
+                fields=["-borrow_date", "-id"],
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_active_idx",
+            ),
+            # changes since the watermark of borrowing.fines
+            models.Index(fields=["updated_at"], name="borrowing_updated_at_idx"),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=models.Q(expected_return_date__gte=models.F("borrow_date")),
                 name="check_expected_return_date",
-                violation_error_message="Expected return date should be"
-                " greater or equal then borrow date",
+                violation_error_message=EXPECTED_RETURN_DATE_ERROR,
             ),
             models.CheckConstraint(
                 check=models.Q(actual_return_date__isnull=True)
                 | models.Q(actual_return_date__gte=models.F("borrow_date")),
                 name="check_actual_return_date",
-                violation_error_message="Actual return date should be "
-                "greater or equal then borrow date",
+                violation_error_message=ACTUAL_RETURN_DATE_ERROR,
             ),
         ]
 
     def __str__(self):
         return f"Borrowing {self.id}"
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
+    def validate_dates(self):
+        """
+        Check date constraints in Python without querying the database
+        (full_clean() runs a query per constraint and per foreign key)
+        """
+        if self.expected_return_date < self.borrow_date:
+            raise ValidationError(EXPECTED_RETURN_DATE_ERROR)
+
+        if (
+            self.actual_return_date is not None
+            and self.actual_return_date < self.borrow_date
+        ):
+            raise ValidationError(ACTUAL_RETURN_DATE_ERROR)
+
+    def save(self, *args, validate=True, **kwargs):
+        """
+        validate=False skips full_clean() but still checks the dates, pass
+        it only when book and user have already been validated, e.g. by a
+        serializer
+        """
+        if validate:
+            self.full_clean()
+        else:
+            self.validate_dates()
+        self.updated_at = timezone.now()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "updated_at"}
         super().save(*args, **kwargs)
+
+
+class Fine(models.Model):
+    """
+    Overdue days and accrued fine of a borrowing, computed by
+    borrowing.fines (fines of active borrowings grow every day)
+    """
+
+    borrowing = models.OneToOneField(
+        Borrowing,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="fine",
+        help_text="ID of overdue borrowing",
+    )
+    overdue_days = models.PositiveIntegerField(
+        help_text="Days past the expected return date"
+    )
+    amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        help_text="Overdue days * daily fee of the book * FINE_MULTIPLIER",
+    )
+    computed_on = models.DateField(help_text="Day the fine was computed for")
+    updated_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        help_text="Time of the last change (used for ETag and Last-Modified)",
+    )
+
+    def __str__(self):
+        return f"Fine of borrowing {self.borrowing_id}"
+
+
+class Watermark(models.Model):
+    """Position of an incremental batch job, e.g. borrowing.fines"""
+
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.DateTimeField(
+        help_text="Rows changed before this time have been processed"
+    )
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
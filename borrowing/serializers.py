@@ -1,16 +1,139 @@
+import csv
+import io
+import json
+from collections import Counter, defaultdict
+from operator import itemgetter
+
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction
-from django.shortcuts import get_object_or_404
+from django.db.models import F
+from django.utils import timezone
 from rest_framework import serializers
 
+from book.cache import invalidate_books
 from book.models import Book
-from book.serializers import BookDetailSerializer
-from borrowing.models import Borrowing
+from book.serializers import BookSummarySerializer
+from borrowing import book_stats, counters
+from borrowing.models import Borrowing, EXPECTED_RETURN_DATE_ERROR
+from library.sparse_fields import SparseFieldsSerializerMixin
 from user.serializers import CustomerSerializer
 
 
-class BorrowingSerializer(serializers.ModelSerializer):
-    book = BookDetailSerializer(many=False, read_only=True)
+class BorrowingListSerializer(serializers.ListSerializer):
+    """
+    Borrowings for lists, built from rows of values(*columns) fetched with
+    the book and the user in one joined query: no model instances and no
+    per-field serializer calls. The output (and so the rendered JSON) is
+    the same as the one of BorrowingSerializer, which still handles lists
+    of model instances. With sparse fields only get_columns() are fetched.
+    """
+
+    # columns behind every field of BorrowingSerializer
+    field_columns = {
+        "id": ("id",),
+        "borrow_date": ("borrow_date",),
+        "expected_return_date": ("expected_return_date",),
+        "actual_return_date": ("actual_return_date",),
+        "book": (
+            "book_id",
+            "book__title",
+            "book__author",
+            "book__cover",
+            "book__inventory",
+            "book__daily_fee",
+            # versions for ETags, not shown
+            "book__updated_at",
+        ),
+        "user": (
+            "user_id",
+            "user__email",
+            "user__first_name",
+            "user__last_name",
+            "user__is_staff",
+            "user__updated_at",
+        ),
+    }
+    columns = sum(field_columns.values(), ("updated_at",))
+    covers = {cover: str(label) for cover, label in Book.Cover.choices}
+
+    def get_child_fields(self) -> list:
+        """(name, shown as an id) for the fields of the child"""
+        if not self.child.sparse:
+            # building the fields takes longer than rendering a short page
+            return [(name, False) for name in self.field_columns]
+
+        return [
+            (name, isinstance(field, serializers.RelatedField))
+            for name, field in self.child.fields.items()
+        ]
+
+    def get_columns(self) -> list:
+        """Columns of the fields of the child, only the id of collapsed relations"""
+        columns = ["id", "updated_at"]
+        for name, collapsed in self.get_child_fields():
+            if collapsed:
+                columns.append(f"{name}_id")
+            else:
+                columns.extend(self.field_columns[name])
+
+        return list(dict.fromkeys(columns))
+
+    @staticmethod
+    def to_date(value):
+        return value.isoformat() if value is not None else None
+
+    def get_book(self, row) -> dict:
+        return {
+            "id": row["book_id"],
+            "title": row["book__title"],
+            "author": row["book__author"],
+            # get_cover_display() falls back to the value itself
+            "cover": self.covers.get(row["book__cover"], str(row["book__cover"])),
+            "inventory": row["book__inventory"],
+            "daily_fee": format(row["book__daily_fee"], "f"),
+        }
+
+    @staticmethod
+    def get_user(row) -> dict:
+        return {
+            "id": row["user_id"],
+            "email": row["user__email"],
+            "first_name": row["user__first_name"],
+            "last_name": row["user__last_name"],
+            "is_staff": row["user__is_staff"],
+        }
+
+    def get_readers(self) -> list:
+        """(name, function of a row) for every field of the child"""
+        to_date = self.to_date
+        readers = {
+            "id": itemgetter("id"),
+            "borrow_date": lambda row: to_date(row["borrow_date"]),
+            "expected_return_date": lambda row: to_date(row["expected_return_date"]),
+            "actual_return_date": lambda row: to_date(row["actual_return_date"]),
+            "book": self.get_book,
+            "user": self.get_user,
+        }
+
+        return [
+            (name, itemgetter(f"{name}_id") if collapsed else readers[name])
+            for name, collapsed in self.get_child_fields()
+        ]
+
+    def to_representation(self, data):
+        rows = list(data)
+        if rows and not isinstance(rows[0], dict):
+            return super().to_representation(rows)
+
+        readers = self.get_readers()
+        return [{name: read(row) for name, read in readers} for row in rows]
+
+
+class BorrowingSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    expandable_fields = ("book", "user")
+
+    book = BookSummarySerializer(many=False, read_only=True)
     user = CustomerSerializer(many=False, read_only=True)
 
     class Meta:
@@ -23,11 +146,35 @@ class BorrowingSerializer(serializers.ModelSerializer):
             "book",
             "user",
         ]
+        list_serializer_class = BorrowingListSerializer
 
     def save(self, **kwargs):
         pass
 
 
+class OverdueBorrowingSerializer(serializers.ModelSerializer):
+    overdue_days = serializers.IntegerField(source="fine.overdue_days", read_only=True)
+    fine = serializers.DecimalField(
+        source="fine.amount", max_digits=10, decimal_places=2, read_only=True
+    )
+    computed_on = serializers.DateField(source="fine.computed_on", read_only=True)
+
+    class Meta:
+        model = Borrowing
+        fields = [
+            "id",
+            "borrow_date",
+            "expected_return_date",
+            "actual_return_date",
+            "book",
+            "user",
+            "overdue_days",
+            "fine",
+            "computed_on",
+        ]
+        read_only_fields = fields
+
+
 class BorrowingCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Borrowing
@@ -49,18 +196,34 @@ class BorrowingCreateSerializer(serializers.ModelSerializer):
         # REST ValidationError in order to show warning message instead of
         # runtime error when database constraints for some fields were violated
         try:
-            instance = super().create(validated_data)
+            # book and user are already resolved by the serializer and view,
+            # so only the date constraints are left to check
+            instance = Borrowing(**validated_data)
+            instance.validate_dates()
 
-            # decrease inventory of book by 1 when we confirm borrowing
             with transaction.atomic():
-                book = get_object_or_404(Book, id=instance.book.id)
+                # decrease inventory of book by 1 in a single conditional
+                # UPDATE, so concurrent checkouts can't oversell the book
+                updated = Book.objects.filter(
+                    id=instance.book_id, inventory__gt=0
+                ).update(inventory=F("inventory") - 1, updated_at=timezone.now())
 
-                if book.inventory == 0:
+                if not updated:
                     raise serializers.ValidationError("The book is out of stock")
 
-                book.inventory -= 1
-                book.save()
-                instance.save()
+                if not counters.add_borrowings(
+                    instance.user_id,
+                    overdue=int(counters.is_overdue(instance.expected_return_date)),
+                ):
+                    raise serializers.ValidationError(counters.get_limit_error())
+
+                # any error on insert rolls back the decrement above
+                instance.save(validate=False)
+                book_stats.add_borrowings(
+                    instance.book_id,
+                    [(instance.borrow_date, instance.expected_return_date)],
+                )
+                invalidate_books([instance.book_id])
 
                 return instance
 
@@ -96,22 +259,380 @@ class BorrowingReturnSerializer(serializers.ModelSerializer):
             instance.actual_return_date = validated_data.get(
                 "actual_return_date", instance.actual_return_date
             )
+            instance.validate_dates()
 
             # increase inventory of book by 1 when we return borrowing
             with transaction.atomic():
-                borrowing = get_object_or_404(Borrowing, id=instance.id)
-                book = get_object_or_404(Book, id=instance.book.id)
+                updated = Borrowing.objects.filter(
+                    id=instance.id, actual_return_date__isnull=True
+                ).update(
+                    actual_return_date=instance.actual_return_date,
+                    updated_at=timezone.now(),
+                )
 
-                if borrowing.actual_return_date is not None:
+                if not updated:
                     raise serializers.ValidationError(
                         "The book has already been returned by user"
                     )
 
-                book.inventory += 1
-                book.save()
-                instance.save()
+                Book.objects.filter(id=instance.book_id).update(
+                    inventory=F("inventory") + 1, updated_at=timezone.now()
+                )
+                counters.remove_borrowings(
+                    instance.user_id,
+                    overdue=int(counters.is_overdue(instance.expected_return_date)),
+                )
+                book_stats.remove_borrowings(
+                    instance.book_id,
+                    [(instance.actual_return_date - instance.borrow_date).days],
+                )
+                invalidate_books([instance.book_id])
 
                 return instance
 
         except ValidationError as e:
             raise serializers.ValidationError(e.messages)
+
+
+class BorrowingBulkItemSerializer(serializers.Serializer):
+    book = serializers.IntegerField(min_value=1)
+    borrow_date = serializers.DateField()
+    expected_return_date = serializers.DateField()
+
+    def validate(self, attrs):
+        # same rule as check_expected_return_date constraint, checked here
+        # because bulk_create skips model validation
+        if attrs["expected_return_date"] < attrs["borrow_date"]:
+            raise serializers.ValidationError(EXPECTED_RETURN_DATE_ERROR)
+
+        return attrs
+
+
+class BorrowingBulkCreateSerializer(serializers.Serializer):
+    items = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=100,
+    )
+    all_or_nothing = serializers.BooleanField(default=True)
+
+    def validate(self, attrs):
+        items = []
+        for data in attrs["items"]:
+            item = BorrowingBulkItemSerializer(data=data)
+            if item.is_valid():
+                items.append((item.validated_data, None))
+            else:
+                items.append((None, item.errors))
+
+        if attrs["all_or_nothing"] and any(errors for _, errors in items):
+            raise serializers.ValidationError(
+                {"results": self._results(items, [None] * len(items))}
+            )
+
+        attrs["items"] = items
+        return attrs
+
+    def create(self, validated_data):
+        items = validated_data["items"]
+        user_id = validated_data["user_id"]
+
+        with transaction.atomic():
+            # lock all affected books in one ordered query to avoid deadlocks
+            book_ids = sorted({data["book"] for data, _ in items if data})
+            inventory = dict(
+                Book.objects.select_for_update()
+                .filter(id__in=book_ids)
+                .order_by("id")
+                .values_list("id", "inventory")
+            )
+
+            # the customer row stays locked, so the free slots can't run out
+            free_slots = counters.get_free_slots(user_id)
+
+            requested = {}
+            for index, (data, errors) in enumerate(items):
+                if errors:
+                    continue
+
+                if free_slots is not None and sum(requested.values()) >= free_slots:
+                    errors = {"non_field_errors": [counters.get_limit_error()]}
+                elif data["book"] not in inventory:
+                    errors = {
+                        "book": [
+                            f'Invalid pk "{data["book"]}" - object does not exist.'
+                        ]
+                    }
+                elif requested.get(data["book"], 0) >= inventory[data["book"]]:
+                    errors = {"book": ["The book is out of stock"]}
+                else:
+                    requested[data["book"]] = requested.get(data["book"], 0) + 1
+
+                items[index] = (None if errors else data, errors)
+
+            for book_id in sorted(requested):
+                updated = Book.objects.filter(
+                    id=book_id, inventory__gte=requested[book_id]
+                ).update(
+                    inventory=F("inventory") - requested[book_id],
+                    updated_at=timezone.now(),
+                )
+
+                if not updated:
+                    items = [
+                        (None, {"book": ["The book is out of stock"]})
+                        if data and data["book"] == book_id
+                        else (data, errors)
+                        for data, errors in items
+                    ]
+
+            # with all_or_nothing=false only a request that borrows nothing
+            # fails, a 201 would read as a creation
+            failed = any(errors for _, errors in items)
+            if (failed and validated_data["all_or_nothing"]) or not any(
+                data for data, _ in items
+            ):
+                # raising inside atomic() rolls back the decrements above
+                raise serializers.ValidationError(
+                    {"results": self._results(items, [None] * len(items))}
+                )
+
+            borrowings = iter(
+                Borrowing.objects.bulk_create(
+                    [
+                        Borrowing(
+                            user_id=user_id,
+                            book_id=data["book"],
+                            borrow_date=data["borrow_date"],
+                            expected_return_date=data["expected_return_date"],
+                        )
+                        for data, _ in items
+                        if data
+                    ]
+                )
+            )
+
+            created = [data for data, _ in items if data]
+            counters.add_borrowings(
+                user_id,
+                count=len(created),
+                overdue=sum(
+                    counters.is_overdue(data["expected_return_date"])
+                    for data in created
+                ),
+            )
+            dates_by_book = defaultdict(list)
+            for data in created:
+                dates_by_book[data["book"]].append(
+                    (data["borrow_date"], data["expected_return_date"])
+                )
+            for book_id in sorted(dates_by_book):
+                book_stats.add_borrowings(book_id, dates_by_book[book_id])
+            invalidate_books(requested)
+
+            return self._results(
+                items, [next(borrowings) if data else None for data, _ in items]
+            )
+
+    def to_representation(self, instance):
+        return {"results": instance}
+
+    @staticmethod
+    def _results(items, instances):
+        results = []
+        for index, ((_, errors), instance) in enumerate(zip(items, instances)):
+            if instance is not None:
+                results.append({"index": index, "status": "created", "id": instance.id})
+            else:
+                results.append({"index": index, "status": "failed", "errors": errors})
+
+        return results
+
+
+class BorrowingBulkReturnSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000,
+    )
+    actual_return_date = serializers.DateField()
+
+    def create(self, validated_data):
+        ids = set(validated_data["ids"])
+        actual_return_date = validated_data["actual_return_date"]
+        result = {
+            "actual_return_date": actual_return_date,
+            "returned": [],
+            "already_returned": [],
+            "invalid": [],
+            "not_found": [],
+        }
+
+        with transaction.atomic():
+            rows = (
+                validated_data["queryset"]
+                .select_for_update()
+                .filter(id__in=ids)
+                .order_by("id")
+                .values_list(
+                    "id",
+                    "book_id",
+                    "user_id",
+                    "borrow_date",
+                    "expected_return_date",
+                    "actual_return_date",
+                )
+            )
+
+            # borrowing id: (book id, user id, loan days, overdue)
+            returning = {}
+            for (
+                borrowing_id,
+                book_id,
+                user_id,
+                borrow_date,
+                expected_return_date,
+                returned_at,
+            ) in rows:
+                ids.discard(borrowing_id)
+
+                if returned_at is not None:
+                    result["already_returned"].append(borrowing_id)
+                elif actual_return_date < borrow_date:
+                    result["invalid"].append(borrowing_id)
+                else:
+                    returning[borrowing_id] = (
+                        book_id,
+                        user_id,
+                        (actual_return_date - borrow_date).days,
+                        counters.is_overdue(expected_return_date),
+                    )
+
+            result["not_found"] = sorted(ids)
+
+            updated_at = timezone.now()
+            updated = Borrowing.objects.filter(
+                id__in=returning, actual_return_date__isnull=True
+            ).update(actual_return_date=actual_return_date, updated_at=updated_at)
+            if updated < len(returning):
+                # select_for_update() doesn't lock on SQLite, a concurrent
+                # return updated the others between the read and the UPDATE
+                returned_by_us = set(
+                    Borrowing.objects.filter(
+                        id__in=returning, updated_at=updated_at
+                    ).values_list("id", flat=True)
+                )
+                for borrowing_id in sorted(set(returning) - returned_by_us):
+                    del returning[borrowing_id]
+                    result["already_returned"].append(borrowing_id)
+                result["already_returned"].sort()
+
+            result["returned"] = sorted(returning)
+            returned_books = Counter()
+            loan_days_by_book = defaultdict(list)
+            returned_by_user = Counter()
+            overdue_by_user = Counter()
+            for book_id, user_id, loan_days, overdue in returning.values():
+                returned_books[book_id] += 1
+                loan_days_by_book[book_id].append(loan_days)
+                returned_by_user[user_id] += 1
+                overdue_by_user[user_id] += overdue
+
+            # one grouped UPDATE per book instead of a save per borrowing
+            for book_id in sorted(returned_books):
+                Book.objects.filter(id=book_id).update(
+                    inventory=F("inventory") + returned_books[book_id],
+                    updated_at=timezone.now(),
+                )
+            for user_id in sorted(returned_by_user):
+                counters.remove_borrowings(
+                    user_id,
+                    count=returned_by_user[user_id],
+                    overdue=overdue_by_user[user_id],
+                )
+            for book_id in sorted(loan_days_by_book):
+                book_stats.remove_borrowings(book_id, loan_days_by_book[book_id])
+            invalidate_books(returned_books)
+
+        return result
+
+    def to_representation(self, instance):
+        return {
+            **instance,
+            "actual_return_date": serializers.DateField().to_representation(
+                instance["actual_return_date"]
+            ),
+        }
+
+
+class BorrowingExportSerializer:
+    """
+    Flat rows of borrowings for the export, streamed as CSV or NDJSON.
+    Rows are read with values_list() through a server-side cursor, so
+    neither model instances nor nested serializers are built per row and
+    memory doesn't grow with the size of the export.
+    """
+
+    # column name: lookup
+    fields = {
+        "id": "id",
+        "borrow_date": "borrow_date",
+        "expected_return_date": "expected_return_date",
+        "actual_return_date": "actual_return_date",
+        "book_id": "book_id",
+        "book_title": "book__title",
+        "book_author": "book__author",
+        "book_daily_fee": "book__daily_fee",
+        "user_id": "user_id",
+        "user_email": "user__email",
+    }
+    content_types = {
+        "csv": "text/csv",
+        "ndjson": "application/x-ndjson",
+    }
+    chunk_size = 2000
+
+    def __init__(self, queryset, output: str):
+        self.queryset = queryset
+        self.output = output
+
+    @property
+    def content_type(self) -> str:
+        return self.content_types[self.output]
+
+    def get_rows(self):
+        return self.queryset.values_list(*self.fields.values()).iterator(
+            chunk_size=self.chunk_size
+        )
+
+    def stream(self):
+        """Rendered export in chunks of chunk_size rows"""
+        if self.output == "csv":
+            render, header = self.render_csv, [list(self.fields)]
+        else:
+            render, header = self.render_ndjson, []
+
+        if header:
+            yield render(header)
+
+        chunk = []
+        for row in self.get_rows():
+            chunk.append(row)
+            if len(chunk) == self.chunk_size:
+                yield render(chunk)
+                chunk = []
+
+        if chunk:
+            yield render(chunk)
+
+    def render_csv(self, rows) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    def render_ndjson(self, rows) -> str:
+        names = list(self.fields)
+        return "".join(
+            json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + "\n"
+            for row in rows
+        )
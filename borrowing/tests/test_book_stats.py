@@ -0,0 +1,292 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from book.models import BookStats
+from book.stats import create_stats
+from ..book_stats import refresh
+from ..models import Book, Borrowing
+from .test_veiws import create_book, create_user
+
+BOOK_URL = reverse("book:book-list")
+BORROWING_URL = reverse("borrowing:borrowing-list")
+TODAY = datetime.date(2023, 3, 31)
+
+
+def get_stats(book):
+    stats = BookStats.objects.get(book=book)
+    return {
+        field: getattr(stats, field)
+        for field in (
+            "borrowed_total",
+            "borrowed_last_30_days",
+            "borrowed_last_365_days",
+            "currently_out",
+            "next_return_date",
+            "average_loan_days",
+        )
+    }
+
+
+class BookStatsEventsTests(APITestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.book = create_book()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+
+    def borrow(self, days_ago, days):
+        borrow_date = self.today - datetime.timedelta(days=days_ago)
+        return self.client.post(
+            BORROWING_URL,
+            {
+                "book": self.book.id,
+                "borrow_date": borrow_date,
+                "expected_return_date": borrow_date + datetime.timedelta(days=days),
+            },
+        )
+
+    def give_back(self, borrowing_id, days_ago=0):
+        return self.client.post(
+            reverse("borrowing:borrowing-return", args=[borrowing_id]),
+            {"actual_return_date": self.today - datetime.timedelta(days=days_ago)},
+        )
+
+    def test_new_book_has_empty_stats(self):
+        self.assertEqual(
+            get_stats(self.book),
+            {
+                "borrowed_total": 0,
+                "borrowed_last_30_days": 0,
+                "borrowed_last_365_days": 0,
+                "currently_out": 0,
+                "next_return_date": None,
+                "average_loan_days": None,
+            },
+        )
+
+    def test_borrow_and_return(self):
+        first = self.borrow(days_ago=100, days=120).data["id"]
+        second = self.borrow(days_ago=5, days=10).data["id"]
+
+        self.assertEqual(
+            get_stats(self.book),
+            {
+                "borrowed_total": 2,
+                "borrowed_last_30_days": 1,
+                "borrowed_last_365_days": 2,
+                "currently_out": 2,
+                "next_return_date": self.today + datetime.timedelta(days=5),
+                "average_loan_days": None,
+            },
+        )
+
+        self.give_back(second)
+        stats = get_stats(self.book)
+
+        self.assertEqual(stats["currently_out"], 1)
+        self.assertEqual(
+            stats["next_return_date"], self.today + datetime.timedelta(days=20)
+        )
+        self.assertEqual(stats["average_loan_days"], 5)
+
+        self.give_back(first, days_ago=1)
+        stats = get_stats(self.book)
+
+        self.assertEqual(stats["currently_out"], 0)
+        self.assertIsNone(stats["next_return_date"])
+        self.assertEqual(stats["average_loan_days"], 52)
+
+    def test_bulk_borrow_and_return(self):
+        other = create_book()
+        items = [
+            {
+                "book": book.id,
+                "borrow_date": self.today,
+                "expected_return_date": self.today + datetime.timedelta(days=days),
+            }
+            for book, days in ((self.book, 7), (self.book, 3), (other, 1))
+        ]
+        response = self.client.post(
+            reverse("borrowing:borrowing-bulk"), {"items": items}, format="json"
+        )
+
+        stats = get_stats(self.book)
+        self.assertEqual(stats["borrowed_last_30_days"], 2)
+        self.assertEqual(stats["currently_out"], 2)
+        self.assertEqual(
+            stats["next_return_date"], self.today + datetime.timedelta(days=3)
+        )
+        self.assertEqual(get_stats(other)["currently_out"], 1)
+
+        ids = [result["id"] for result in response.data["results"]]
+        self.client.post(
+            reverse("borrowing:borrowing-return-bulk"),
+            {"ids": ids[1:], "actual_return_date": self.today},
+            format="json",
+        )
+
+        stats = get_stats(self.book)
+        self.assertEqual(stats["currently_out"], 1)
+        self.assertEqual(
+            stats["next_return_date"], self.today + datetime.timedelta(days=7)
+        )
+        self.assertEqual(stats["average_loan_days"], 0)
+        self.assertEqual(get_stats(other)["currently_out"], 0)
+
+    def test_stats_in_book_detail(self):
+        cache.clear()
+        url = reverse("book:book-detail", args=[self.book.id])
+        etag = self.client.get(url)["ETag"]
+
+        self.borrow(days_ago=0, days=7)
+        # as if the book row didn't change, only its stats
+        Book.objects.filter(id=self.book.id).update(updated_at=self.book.updated_at)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["stats"]["currently_out"], 1)
+
+
+class RefreshBookStatsTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.book = create_book()
+
+    def create_borrowing(self, borrow_date, days, returned_after=None):
+        actual_return_date = None
+        if returned_after is not None:
+            actual_return_date = borrow_date + datetime.timedelta(days=returned_after)
+
+        return Borrowing.objects.create(
+            borrow_date=borrow_date,
+            expected_return_date=borrow_date + datetime.timedelta(days=days),
+            actual_return_date=actual_return_date,
+            book=self.book,
+            user=self.user,
+        )
+
+    def test_full_refresh(self):
+        self.create_borrowing(TODAY - datetime.timedelta(days=400), 10, 4)
+        self.create_borrowing(TODAY - datetime.timedelta(days=100), 10, 7)
+        self.create_borrowing(TODAY - datetime.timedelta(days=29), 40)
+        self.create_borrowing(TODAY, 10)
+
+        self.assertEqual(refresh(today=TODAY, full=True), 1)
+        self.assertEqual(
+            get_stats(self.book),
+            {
+                "borrowed_total": 4,
+                "borrowed_last_30_days": 2,
+                "borrowed_last_365_days": 3,
+                "currently_out": 2,
+                "next_return_date": TODAY + datetime.timedelta(days=10),
+                "average_loan_days": 5.5,
+            },
+        )
+        # nothing changed since
+        self.assertEqual(refresh(today=TODAY, full=True), 0)
+
+    def test_borrowings_leave_windows(self):
+        self.create_borrowing(TODAY - datetime.timedelta(days=29), 10, 5)
+        untouched = create_book()
+        refresh(today=TODAY, full=True)
+
+        self.assertEqual(get_stats(self.book)["borrowed_last_30_days"], 1)
+
+        self.assertEqual(refresh(today=TODAY + datetime.timedelta(days=1)), 1)
+        self.assertEqual(get_stats(self.book)["borrowed_last_30_days"], 0)
+        self.assertEqual(get_stats(self.book)["borrowed_last_365_days"], 1)
+        self.assertEqual(get_stats(untouched)["borrowed_total"], 0)
+
+    def test_incremental_refresh_skips_other_books(self):
+        refresh(today=TODAY, full=True)
+        # changed behind the back of the stats, but nothing left a window
+        self.create_borrowing(TODAY - datetime.timedelta(days=10), 10)
+
+        self.assertEqual(refresh(today=TODAY + datetime.timedelta(days=1)), 0)
+        self.assertEqual(get_stats(self.book)["borrowed_total"], 0)
+
+        self.assertEqual(
+            refresh(today=TODAY + datetime.timedelta(days=1), full=True), 1
+        )
+        self.assertEqual(get_stats(self.book)["borrowed_total"], 1)
+
+    def test_full_refresh_creates_missing_stats(self):
+        BookStats.objects.all().delete()
+        self.create_borrowing(TODAY, 10)
+
+        refresh(today=TODAY, full=True)
+
+        self.assertEqual(get_stats(self.book)["currently_out"], 1)
+
+    def test_refresh_book_stats_command(self):
+        self.create_borrowing(TODAY, 10)
+        out = StringIO()
+
+        call_command("refresh_book_stats", date="2023-03-31", full=True, stdout=out)
+
+        self.assertIn("Updated stats of 1 books", out.getvalue())
+        self.assertEqual(get_stats(self.book)["borrowed_last_30_days"], 1)
+
+
+class PopularityOrderingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.books = Book.objects.bulk_create(
+            Book(
+                title=f"Title {number}",
+                author="Author",
+                cover=Book.Cover.HARD,
+                inventory=1,
+                daily_fee=Decimal("1.00"),
+            )
+            for number in range(5)
+        )
+        create_stats(Book.objects.all())
+        for book, popularity in zip(self.books, (3, 0, 7, 3, 1)):
+            BookStats.objects.filter(book=book).update(borrowed_last_30_days=popularity)
+
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="test@example.com", password="pass1234"
+            )
+        )
+
+    def test_ordering_by_popularity(self):
+        response = self.client.get(BOOK_URL, {"ordering": "popularity"})
+
+        self.assertEqual(
+            [book["id"] for book in response.data["results"]],
+            [self.books[index].id for index in (2, 0, 3, 4, 1)],
+        )
+        self.assertEqual(
+            response.data["results"][0]["stats"]["borrowed_last_30_days"], 7
+        )
+
+    def test_ordering_by_popularity_with_cursor(self):
+        ids = []
+        params = {"ordering": "popularity", "pagination": "cursor", "page_size": 2}
+        url = BOOK_URL
+        while url:
+            response = self.client.get(url, params)
+            ids += [book["id"] for book in response.data["results"]]
+            url, params = response.data["next"], None
+
+        self.assertEqual(ids, [self.books[index].id for index in (2, 0, 3, 4, 1)])
+
+    def test_default_ordering_ignores_stats(self):
+        response = self.client.get(BOOK_URL)
+
+        self.assertEqual(
+            [book["id"] for book in response.data["results"]],
+            [book.id for book in self.books],
+        )
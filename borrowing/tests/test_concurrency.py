@@ -0,0 +1,66 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase
+from rest_framework.exceptions import ValidationError
+
+from ..models import Book, Borrowing, Customer
+from ..serializers import BorrowingCreateSerializer
+
+WORKERS = 16
+ATTEMPTS = 200
+INVENTORY = 25
+
+
+class ConcurrentBorrowingTests(TransactionTestCase):
+    def setUp(self):
+        self.user = Customer.objects.create(
+            email="test@example.com", password="pass1234"
+        )
+        self.book = Book.objects.create(
+            title="Test title",
+            author="Test author",
+            cover=Book.Cover.HARD,
+            inventory=INVENTORY,
+            daily_fee=Decimal("1.00"),
+        )
+
+    def borrow(self, start):
+        payload = {
+            "borrow_date": "2023-01-01",
+            "expected_return_date": "2023-01-02",
+            "book": self.book.id,
+        }
+        start.wait()
+        try:
+            while True:
+                try:
+                    serializer = BorrowingCreateSerializer(data=payload)
+                    serializer.is_valid(raise_exception=True)
+                    serializer.save(user=self.user)
+                    return "created"
+                except ValidationError:
+                    return "out_of_stock"
+                except OperationalError:
+                    # sqlite reports lock contention instead of blocking,
+                    # the whole transaction was rolled back, so just retry
+                    continue
+        finally:
+            connection.close()
+
+    def test_parallel_borrows_never_oversell_book(self):
+        start = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+            futures = [executor.submit(self.borrow, start) for _ in range(ATTEMPTS)]
+            start.set()
+            results = [future.result() for future in futures]
+
+        self.book.refresh_from_db()
+
+        self.assertEqual(results.count("created"), INVENTORY)
+        self.assertEqual(results.count("out_of_stock"), ATTEMPTS - INVENTORY)
+        self.assertEqual(self.book.inventory, 0)
+        self.assertEqual(Borrowing.objects.count(), INVENTORY)
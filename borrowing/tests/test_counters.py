@@ -0,0 +1,167 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import Book, Borrowing, Customer
+from .test_veiws import create_book, create_user
+
+BORROWING_URL = reverse("borrowing:borrowing-list")
+
+
+def get_counters(user):
+    user.refresh_from_db()
+    return user.active_borrowings_count, user.overdue_borrowings_count
+
+
+class BorrowingCountersTests(APITestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.book = create_book()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+
+    def borrow(self, expected_return_date=None):
+        return self.client.post(
+            BORROWING_URL,
+            {
+                "book": self.book.id,
+                "borrow_date": self.today - datetime.timedelta(days=10),
+                "expected_return_date": expected_return_date or self.today,
+            },
+        )
+
+    def test_borrow_and_return(self):
+        self.borrow()
+        response = self.borrow(
+            expected_return_date=self.today - datetime.timedelta(days=1)
+        )
+
+        self.assertEqual(get_counters(self.user), (2, 1))
+
+        self.client.post(
+            reverse("borrowing:borrowing-return", args=[response.data["id"]]),
+            {"actual_return_date": self.today},
+        )
+
+        self.assertEqual(get_counters(self.user), (1, 0))
+
+    def test_bulk_borrow_and_return(self):
+        items = [
+            {
+                "book": self.book.id,
+                "borrow_date": self.today,
+                "expected_return_date": self.today,
+            }
+        ] * 3
+        response = self.client.post(
+            reverse("borrowing:borrowing-bulk"), {"items": items}, format="json"
+        )
+
+        self.assertEqual(get_counters(self.user), (3, 0))
+
+        ids = [result["id"] for result in response.data["results"]]
+        self.client.post(
+            reverse("borrowing:borrowing-return-bulk"),
+            {"ids": ids[:2], "actual_return_date": self.today},
+            format="json",
+        )
+
+        self.assertEqual(get_counters(self.user), (1, 0))
+
+    @override_settings(MAX_ACTIVE_BORROWINGS=1)
+    def test_max_active_borrowings(self):
+        self.borrow()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.borrow()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("more than 1 active borrowings", str(response.data))
+        # the limit is checked without counting borrowings
+        self.assertFalse(
+            [
+                query
+                for query in queries.captured_queries
+                if 'FROM "borrowing_borrowing"' in query["sql"]
+            ]
+        )
+        self.assertEqual(Borrowing.objects.count(), 1)
+        self.assertEqual(Book.objects.get(id=self.book.id).inventory, 4)
+        self.assertEqual(get_counters(self.user), (1, 0))
+
+    @override_settings(MAX_ACTIVE_BORROWINGS=2)
+    def test_max_active_borrowings_in_bulk(self):
+        items = [
+            {
+                "book": self.book.id,
+                "borrow_date": self.today,
+                "expected_return_date": self.today,
+            }
+        ] * 3
+        response = self.client.post(
+            reverse("borrowing:borrowing-bulk"),
+            {"items": items, "all_or_nothing": False},
+            format="json",
+        )
+
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["created", "created", "failed"],
+        )
+        self.assertEqual(get_counters(self.user), (2, 0))
+
+    def test_counters_on_manage_user(self):
+        self.client.get(reverse("user:manage"))
+        self.borrow()
+
+        response = self.client.get(reverse("user:manage"))
+
+        self.assertEqual(response.data["active_borrowings_count"], 1)
+        self.assertEqual(response.data["overdue_borrowings_count"], 0)
+
+    def test_save_does_not_overwrite_counters(self):
+        stale = Customer.objects.get(id=self.user.id)
+        self.borrow()
+
+        stale.first_name = "Test"
+        stale.save()
+
+        self.assertEqual(get_counters(self.user), (1, 0))
+
+    def test_reconcile_command(self):
+        Borrowing.objects.bulk_create(
+            Borrowing(
+                borrow_date=self.today - datetime.timedelta(days=10),
+                expected_return_date=self.today - datetime.timedelta(days=days),
+                actual_return_date=self.today if days == 3 else None,
+                book=self.book,
+                user=self.user,
+            )
+            for days in (0, 1, 2, 3)
+        )
+        out = StringIO()
+        call_command("reconcile_borrowing_counters", stdout=out)
+
+        self.assertEqual(get_counters(self.user), (3, 2))
+        self.assertIn("Fixed counters of 1 customers", out.getvalue())
+
+    def test_seed_library_counts_borrowings(self):
+        call_command(
+            "seed_library", customers=5, books=5, borrowings=200, stdout=StringIO()
+        )
+
+        for customer in Customer.objects.all():
+            active = customer.borrowings.filter(actual_return_date__isnull=True)
+            self.assertEqual(customer.active_borrowings_count, active.count())
+            self.assertEqual(
+                customer.overdue_borrowings_count,
+                active.filter(expected_return_date__lt=self.today).count(),
+            )
@@ -0,0 +1,260 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from library.tests.query_budget import QueryBudgetTestMixin
+
+from ..fines import compute_fines, compute_in_python, get_amount
+from ..models import Book, Borrowing, Customer, Fine
+from ..views import BorrowingViewSet
+
+OVERDUE_URL = reverse("borrowing:borrowing-overdue")
+TODAY = datetime.date(2023, 3, 31)
+
+
+def create_book(daily_fee="1.50"):
+    return Book.objects.create(
+        title="Test title",
+        author="Test author",
+        cover=Book.Cover.HARD,
+        inventory=5,
+        daily_fee=Decimal(daily_fee),
+    )
+
+
+def create_borrowing(book, user, expected_return_date, actual_return_date=None):
+    return Borrowing.objects.create(
+        borrow_date=datetime.date(2023, 3, 1),
+        expected_return_date=expected_return_date,
+        actual_return_date=actual_return_date,
+        book=book,
+        user=user,
+    )
+
+
+class ComputeFinesTests(TestCase):
+    def setUp(self):
+        self.user = Customer.objects.create(email="test@example.com")
+        self.book = create_book()
+
+    def test_compute_fines(self):
+        active = create_borrowing(self.book, self.user, datetime.date(2023, 3, 21))
+        returned = create_borrowing(
+            self.book,
+            self.user,
+            datetime.date(2023, 3, 10),
+            actual_return_date=datetime.date(2023, 3, 13),
+        )
+        create_borrowing(self.book, self.user, datetime.date(2023, 4, 10))
+        create_borrowing(
+            self.book,
+            self.user,
+            datetime.date(2023, 3, 10),
+            actual_return_date=datetime.date(2023, 3, 10),
+        )
+
+        result = compute_fines(today=TODAY)
+
+        self.assertEqual(result, {"updated": 2, "deleted": 0})
+        self.assertEqual(
+            {
+                fine.borrowing_id: (fine.overdue_days, fine.amount, fine.computed_on)
+                for fine in Fine.objects.all()
+            },
+            {
+                active.id: (10, Decimal("30.00"), TODAY),
+                returned.id: (3, Decimal("9.00"), TODAY),
+            },
+        )
+
+    @override_settings(FINE_MULTIPLIER="1.5")
+    def test_amounts_are_rounded_half_up_to_cents(self):
+        for daily_fee, days in (("0.01", 3), ("0.03", 1), ("9.99", 7), ("0.33", 11)):
+            create_borrowing(
+                create_book(daily_fee),
+                self.user,
+                TODAY - datetime.timedelta(days=days),
+            )
+
+        compute_fines(today=TODAY)
+        fines = {fine.borrowing_id: fine.amount for fine in Fine.objects.all()}
+
+        # 0.01 * 3 * 1.5 = 0.045 and 0.03 * 1.5 = 0.045
+        self.assertEqual(sorted(fines.values())[:2], [Decimal("0.05")] * 2)
+        for borrowing in Borrowing.objects.select_related("book"):
+            self.assertEqual(
+                fines[borrowing.id],
+                get_amount(
+                    borrowing.book.daily_fee,
+                    (TODAY - borrowing.expected_return_date).days,
+                ),
+            )
+
+    def test_sql_matches_python(self):
+        for days in range(1, 20):
+            create_borrowing(
+                create_book(f"{days}.{days:02}"),
+                self.user,
+                TODAY - datetime.timedelta(days=days),
+                actual_return_date=TODAY - datetime.timedelta(days=days // 3),
+            )
+
+        compute_fines(today=TODAY)
+        in_sql = set(Fine.objects.values_list("borrowing_id", "overdue_days", "amount"))
+        Fine.objects.all().delete()
+        compute_in_python(TODAY, None, timezone.now())
+        in_python = set(
+            Fine.objects.values_list("borrowing_id", "overdue_days", "amount")
+        )
+
+        self.assertEqual(in_sql, in_python)
+
+    def test_active_fines_grow_every_day(self):
+        borrowing = create_borrowing(self.book, self.user, datetime.date(2023, 3, 21))
+
+        compute_fines(today=TODAY)
+        result = compute_fines(today=TODAY + datetime.timedelta(days=1))
+
+        self.assertEqual(result["updated"], 1)
+        self.assertEqual(Fine.objects.get(borrowing=borrowing).overdue_days, 11)
+
+    def test_only_changed_borrowings_since_watermark(self):
+        returned = create_borrowing(
+            self.book,
+            self.user,
+            datetime.date(2023, 3, 10),
+            actual_return_date=datetime.date(2023, 3, 13),
+        )
+        # changed long before the run, out of the watermark overlap
+        Borrowing.objects.update(
+            updated_at=timezone.now() - datetime.timedelta(hours=1)
+        )
+        compute_fines(today=TODAY)
+        # not a change of the borrowing, the fine is final
+        Book.objects.filter(id=self.book.id).update(daily_fee=Decimal("5.00"))
+
+        result = compute_fines(today=TODAY + datetime.timedelta(days=1))
+
+        self.assertEqual(result["updated"], 0)
+        self.assertEqual(Fine.objects.get(borrowing=returned).amount, Decimal("9.00"))
+
+        compute_fines(today=TODAY, full=True)
+
+        self.assertEqual(Fine.objects.get(borrowing=returned).amount, Decimal("30.00"))
+
+    def test_changed_borrowings(self):
+        borrowing = create_borrowing(self.book, self.user, datetime.date(2023, 3, 21))
+        compute_fines(today=TODAY)
+
+        borrowing.actual_return_date = datetime.date(2023, 3, 23)
+        borrowing.save()
+        compute_fines(today=TODAY)
+
+        self.assertEqual(Fine.objects.get(borrowing=borrowing).overdue_days, 2)
+
+        borrowing.expected_return_date = datetime.date(2023, 3, 25)
+        borrowing.save()
+        result = compute_fines(today=TODAY)
+
+        self.assertEqual(result["deleted"], 1)
+        self.assertFalse(Fine.objects.exists())
+
+    def test_compute_fines_command(self):
+        create_borrowing(self.book, self.user, datetime.date(2023, 3, 21))
+        out = StringIO()
+
+        call_command("compute_fines", date="2023-03-31", stdout=out)
+
+        self.assertIn("Updated 1, deleted 0 fines", out.getvalue())
+        self.assertEqual(Fine.objects.get().overdue_days, 10)
+
+
+class OverdueBorrowingViewSetTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        self.user = Customer.objects.create(email="test@example.com")
+        self.other = Customer.objects.create(email="other@example.com")
+        book = create_book()
+
+        self.active = create_borrowing(book, self.user, datetime.date(2023, 3, 21))
+        self.returned = create_borrowing(
+            book,
+            self.user,
+            datetime.date(2023, 3, 10),
+            actual_return_date=datetime.date(2023, 3, 13),
+        )
+        self.on_time = create_borrowing(book, self.user, datetime.date(2023, 4, 10))
+        self.others = create_borrowing(book, self.other, datetime.date(2023, 3, 21))
+        compute_fines(today=TODAY)
+
+        self.client.force_authenticate(self.user)
+
+    def test_overdue_borrowings(self):
+        response = self.client.get(OVERDUE_URL)
+        results = {borrowing["id"]: borrowing for borrowing in response.data["results"]}
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            results[self.active.id],
+            {
+                "id": self.active.id,
+                "borrow_date": "2023-03-01",
+                "expected_return_date": "2023-03-21",
+                "actual_return_date": None,
+                "book": self.active.book_id,
+                "user": self.user.id,
+                "overdue_days": 10,
+                "fine": "30.00",
+                "computed_on": "2023-03-31",
+            },
+        )
+        self.assertEqual(set(results), {self.active.id, self.returned.id})
+
+    def test_overdue_borrowings_still_out(self):
+        response = self.client.get(OVERDUE_URL, {"is_active": "true"})
+
+        self.assertEqual(
+            [borrowing["id"] for borrowing in response.data["results"]],
+            [self.active.id],
+        )
+
+    def test_overdue_borrowings_for_admin(self):
+        admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="pass1234"
+        )
+        self.client.force_authenticate(admin)
+
+        response = self.client.get(OVERDUE_URL)
+
+        self.assertEqual(response.data["count"], 3)
+
+    def test_overdue_borrowings_etag(self):
+        response = self.client.get(OVERDUE_URL, {"is_active": "true"})
+        etag = response["ETag"]
+
+        compute_fines(today=TODAY + datetime.timedelta(days=1))
+        response = self.client.get(
+            OVERDUE_URL, {"is_active": "true"}, HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["overdue_days"], 11)
+
+    def test_overdue_borrowings_unauthenticated(self):
+        self.client.force_authenticate(None)
+
+        response = self.client.get(OVERDUE_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_query_budget(self):
+        self.assertWithinQueryBudget(
+            BorrowingViewSet, "overdue", lambda: self.client.get(OVERDUE_URL)
+        )
@@ -0,0 +1,97 @@
+import unittest
+from itertools import product
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import Borrowing
+from ..views import BorrowingKeysetPagination
+from .test_veiws import create_book, create_user
+
+IS_ACTIVE_FILTERS = [None, "true", "false"]
+PAGINATIONS = [{}, {"pagination": "cursor"}, {"cursor": "<next page>"}]
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite")
+class BorrowingListQueryPlanTests(APITestCase):
+    """Every filter combination of the borrowing list must be served by an index"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="pass1234"
+        )
+        book = create_book()
+        for user in (self.user, self.admin):
+            for actual_return_date in (None, "2023-01-02"):
+                Borrowing.objects.create(
+                    borrow_date="2023-01-01",
+                    expected_return_date="2023-01-01",
+                    actual_return_date=actual_return_date,
+                    book=book,
+                    user=user,
+                )
+
+        self.next_cursor = BorrowingKeysetPagination().encode_cursor(
+            ["2023-01-01", Borrowing.objects.order_by("id").last().id]
+        )
+
+    def get_plans(self, user, params):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("borrowing:borrowing-list"), params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if "borrowing_borrowing" in query["sql"]:
+                    cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                    plans.append([row[-1] for row in cursor.fetchall()])
+
+        return plans
+
+    def assert_no_full_scan(self, user, params):
+        plans = self.get_plans(user, params)
+        self.assertTrue(plans)
+
+        for steps in plans:
+            for step in steps:
+                self.assertNotEqual(step, "SCAN borrowing_borrowing", (params, steps))
+                self.assertNotIn("TEMP B-TREE", step, (params, steps))
+
+        if params.get("is_active") == "true":
+            self.assertTrue(
+                any("_active_idx" in step for steps in plans for step in steps),
+                plans,
+            )
+
+    def combinations(self, user_ids):
+        for is_active, user_id, pagination in product(
+            IS_ACTIVE_FILTERS, user_ids, PAGINATIONS
+        ):
+            params = {
+                key: self.next_cursor if value == "<next page>" else value
+                for key, value in pagination.items()
+            }
+            if is_active is not None:
+                params["is_active"] = is_active
+            if user_id is not None:
+                params["user_id"] = user_id
+
+            yield params
+
+    def test_customer_list_uses_indexes(self):
+        for params in self.combinations([None]):
+            with self.subTest(**params):
+                self.assert_no_full_scan(self.user, params)
+
+    def test_admin_list_uses_indexes(self):
+        for params in self.combinations([None, self.user.id]):
+            with self.subTest(**params):
+                self.assert_no_full_scan(self.admin, params)
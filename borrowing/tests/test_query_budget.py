@@ -0,0 +1,179 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from library.tests.query_budget import QueryBudgetTestMixin
+
+from ..models import Book, Borrowing, Customer
+from ..views import BorrowingViewSet
+
+BORROWING_URL = reverse("borrowing:borrowing-list")
+
+
+class BorrowingQueryBudgetTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        # every borrowing of a different book and user, so that a missing
+        # select_related() costs a query per row
+        books = Book.objects.bulk_create(
+            Book(
+                title=f"Title {number}",
+                author="Author",
+                cover=Book.Cover.HARD,
+                inventory=5,
+                daily_fee=Decimal("1.00"),
+            )
+            for number in range(100)
+        )
+        customers = Customer.objects.bulk_create(
+            Customer(email=f"customer{number}@example.com", password="pass1234")
+            for number in range(100)
+        )
+        self.borrowings = Borrowing.objects.bulk_create(
+            Borrowing(
+                borrow_date="2023-01-01",
+                expected_return_date="2023-01-10",
+                book=book,
+                user=customer,
+            )
+            for book, customer in zip(books, customers)
+        )
+        self.books = books
+
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="pass1234"
+        )
+        self.client.force_authenticate(self.user)
+
+    def get_page(self, **params):
+        def get(page_size):
+            response = self.client.get(
+                BORROWING_URL, {**params, "page_size": page_size}
+            )
+            self.assertEqual(len(response.data["results"]), page_size)
+
+        return get
+
+    def test_list(self):
+        for params in (
+            {},
+            {"is_active": "true"},
+            {"pagination": "cursor"},
+            {"is_active": "true", "pagination": "cursor"},
+        ):
+            with self.subTest(params=params):
+                self.assertConstantQueries(
+                    BorrowingViewSet, "list", self.get_page(**params)
+                )
+
+    def test_list_for_user(self):
+        customer = self.borrowings[0].user
+        Borrowing.objects.bulk_create(
+            Borrowing(
+                borrow_date="2023-01-01",
+                expected_return_date="2023-01-10",
+                book=book,
+                user=customer,
+            )
+            for book in self.books[1:]
+        )
+        self.client.force_authenticate(customer)
+
+        self.assertConstantQueries(BorrowingViewSet, "list", self.get_page())
+
+    def test_list_count_without_joins(self):
+        queries = self.countQueries(
+            lambda: self.client.get(BORROWING_URL, {"is_active": "true"})
+        )
+
+        counts = [sql for sql in queries if "COUNT(" in sql]
+        self.assertEqual(len(counts), 1)
+        self.assertNotIn("JOIN", counts[0])
+
+    def test_list_without_select_related(self):
+        queryset = Borrowing.objects.order_by("-borrow_date", "-id")
+
+        # model instances instead of the rows of BorrowingListSerializer
+        with mock.patch.object(BorrowingViewSet, "get_queryset", lambda self: queryset):
+            with self.assertRaises(AssertionError):
+                self.assertConstantQueries(BorrowingViewSet, "list", self.get_page())
+
+    def test_retrieve(self):
+        url = reverse("borrowing:borrowing-detail", args=[self.borrowings[0].id])
+        self.assertWithinQueryBudget(
+            BorrowingViewSet, "retrieve", lambda: self.client.get(url)
+        )
+
+    def test_create(self):
+        payload = {
+            "book": self.books[0].id,
+            "borrow_date": "2023-01-01",
+            "expected_return_date": "2023-01-10",
+        }
+        self.assertWithinQueryBudget(
+            BorrowingViewSet, "create", lambda: self.client.post(BORROWING_URL, payload)
+        )
+        self.assertEqual(Borrowing.objects.count(), 101)
+
+    def test_return_book(self):
+        url = reverse("borrowing:borrowing-return", args=[self.borrowings[0].id])
+        self.assertWithinQueryBudget(
+            BorrowingViewSet,
+            "return_book",
+            lambda: self.client.post(url, {"actual_return_date": "2023-01-05"}),
+        )
+
+    def test_bulk_borrow(self):
+        books = iter(self.books)
+
+        def borrow(items):
+            response = self.client.post(
+                reverse("borrowing:borrowing-bulk"),
+                {
+                    "items": [
+                        {
+                            "book": next(books).id,
+                            "borrow_date": "2023-01-01",
+                            "expected_return_date": "2023-01-10",
+                        }
+                        for _ in range(items)
+                    ]
+                },
+                format="json",
+            )
+            self.assertEqual(response.status_code, 201)
+
+        # inventory and stats of every book
+        self.assertQueriesPerItem(2, borrow)
+        self.assertEqual(Borrowing.objects.count(), 111)
+
+    def test_bulk_return(self):
+        borrowings = iter(self.borrowings)
+
+        def return_books(items):
+            response = self.client.post(
+                reverse("borrowing:borrowing-return-bulk"),
+                {
+                    "ids": [next(borrowings).id for _ in range(items)],
+                    "actual_return_date": "2023-01-05",
+                },
+                format="json",
+            )
+            self.assertEqual(len(response.data["returned"]), items)
+
+        # inventory and stats of every book, counters of every customer
+        self.assertQueriesPerItem(3, return_books)
+        self.assertEqual(
+            Borrowing.objects.filter(actual_return_date__isnull=False).count(), 11
+        )
+
+    def test_export(self):
+        self.assertWithinQueryBudget(
+            BorrowingViewSet,
+            "export",
+            lambda: b"".join(
+                self.client.get(reverse("borrowing:borrowing-export")).streaming_content
+            ),
+        )
@@ -0,0 +1,72 @@
+from collections import Counter
+from io import StringIO
+
+from django.contrib.auth import authenticate
+from django.core.management import call_command
+from django.test import TestCase
+
+from book.search import search_books
+from ..models import Book, Borrowing, Customer
+
+
+def seed(**options):
+    call_command("seed_library", stdout=StringIO(), **options)
+
+
+class SeedLibraryTests(TestCase):
+    def test_load_fixture(self):
+        seed(fixture="library_db_data_json")
+
+        self.assertEqual(Customer.objects.count(), 2)
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(Borrowing.objects.count(), 1)
+        self.assertTrue(Customer.objects.get(email="admin@example.com").is_staff)
+
+    def test_create_synthetic_data(self):
+        seed(customers=20, books=50, borrowings=2000, password="secret123")
+
+        self.assertEqual(Customer.objects.count(), 20)
+        self.assertEqual(Book.objects.count(), 50)
+        self.assertEqual(Borrowing.objects.count(), 2000)
+        self.assertIsNotNone(
+            authenticate(email="customer0@example.com", password="secret123")
+        )
+
+    def test_borrowings_are_valid(self):
+        seed(customers=5, books=5, borrowings=500)
+
+        for borrowing in Borrowing.objects.all():
+            borrowing.validate_dates()
+
+    def test_borrowings_are_skewed_to_popular_books(self):
+        seed(customers=10, books=100, borrowings=5000)
+
+        counts = Counter(Borrowing.objects.values_list("book_id", flat=True))
+        top_books = sum(count for _, count in counts.most_common(10))
+
+        # uniform popularity would give the top 10% of books ~10%
+        self.assertGreater(top_books, 5000 * 0.4)
+
+    def test_same_seed_gives_same_data(self):
+        seed(books=10, seed=42)
+        first = list(Book.objects.order_by("id").values_list("title", flat=True))
+        Book.objects.all().delete()
+
+        seed(books=10, seed=42)
+        second = list(Book.objects.order_by("id").values_list("title", flat=True))
+
+        self.assertEqual(first, second)
+
+    def test_repeated_seed_adds_customers(self):
+        seed(customers=3)
+        seed(customers=3)
+
+        self.assertEqual(Customer.objects.count(), 6)
+
+    def test_books_are_searchable(self):
+        seed(books=20)
+        book = Book.objects.first()
+
+        results = search_books(Book.objects.all(), book.title)
+
+        self.assertIn(book, results)
@@ -1,11 +1,17 @@
+from datetime import date
 from decimal import Decimal
 
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 
 from ..models import Book, Customer, Borrowing
 from ..serializers import (
     BorrowingSerializer,
+    BorrowingListSerializer,
     BorrowingCreateSerializer,
     BorrowingReturnSerializer,
 )
@@ -69,6 +75,65 @@ class BorrowingSerializerTests(TestCase):
         self.assertDictEqual(serializer.data, payload)
 
 
+class BorrowingListSerializerTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        staff = Customer.objects.create(
+            email="staff@example.com", first_name="Ann", is_staff=True
+        )
+        book = create_book()
+        soft = Book.objects.create(
+            title="Ünïcode “title”",
+            author="Test author",
+            cover=Book.Cover.SOFT,
+            inventory=0,
+            daily_fee=Decimal("10.50"),
+        )
+        create_borrowing(book, self.user)
+        Borrowing.objects.create(
+            borrow_date="2023-01-05",
+            expected_return_date="2023-02-01",
+            actual_return_date="2023-01-20",
+            book=soft,
+            user=staff,
+        )
+        self.borrowings = Borrowing.objects.select_related("book", "user").order_by(
+            "-borrow_date", "-id"
+        )
+
+    def render(self, data) -> bytes:
+        return JSONRenderer().render(data)
+
+    def test_rows_render_like_instances(self):
+        rows = self.borrowings.values(*BorrowingListSerializer.columns)
+
+        self.assertIsInstance(BorrowingSerializer(many=True), BorrowingListSerializer)
+        self.assertEqual(
+            self.render(BorrowingSerializer(rows, many=True).data),
+            self.render(BorrowingSerializer(list(self.borrowings), many=True).data),
+        )
+
+    def test_unknown_cover_is_shown_as_is(self):
+        Book.objects.update(cover=7)
+        rows = self.borrowings.values(*BorrowingListSerializer.columns)
+
+        self.assertEqual(
+            self.render(BorrowingSerializer(rows, many=True).data),
+            self.render(BorrowingSerializer(list(self.borrowings), many=True).data),
+        )
+
+    def test_rows_need_a_single_query(self):
+        rows = self.borrowings.values(*BorrowingListSerializer.columns)
+
+        with self.assertNumQueries(1):
+            data = BorrowingSerializer(rows, many=True).data
+
+        self.assertEqual(len(data), 2)
+
+    def test_empty_list(self):
+        self.assertEqual(BorrowingSerializer([], many=True).data, [])
+
+
 class BorrowingCreateSerializerTests(TestCase):
     def setUp(self):
         self.user = create_user()
@@ -184,3 +249,76 @@ class BorrowingReturnSerializerTests(TestCase):
             "The book has already been returned by user",
             e.exception.args[0],
         )
+
+
+class BorrowingQueryCountTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.book = create_book()
+
+    def count_selects(self, func):
+        with CaptureQueriesContext(connection) as context:
+            func()
+
+        return sum(
+            query["sql"].startswith("SELECT") for query in context.captured_queries
+        )
+
+    def test_validated_save_queries_foreign_keys_and_constraints(self):
+        borrowing = Borrowing(
+            borrow_date="2023-01-01",
+            expected_return_date="2023-01-01",
+            book=self.book,
+            user=self.user,
+        )
+
+        # 2 foreign keys + 2 check constraints
+        self.assertEqual(self.count_selects(borrowing.save), 4)
+
+    def test_trusted_save_skips_validation_queries(self):
+        borrowing = Borrowing(
+            borrow_date=date(2023, 1, 1),
+            expected_return_date=date(2023, 1, 1),
+            book=self.book,
+            user=self.user,
+        )
+
+        self.assertEqual(self.count_selects(lambda: borrowing.save(validate=False)), 0)
+
+    def test_borrow_and_return_run_no_selects(self):
+        serializer = BorrowingCreateSerializer(
+            data={
+                "borrow_date": "2023-01-01",
+                "expected_return_date": "2023-01-01",
+                "book": self.book.id,
+            }
+        )
+        self.assertTrue(serializer.is_valid())
+
+        # book, customer counters, borrowing, book stats and the savepoint
+        with self.assertNumQueries(6):
+            self.assertEqual(
+                self.count_selects(lambda: serializer.save(user=self.user)), 0
+            )
+
+        serializer = BorrowingReturnSerializer(
+            serializer.instance, data={"actual_return_date": "2023-01-02"}
+        )
+        self.assertTrue(serializer.is_valid())
+
+        with self.assertNumQueries(6):
+            self.assertEqual(self.count_selects(serializer.save), 0)
+
+    def test_trusted_save_still_checks_dates(self):
+        borrowing = Borrowing(
+            borrow_date=date(2023, 1, 2),
+            expected_return_date=date(2023, 1, 1),
+            book=self.book,
+            user=self.user,
+        )
+
+        with self.assertNumQueries(0):
+            with self.assertRaises(DjangoValidationError):
+                borrowing.save(validate=False)
+
+        self.assertIsNone(borrowing.id)
@@ -0,0 +1,136 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from library.tests.query_budget import QueryTestMixin
+
+from ..serializers import BorrowingSerializer
+from .test_veiws import create_book, create_borrowing, create_user
+
+BORROWING_URL = reverse("borrowing:borrowing-list")
+
+
+def detail_url(borrowing_id):
+    return reverse("borrowing:borrowing-detail", args=[borrowing_id])
+
+
+class SparseFieldsBorrowingViewSetTests(QueryTestMixin, APITestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.book = create_book()
+        self.borrowings = [create_borrowing(self.book, self.user) for _ in range(3)]
+        self.client.force_authenticate(self.user)
+
+    def test_list_fields(self):
+        full, full_queries = self.getWithQueries(BORROWING_URL)
+        sparse, sparse_queries = self.getWithQueries(
+            BORROWING_URL, {"fields": "id,expected_return_date"}
+        )
+
+        self.assertEqual(
+            sparse.data["results"][0],
+            {"id": self.borrowings[-1].id, "expected_return_date": "2023-01-01"},
+        )
+        self.assertEqual(len(sparse_queries), len(full_queries))
+        # the last query loads the rows, a list counts them first
+        self.assertIn("book_book", full_queries[-1])
+        self.assertNotIn("book_book", sparse_queries[-1])
+        self.assertNotIn("user_customer", sparse_queries[-1])
+        # id, expected_return_date and updated_at for the ETag
+        self.assertEqual(sparse_queries.columns[-1], 3)
+        self.assertLess(sparse_queries.columns[-1], full_queries.columns[-1])
+        self.assertLess(len(sparse.content), len(full.content) / 4)
+
+    def test_list_expand(self):
+        response, queries = self.getWithQueries(BORROWING_URL, {"expand": "book"})
+        borrowing = response.data["results"][0]
+
+        self.assertEqual(borrowing["book"]["title"], "Test title")
+        self.assertEqual(borrowing["user"], self.user.id)
+        self.assertIn("book_book", queries[-1])
+        self.assertNotIn("user_customer", queries[-1])
+
+    def test_list_ids_only(self):
+        response, queries = self.getWithQueries(
+            BORROWING_URL, {"fields": "id,book", "expand": ""}
+        )
+
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"id": borrowing.id, "book": self.book.id}
+                for borrowing in reversed(self.borrowings)
+            ],
+        )
+        self.assertNotIn("book_book", queries[-1])
+
+    def test_list_fields_like_serializer(self):
+        fields = ["id", "actual_return_date", "user"]
+        response, _ = self.getWithQueries(
+            BORROWING_URL, {"fields": ",".join(fields), "expand": "user"}
+        )
+        serializer = BorrowingSerializer(
+            self.borrowings[::-1], many=True, fields=fields, expand=["user"]
+        )
+
+        self.assertEqual(response.data["results"], serializer.data)
+
+    def test_list_fields_with_keyset_pagination(self):
+        ids = []
+        params = {"fields": "id", "pagination": "cursor", "page_size": 2}
+        url = BORROWING_URL
+        while url:
+            response, queries = self.getWithQueries(url, params)
+            self.assertEqual(len(queries), 1)
+            ids += [borrowing["id"] for borrowing in response.data["results"]]
+            url, params = response.data["next"], None
+
+        self.assertEqual(ids, [borrowing.id for borrowing in reversed(self.borrowings)])
+
+    def test_retrieve_fields(self):
+        borrowing = self.borrowings[0]
+        response, queries = self.getWithQueries(
+            detail_url(borrowing.id), {"fields": "id,book,user", "expand": "user"}
+        )
+
+        self.assertEqual(response.data["book"], self.book.id)
+        self.assertEqual(response.data["user"]["email"], self.user.email)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("book_book", queries[-1])
+        self.assertIn("user_customer", queries[-1])
+
+    def test_conditional_get_with_fields(self):
+        params = {"fields": "id,book", "expand": ""}
+        etag = self.client.get(BORROWING_URL, params)["ETag"]
+
+        response = self.client.get(BORROWING_URL, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.borrowings[0].save()
+        response = self.client.get(BORROWING_URL, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_invalid_params(self):
+        response = self.client.get(
+            BORROWING_URL, {"fields": "id,fine", "expand": "book,fine"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["fields"], "Unknown fields: fine")
+        self.assertEqual(response.data["expand"], "Not expandable: fine")
+
+    def test_other_actions_ignore_fields(self):
+        response = self.client.get(
+            reverse("borrowing:borrowing-overdue"), {"fields": "unknown"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_async_retrieve_fields(self):
+        borrowing = self.borrowings[0]
+        response = self.client.get(
+            reverse("borrowing:borrowing-async-detail", args=[borrowing.id]),
+            {"fields": "id,book", "expand": ""},
+        )
+
+        self.assertEqual(response.json(), {"id": borrowing.id, "book": self.book.id})
@@ -1,16 +1,23 @@
+import json
 from decimal import Decimal
+from unittest import mock
 
 from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
+from .. import counters
 from ..models import Customer, Book, Borrowing
 from ..serializers import (
     BorrowingSerializer,
     BorrowingCreateSerializer,
     BorrowingReturnSerializer,
 )
+from ..views import BorrowingKeysetPagination
 
 
 def create_user():
@@ -61,6 +68,15 @@ class AdminBorrowingViewSetTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["results"], serializer.data)
 
+    def test_list_borrowings_renders_like_serializer(self):
+        url = reverse("borrowing:borrowing-list")
+        borrowing_list = Borrowing.objects.order_by("-borrow_date", "-id")
+        serializer = BorrowingSerializer(list(borrowing_list), many=True)
+
+        response = self.client.get(url)
+
+        self.assertIn(JSONRenderer().render(serializer.data), response.content)
+
     def test_list_borrowings_for_is_active_eq_true(self):
         url = reverse("borrowing:borrowing-list") + "?is_active=true"
         response = self.client.get(url)
@@ -240,3 +256,442 @@ class AnonymousBorrowingViewSetTests(APITestCase):
         response = self.client.post(url, data=payload)
 
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BulkBorrowingViewSetTests(APITestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.book1 = create_book()
+        self.book2 = create_book()
+        self.book2.inventory = 1
+        self.book2.save()
+
+        self.client.force_authenticate(self.user)
+        self.url = reverse("borrowing:borrowing-bulk")
+
+    def item(self, book, expected_return_date="2023-01-10"):
+        return {
+            "book": book.id,
+            "borrow_date": "2023-01-01",
+            "expected_return_date": expected_return_date,
+        }
+
+    def test_bulk_borrow(self):
+        payload = {"items": [self.item(self.book1), self.item(self.book2)]}
+        response = self.client.post(self.url, data=payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["created", "created"],
+        )
+        self.assertEqual(Borrowing.objects.filter(user=self.user).count(), 2)
+
+        self.book1.refresh_from_db()
+        self.book2.refresh_from_db()
+        self.assertEqual(self.book1.inventory, 4)
+        self.assertEqual(self.book2.inventory, 0)
+
+    def test_bulk_borrow_all_or_nothing_rolls_back(self):
+        payload = {
+            "items": [self.item(self.book1), self.item(self.book2)] * 2,
+        }
+        response = self.client.post(self.url, data=payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["results"][3]["status"], "failed")
+        self.assertEqual(Borrowing.objects.count(), 0)
+
+        self.book1.refresh_from_db()
+        self.assertEqual(self.book1.inventory, 5)
+
+    def test_bulk_borrow_partial_success(self):
+        payload = {
+            "items": [
+                self.item(self.book2),
+                self.item(self.book2),
+                self.item(self.book1, expected_return_date="2022-01-01"),
+                {"book": 999, "borrow_date": "2023-01-01"},
+            ],
+            "all_or_nothing": False,
+        }
+        response = self.client.post(self.url, data=payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["created", "failed", "failed", "failed"],
+        )
+        self.assertIn(
+            "The book is out of stock", response.data["results"][1]["errors"]["book"]
+        )
+        self.assertEqual(Borrowing.objects.count(), 1)
+
+        self.book2.refresh_from_db()
+        self.assertEqual(self.book2.inventory, 0)
+
+    def test_bulk_borrow_partial_without_success(self):
+        self.book1.inventory = 0
+        self.book1.save()
+        payload = {
+            "items": [
+                self.item(self.book1),
+                self.item(self.book2, expected_return_date="2022-01-01"),
+            ],
+            "all_or_nothing": False,
+        }
+        response = self.client.post(self.url, data=payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["failed", "failed"],
+        )
+        self.assertIn(
+            "The book is out of stock", response.data["results"][0]["errors"]["book"]
+        )
+        self.assertEqual(Borrowing.objects.count(), 0)
+
+
+class BulkReturnViewSetTests(APITestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.book1 = create_book()
+        self.book2 = create_book()
+        self.borrowings = [
+            create_borrowing(self.book1, self.user),
+            create_borrowing(self.book1, self.user),
+            create_borrowing(self.book2, self.user),
+        ]
+
+        self.client.force_authenticate(self.user)
+        self.url = reverse("borrowing:borrowing-return-bulk")
+
+    def test_bulk_return(self):
+        returned = self.borrowings[0]
+        returned.actual_return_date = "2023-01-02"
+        returned.save()
+
+        other_user = get_user_model().objects.create_user(
+            email="test2@example.com", password="pass1234"
+        )
+        foreign = create_borrowing(self.book2, other_user)
+
+        payload = {
+            "ids": [borrowing.id for borrowing in self.borrowings] + [foreign.id],
+            "actual_return_date": "2023-03-28",
+        }
+        response = self.client.post(self.url, data=payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["returned"],
+            [self.borrowings[1].id, self.borrowings[2].id],
+        )
+        self.assertEqual(response.data["already_returned"], [returned.id])
+        self.assertEqual(response.data["not_found"], [foreign.id])
+
+        self.assertFalse(
+            Borrowing.objects.filter(
+                user=self.user, actual_return_date__isnull=True
+            ).exists()
+        )
+        self.book1.refresh_from_db()
+        self.book2.refresh_from_db()
+        self.assertEqual(self.book1.inventory, 6)
+        self.assertEqual(self.book2.inventory, 6)
+
+    def test_bulk_return_before_borrow_date_is_invalid(self):
+        payload = {
+            "ids": [self.borrowings[0].id],
+            "actual_return_date": "2022-01-01",
+        }
+        response = self.client.post(self.url, data=payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["invalid"], [self.borrowings[0].id])
+        self.assertEqual(response.data["returned"], [])
+
+    def test_bulk_return_racing_single_return(self):
+        racing = self.borrowings[0]
+        is_overdue = counters.is_overdue
+        raced = []
+
+        def return_concurrently(expected_return_date):
+            # select_for_update() doesn't lock on SQLite, the single return
+            # lands between the read of the rows and their UPDATE
+            if not raced:
+                raced.append(racing.id)
+                serializer = BorrowingReturnSerializer(
+                    Borrowing.objects.get(id=racing.id),
+                    data={"actual_return_date": "2023-03-27"},
+                )
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+
+            return is_overdue(expected_return_date)
+
+        payload = {
+            "ids": [borrowing.id for borrowing in self.borrowings],
+            "actual_return_date": "2023-03-28",
+        }
+        with mock.patch(
+            "borrowing.serializers.counters.is_overdue",
+            side_effect=return_concurrently,
+        ):
+            response = self.client.post(self.url, data=payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["returned"],
+            [self.borrowings[1].id, self.borrowings[2].id],
+        )
+        self.assertEqual(response.data["already_returned"], [racing.id])
+        self.book1.refresh_from_db()
+        # once by the single return, once by the bulk one
+        self.assertEqual(self.book1.inventory, 7)
+        racing.refresh_from_db()
+        self.assertEqual(str(racing.actual_return_date), "2023-03-27")
+
+
+class KeysetPaginationBorrowingViewSetTests(APITestCase):
+    def setUp(self):
+        self.user = create_user()
+        book = create_book()
+        for borrow_date in ["2023-01-02", "2023-01-01", "2023-01-02", "2023-01-03"]:
+            Borrowing.objects.create(
+                borrow_date=borrow_date,
+                expected_return_date="2023-02-01",
+                book=book,
+                user=self.user,
+            )
+
+        self.client.force_authenticate(self.user)
+
+    def test_walk_all_pages_in_list_order(self):
+        expected = list(
+            Borrowing.objects.order_by("-borrow_date", "-id").values_list(
+                "id", flat=True
+            )
+        )
+
+        ids = []
+        url = reverse("borrowing:borrowing-list") + "?pagination=cursor&page_size=1"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            ids += [borrowing["id"] for borrowing in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertEqual(ids, expected)
+
+    def test_tampered_cursor(self):
+        paginator = BorrowingKeysetPagination()
+        for values in [
+            ["abc", 1],
+            ["2024-01-01", "x"],
+            [{"date": "2024-01-01"}, 1],
+            ["2024-01-01", None],
+        ]:
+            with self.subTest(values=values):
+                response = self.client.get(
+                    reverse("borrowing:borrowing-list"),
+                    {"cursor": paginator.encode_cursor(values)},
+                )
+
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ConditionalGetBorrowingViewSetTests(APITestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.book = create_book()
+        self.borrowing = create_borrowing(self.book, self.user)
+        self.client.force_authenticate(self.user)
+
+    def test_list_304_until_nested_book_changes(self):
+        url = reverse("borrowing:borrowing-list")
+        etag = self.client.get(url)["ETag"]
+
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+
+        # nested book is part of the representation
+        self.book.inventory = 3
+        self.book.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["book"]["inventory"], 3)
+
+    def test_retrieve_304_until_returned(self):
+        url = reverse("borrowing:borrowing-detail", args=[self.borrowing.id])
+        etag = self.client.get(url)["ETag"]
+
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+
+        self.client.post(
+            reverse("borrowing:borrowing-return", args=[self.borrowing.id]),
+            {"actual_return_date": "2023-01-02"},
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["actual_return_date"], "2023-01-02")
+
+
+class AsyncBorrowingViewTests(APITestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.book = create_book()
+        self.borrowing = create_borrowing(self.book, self.user)
+
+        self.other_user = Customer.objects.create(
+            email="other@example.com", password="pass1234"
+        )
+        create_borrowing(self.book, self.other_user)
+
+    def test_list_borrowings_of_user(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse("borrowing:borrowing-async-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()["results"], [BorrowingSerializer(self.borrowing).data]
+        )
+
+    def test_list_matches_sync_list(self):
+        admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="pass1234"
+        )
+        self.client.force_authenticate(admin)
+
+        for params in ({}, {"is_active": "true"}, {"user_id": self.user.id}):
+            response = self.client.get(reverse("borrowing:borrowing-list"), params)
+            async_response = self.client.get(
+                reverse("borrowing:borrowing-async-list"), params
+            )
+
+            self.assertEqual(async_response.json()["count"], response.data["count"])
+            self.assertEqual(async_response.json()["results"], response.data["results"])
+
+    def test_retrieve_borrowing_of_other_user(self):
+        self.client.force_authenticate(self.other_user)
+        url = reverse("borrowing:borrowing-async-detail", args=[self.borrowing.id])
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unauthenticated(self):
+        response = self.client.get(reverse("borrowing:borrowing-async-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class NativeAsyncBorrowingViewTests(TransactionTestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.borrowing = create_borrowing(create_book(), self.user)
+        self.token = str(AccessToken.for_user(self.user))
+
+    async def test_retrieve_borrowing_with_token(self):
+        url = reverse("borrowing:borrowing-async-detail", args=[self.borrowing.id])
+        response = await self.async_client.get(
+            url, headers={"Authorization": f"Bearer {self.token}"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["id"], self.borrowing.id)
+
+
+class ExportBorrowingViewSetTests(APITestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.book = create_book()
+        self.borrowing = create_borrowing(self.book, self.user)
+        self.returned = create_borrowing(self.book, self.user)
+        self.returned.actual_return_date = "2023-01-02"
+        self.returned.save()
+
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="pass1234"
+        )
+        self.client.force_authenticate(self.admin)
+        self.url = reverse("borrowing:borrowing-export")
+
+    def get_content(self, params=None) -> str:
+        response = self.client.get(self.url, params or {})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b"".join(response.streaming_content).decode()
+
+    def test_export_csv(self):
+        content = self.get_content()
+
+        self.assertEqual(
+            content.splitlines(),
+            [
+                "id,borrow_date,expected_return_date,actual_return_date,book_id,"
+                "book_title,book_author,book_daily_fee,user_id,user_email",
+                f"{self.returned.id},2023-01-01,2023-01-01,2023-01-02,"
+                f"{self.book.id},Test title,Test author,5.00,"
+                f"{self.user.id},test@example.com",
+                f"{self.borrowing.id},2023-01-01,2023-01-01,,"
+                f"{self.book.id},Test title,Test author,5.00,"
+                f"{self.user.id},test@example.com",
+            ],
+        )
+
+    def test_export_ndjson(self):
+        content = self.get_content({"output": "ndjson"})
+        rows = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual(
+            rows[1],
+            {
+                "id": self.borrowing.id,
+                "borrow_date": "2023-01-01",
+                "expected_return_date": "2023-01-01",
+                "actual_return_date": None,
+                "book_id": self.book.id,
+                "book_title": "Test title",
+                "book_author": "Test author",
+                "book_daily_fee": "5.00",
+                "user_id": self.user.id,
+                "user_email": "test@example.com",
+            },
+        )
+        self.assertEqual(len(rows), 2)
+
+    def test_export_respects_filters(self):
+        create_borrowing(self.book, self.admin)
+
+        content = self.get_content(
+            {"output": "ndjson", "is_active": "true", "user_id": self.user.id}
+        )
+        ids = [json.loads(line)["id"] for line in content.splitlines()]
+
+        self.assertEqual(ids, [self.borrowing.id])
+
+    def test_export_runs_single_query(self):
+        for _ in range(10):
+            create_borrowing(self.book, self.user)
+
+        with self.assertNumQueries(1):
+            self.get_content()
+
+    def test_export_unsupported_format(self):
+        response = self.client.get(self.url, {"output": "xml"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_for_user(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
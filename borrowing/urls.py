@@ -1,10 +1,15 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from borrowing.views import BorrowingViewSet
+from borrowing.views import BorrowingAsyncView, BorrowingViewSet
 
 app_name = "borrowing"
 
 router = DefaultRouter()
 router.register("", BorrowingViewSet)
 
-urlpatterns = router.urls
+urlpatterns = [
+    # before the router, its detail route would match "async"
+    path("async/", BorrowingAsyncView.as_view(), name="borrowing-async-list"),
+    path("async/<pk>/", BorrowingAsyncView.as_view(), name="borrowing-async-detail"),
+] + router.urls
@@ -1,13 +1,14 @@
+from django.http import StreamingHttpResponse
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import (
     extend_schema,
     OpenApiParameter,
     extend_schema_view,
 )
-from rest_framework import viewsets, mixins
+from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
 from borrowing.models import Borrowing
@@ -15,12 +16,64 @@ from borrowing.serializers import (
     BorrowingSerializer,
     BorrowingCreateSerializer,
     BorrowingReturnSerializer,
+    BorrowingBulkCreateSerializer,
+    BorrowingBulkReturnSerializer,
+    BorrowingExportSerializer,
+    OverdueBorrowingSerializer,
 )
+from library.async_views import AsyncReadOnlyView
+from library.conditional import ConditionalGetMixin
+from library.metrics import SerializerTimingMixin
+from library.pagination import (
+    KeysetPagination,
+    KeysetPaginationMixin,
+    ValuesPagination,
+)
+from library.replicas import ReplicaReadsMixin
+from library.sparse_fields import SparseFieldsMixin
+
+
+class BorrowingPagination(ValuesPagination):
+    page_size = 10
+    max_page_size = 100
+    page_size_query_param = "page_size"
+
+
+FILTER_PARAMETERS = [
+    OpenApiParameter(
+        "is_active",
+        type=OpenApiTypes.BOOL,
+        description=("Filter by state of borrowed book (ex. ?is_active=true)"),
+    ),
+    OpenApiParameter(
+        "user_id",
+        type=OpenApiTypes.INT,
+        description=("Filter by user id (for admins only) (ex. ?user_id=1)"),
+    ),
+]
+
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        type=OpenApiTypes.STR,
+        description="Comma separated fields to return, all by default "
+        "(ex. ?fields=id,expected_return_date)",
+    ),
+    OpenApiParameter(
+        "expand",
+        type=OpenApiTypes.STR,
+        description="Relations to return as nested objects, the others are "
+        "returned as ids, book and user by default (ex. ?expand=book, "
+        "?expand= for ids only)",
+    ),
+]
 
 
-class BorrowingPagination(PageNumberPagination):
+class BorrowingKeysetPagination(KeysetPagination):
     page_size = 10
     max_page_size = 100
+    ordering = ("-borrow_date", "-id")
 
 
 @extend_schema_view(
@@ -31,6 +84,7 @@ class BorrowingPagination(PageNumberPagination):
     retrieve=extend_schema(
         summary="Retrieve borrowing",
         description="Retrieve a specific borrowing",
+        parameters=SPARSE_FIELDS_PARAMETERS,
     ),
     create=extend_schema(
         summary="Create borrowing", description="Create a new borrowing"
@@ -38,8 +92,46 @@ class BorrowingPagination(PageNumberPagination):
     return_book=extend_schema(
         summary="Return borrowing", description="Return a borrowed book"
     ),
+    bulk_borrow=extend_schema(
+        summary="Create borrowings in bulk",
+        description="Borrow several books in a single transaction. "
+        "With all_or_nothing=false the available books are borrowed "
+        "and the rest are reported as failed, a 400 when none is borrowed",
+    ),
+    bulk_return=extend_schema(
+        summary="Return borrowings in bulk",
+        description="Return several borrowed books at once. Borrowings "
+        "that were already returned or not found are reported separately",
+    ),
+    overdue=extend_schema(
+        summary="Overdue borrowings",
+        description="Borrowings returned late or still out past the expected "
+        "return date, with overdue days and fines as of the last run of "
+        "the compute_fines job (?is_active=true for books still out)",
+        parameters=FILTER_PARAMETERS,
+    ),
+    export=extend_schema(
+        summary="Export borrowings",
+        description="Stream all borrowings (with the list filters applied) "
+        "as CSV or NDJSON, one flat row per borrowing (for admins only)",
+        parameters=FILTER_PARAMETERS
+        + [
+            OpenApiParameter(
+                "output",
+                type=OpenApiTypes.STR,
+                enum=list(BorrowingExportSerializer.content_types),
+                description="Export format, csv by default (ex. ?output=ndjson)",
+            ),
+        ],
+        responses={(200, "text/csv"): OpenApiTypes.STR},
+    ),
 )
 class BorrowingViewSet(
+    SerializerTimingMixin,
+    ReplicaReadsMixin,
+    SparseFieldsMixin,
+    ConditionalGetMixin,
+    KeysetPaginationMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
@@ -51,6 +143,19 @@ class BorrowingViewSet(
     serializer_class = BorrowingSerializer
     permission_classes = (IsAuthenticated,)
     pagination_class = BorrowingPagination
+    keyset_pagination_class = BorrowingKeysetPagination
+    # nested book and user are part of the representation
+    version_fields = ("updated_at", "book.updated_at", "user.updated_at")
+    # see library.query_budget, bulk actions have no budget: they update
+    # inventory and stats once per book and counters once per customer
+    query_budget = {
+        "list": 2,
+        "retrieve": 1,
+        "create": 7,
+        "return_book": 7,
+        "overdue": 2,
+        "export": 1,
+    }
 
     def get_queryset(self):
         def to_bool(value: str) -> bool:
@@ -62,10 +167,17 @@ class BorrowingViewSet(
             return valid_values.get(str(value).lower())
 
         queryset = self.queryset
+        if self.action == "overdue":
+            # book and user are shown as ids
+            queryset = (
+                Borrowing.objects.select_related("fine")
+                .filter(fine__isnull=False)
+                .order_by("-borrow_date", "-id")
+            )
 
         """Filters for list of borrowings"""
         if not self.request.user.is_staff:
-            queryset = queryset.filter(user=self.request.user)
+            queryset = queryset.filter(user_id=self.request.user.id)
 
         is_active = to_bool(self.request.query_params.get("is_active"))
         if is_active is not None:
@@ -75,18 +187,32 @@ class BorrowingViewSet(
         if user_id is not None and user_id.isdigit() and self.request.user.is_staff:
             queryset = queryset.filter(user_id=int(user_id))
 
-        return queryset
+        if self.action == "list":
+            # rows for the flat path of BorrowingListSerializer, counted
+            # without the joins of values() (see ValuesPagination)
+            self.count_queryset = queryset
+            columns = self.get_serializer(many=True).get_columns()
+            columns += self.get_cursor_fields()
+            return queryset.values(*dict.fromkeys(columns))
+
+        return self.get_sparse_queryset(queryset)
 
     def get_serializer_class(self):
         if self.action == "create":
             return BorrowingCreateSerializer
         elif self.action == "return_book":
             return BorrowingReturnSerializer
+        elif self.action == "bulk_borrow":
+            return BorrowingBulkCreateSerializer
+        elif self.action == "bulk_return":
+            return BorrowingBulkReturnSerializer
+        elif self.action == "overdue":
+            return OverdueBorrowingSerializer
 
         return BorrowingSerializer
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(user_id=self.request.user.id)
 
     @action(
         methods=["POST"],
@@ -104,19 +230,88 @@ class BorrowingViewSet(
 
         return Response(serializer.data)
 
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="bulk",
+        url_name="bulk",
+    )
+    def bulk_borrow(self, request):
+        """Endpoint for borrowing several books at once"""
+        serializer = self.get_serializer(data=request.data)
+
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user_id=self.request.user.id)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="return/bulk",
+        url_name="return-bulk",
+    )
+    def bulk_return(self, request):
+        """Endpoint for returning several borrowings at once"""
+        serializer = self.get_serializer(data=request.data)
+
+        serializer.is_valid(raise_exception=True)
+        serializer.save(queryset=self.get_queryset())
+
+        return Response(serializer.data)
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="overdue",
+        url_name="overdue",
+    )
+    def overdue(self, request):
+        """Endpoint for overdue borrowings with their fines"""
+        # paginated and with ETags like the list, the fine is what changes
+        self.version_fields = ("updated_at", "fine.updated_at")
+        return self.list(request)
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="export",
+        url_name="export",
+        permission_classes=[IsAdminUser],
+    )
+    def export(self, request):
+        """Endpoint for streaming all borrowings as CSV or NDJSON"""
+        # not ?format=, DRF uses it to pick a renderer
+        output = request.query_params.get("output", "csv")
+        if output not in BorrowingExportSerializer.content_types:
+            raise ValidationError({"output": f"Unsupported format: {output}"})
+
+        serializer = BorrowingExportSerializer(self.get_queryset(), output)
+        response = StreamingHttpResponse(
+            serializer.stream(), content_type=serializer.content_type
+        )
+        response["Content-Disposition"] = f'attachment; filename="borrowings.{output}"'
+
+        return response
+
     @extend_schema(
-        parameters=[
-            OpenApiParameter(
-                "is_active",
-                type=OpenApiTypes.BOOL,
-                description=("Filter by state of borrowed book (ex. ?is_active=true)"),
-            ),
+        parameters=FILTER_PARAMETERS
+        + [
             OpenApiParameter(
-                "user_id",
-                type=OpenApiTypes.INT,
-                description=("Filter by user id (for admins only) (ex. ?user_id=1)"),
+                "pagination",
+                type=OpenApiTypes.STR,
+                enum=["cursor"],
+                description="Use keyset pagination: no total count, follow "
+                "the next link to get the following page (ex. ?pagination=cursor)",
             ),
         ]
+        + SPARSE_FIELDS_PARAMETERS
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
+
+
+class BorrowingAsyncView(AsyncReadOnlyView):
+    """Native async list and retrieve of borrowings, for ASGI deployments"""
+
+    viewset_class = BorrowingViewSet
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class LibraryConfig(AppConfig):
+    name = "library"
+
+    def ready(self):
+        from library.database import apply_pragmas
+        from library.metrics import instrument_connection
+
+        connection_created.connect(apply_pragmas)
+        connection_created.connect(instrument_connection)
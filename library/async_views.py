@@ -0,0 +1,118 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Page
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from library.replicas import ReplicaReadsMixin
+
+
+class AsyncReadOnlyView(View):
+    """
+    Native async list and retrieve for the GET endpoints of a viewset.
+
+    DRF views are synchronous, under ASGI every request to them holds a
+    thread for its whole duration. This view keeps the viewset for
+    everything else (authentication, permissions, throttling, filters,
+    serializers, renderers) and loads rows with the async ORM (acount,
+    aiterator, aget). viewset.initial() reads the cache and, for admin
+    tokens, the database, it runs in a thread (sync_to_async()).
+
+    Only page number pagination is supported, responses are not cached
+    and carry no ETag.
+    """
+
+    viewset_class = None
+
+    async def get(self, request, pk=None):
+        action = "list" if pk is None else "retrieve"
+        viewset = self.viewset_class(
+            action_map={"get": action},
+            args=(),
+            kwargs={} if pk is None else {"pk": pk},
+            format_kwarg=None,
+        )
+        request = viewset.initialize_request(request)
+        viewset.request = request
+        viewset.headers = viewset.default_response_headers
+
+        try:
+            # throttling and the replica pin read the cache (Redis with
+            # REDIS_URL) and admin tokens load the customer, in a thread
+            # instead of blocking the event loop
+            viewset.defer_use_replica = True
+            await sync_to_async(viewset.initial)(request)
+            if isinstance(viewset, ReplicaReadsMixin):
+                viewset.use_replica()
+            if action == "list":
+                response = await self.list(viewset, request)
+            else:
+                response = await self.retrieve(viewset, request, pk)
+        except Exception as exc:
+            response = viewset.handle_exception(exc)
+
+        return self.render(viewset, request, response)
+
+    async def list(self, viewset, request):
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        # keyset pagination iterates the queryset synchronously
+        paginator = viewset.pagination_class()
+        page_size = paginator.get_page_size(request)
+
+        django_paginator = paginator.django_paginator_class(queryset, page_size)
+        # the synchronous count would run in Paginator.count, rows of
+        # values() are counted without their joins (see ValuesPagination)
+        count_queryset = getattr(viewset, "count_queryset", None)
+        if count_queryset is None:
+            count_queryset = queryset
+        django_paginator.count = await count_queryset.acount()
+        try:
+            number = django_paginator.validate_number(
+                paginator.get_page_number(request, django_paginator)
+            )
+        except InvalidPage as exc:
+            raise NotFound(
+                paginator.invalid_page_message.format(
+                    page_number=request.query_params.get(paginator.page_query_param),
+                    message=str(exc),
+                )
+            )
+
+        bottom = (number - 1) * page_size
+        objects = [
+            obj async for obj in queryset[bottom : bottom + page_size].aiterator()
+        ]
+
+        paginator.page = Page(objects, number, django_paginator)
+        paginator.request = request
+        serializer = viewset.get_serializer(objects, many=True)
+
+        return paginator.get_paginated_response(serializer.data)
+
+    async def retrieve(self, viewset, request, pk):
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        try:
+            instance = await queryset.aget(**{viewset.lookup_field: pk})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+
+        viewset.check_object_permissions(request, instance)
+        serializer = viewset.get_serializer(instance)
+
+        return Response(serializer.data)
+
+    def render(self, viewset, request, response) -> HttpResponse:
+        """
+        Rendered copy of the DRF response, Django would render a template
+        response in a thread otherwise
+        """
+        response = viewset.finalize_response(request, response)
+        response.render()
+
+        rendered = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+
+        return rendered
@@ -0,0 +1,98 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETag for list and retrieve responses, plus Last-Modified for
+    retrieve. Both come from the updated_at columns of the rows being
+    shown (version_fields), not from the rendered body, so a matching
+    If-None-Match / If-Modified-Since is answered with 304 before the
+    serializer runs.
+
+    Lists get no Last-Modified: removing a row doesn't move any
+    updated_at forward, only the ETag (which includes the count) notices.
+    """
+
+    version_fields = ("updated_at",)
+
+    def get_versions(self, obj) -> list:
+        # rows of values(), e.g. {"book__updated_at": ...} for book.updated_at
+        if isinstance(obj, dict):
+            return [obj[field.replace(".", "__")] for field in self.version_fields]
+
+        versions = []
+        for field in self.version_fields:
+            value = obj
+            for attr in field.split("."):
+                value = getattr(value, attr, None)
+            versions.append(value)
+
+        return versions
+
+    @staticmethod
+    def get_pk(obj):
+        return obj["id"] if isinstance(obj, dict) else obj.pk
+
+    def get_etag(self, *parts) -> str:
+        # representation depends on the URL and on the chosen renderer
+        data = repr(
+            (self.request.get_full_path(), self.request.accepted_media_type, parts)
+        )
+        return '"%s"' % hashlib.sha1(data.encode()).hexdigest()
+
+    def get_not_modified_response(self, etag, last_modified=None):
+        """304 (or 412) response if the client already has this version"""
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            return self.set_validators(
+                Response(status=response.status_code), etag, last_modified
+            )
+
+    def set_validators(self, response, etag, last_modified=None):
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = page if page is not None else list(queryset)
+
+        etag = self.get_etag(
+            # count and links of the page, without running the serializer
+            page is not None and self.get_paginated_response([]).data,
+            [(self.get_pk(obj), self.get_versions(obj)) for obj in objects],
+        )
+        not_modified = self.get_not_modified_response(etag)
+        if not_modified is not None:
+            return not_modified
+
+        serializer = self.get_serializer(objects, many=True)
+        if page is not None:
+            response = self.get_paginated_response(serializer.data)
+        else:
+            response = Response(serializer.data)
+
+        return self.set_validators(response, etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        versions = self.get_versions(instance)
+
+        etag = self.get_etag(instance.pk, versions)
+        last_modified = max(filter(None, versions), default=None)
+        last_modified = last_modified and int(last_modified.timestamp())
+        not_modified = self.get_not_modified_response(etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        serializer = self.get_serializer(instance)
+        return self.set_validators(Response(serializer.data), etag, last_modified)
@@ -0,0 +1,104 @@
+"""
+Database settings from the environment (see .env.sample).
+
+SQLite is the default: the file next to manage.py, tuned by PRAGMAs run
+on every new connection (PRAGMAS of the database settings). WAL lets
+readers work while a request writes, synchronous=NORMAL only syncs at
+checkpoints (still safe with WAL), mmap saves a copy on reads and
+busy_timeout makes writers wait for the lock instead of failing.
+
+DB_ENGINE=postgresql switches to PostgreSQL with persistent connections
+(CONN_MAX_AGE) checked before reuse (CONN_HEALTH_CHECKS). DB_POOL_SIZE
+adds an in-process pool on top, Django 4.2 has none of its own; it
+needs the django-db-connection-pool package, like REDIS_URL needs redis.
+
+Read replicas (see library.replicas) share the settings of the primary
+and get aliases replica1, replica2, ...: the servers of
+POSTGRES_REPLICA_HOSTS or, for SQLite, the files of SQLITE_REPLICA_NAMES
+(copies kept up to date by other means, e.g. LiteFS).
+"""
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    # milliseconds
+    "busy_timeout": 5000,
+}
+
+
+def get_database(environ, base_dir) -> dict:
+    """Settings of the default database"""
+    if environ.get("DB_ENGINE", "sqlite") == "postgresql":
+        return get_postgresql(environ)
+
+    return get_sqlite(environ, base_dir)
+
+
+def get_replicas(environ, primary) -> dict:
+    """Settings of the read replicas by alias"""
+    if primary["ENGINE"] == "django.db.backends.sqlite3":
+        key, values = "NAME", environ.get("SQLITE_REPLICA_NAMES", "")
+    else:
+        key, values = "HOST", environ.get("POSTGRES_REPLICA_HOSTS", "")
+
+    return {
+        f"replica{number}": {**primary, key: value.strip()}
+        for number, value in enumerate(filter(None, values.split(",")), 1)
+    }
+
+
+def get_sqlite(environ, base_dir) -> dict:
+    database = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": environ.get("SQLITE_NAME", base_dir / "db.sqlite3"),
+        "PRAGMAS": {},
+    }
+    if environ.get("SQLITE_TUNING", "true").lower() == "true":
+        database["PRAGMAS"] = SQLITE_PRAGMAS
+
+    return database
+
+
+def get_postgresql(environ) -> dict:
+    database = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": environ.get("POSTGRES_DB", "library"),
+        "USER": environ.get("POSTGRES_USER", "library"),
+        "PASSWORD": environ.get("POSTGRES_PASSWORD", ""),
+        "HOST": environ.get("POSTGRES_HOST", "127.0.0.1"),
+        "PORT": environ.get("POSTGRES_PORT", "5432"),
+        # seconds to keep a connection between requests, 0 closes it
+        "CONN_MAX_AGE": int(environ.get("DB_CONN_MAX_AGE", 60)),
+        # a connection the server dropped is replaced, not reused
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {"connect_timeout": 5},
+    }
+
+    pool_size = int(environ.get("DB_POOL_SIZE", 0))
+    if pool_size:
+        database["ENGINE"] = "dj_db_conn_pool.backends.postgresql"
+        database["POOL_OPTIONS"] = {
+            "POOL_SIZE": pool_size,
+            "MAX_OVERFLOW": int(environ.get("DB_POOL_MAX_OVERFLOW", pool_size)),
+            # seconds to wait for a free connection
+            "TIMEOUT": 10,
+            "RECYCLE": 15 * 60,
+            "PRE_PING": True,
+        }
+        # closing a connection gives it back to the pool
+        database["CONN_MAX_AGE"] = 0
+
+    return database
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """
+    Run the PRAGMAS of a SQLite database on every new connection,
+    connected to connection_created by LibraryConfig
+    """
+    if connection.vendor != "sqlite":
+        return
+
+    for name, value in connection.settings_dict.get("PRAGMAS", {}).items():
+        # on the DB-API connection, so they don't count as queries
+        connection.connection.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,344 @@
+"""
+Per-request timings of the API for production use.
+
+A sample of requests (METRICS_SAMPLE_RATE) is instrumented: queries are
+counted and timed by record_query(), an execute wrapper of every
+connection that reports to the metrics of the current request (a
+context variable, so it works in sync views as well as in the threads
+the async ORM runs in), rendering is timed from
+process_template_response() to a post-render callback, and
+serializer.data of views with SerializerTimingMixin is timed without the
+queries it runs (lazy querysets of related rows). Results go
+to the Server-Timing header of the response and to in-process
+histograms per view and action (e.g. BorrowingViewSet.return_book),
+served in the Prometheus text format by MetricsView. Requests that
+aren't sampled cost a random() call and a context variable lookup per
+query. Sampled requests over the
+query budget of their view (library.query_budget) log a warning.
+
+"app" is what is left: the view without its serializers and queries,
+middleware, authentication. "render" is turning the data into JSON.
+Histograms live in the process: every worker has its own, like the
+Prometheus client without multiprocess mode.
+"""
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.decorators import sync_and_async_middleware
+from drf_spectacular.utils import extend_schema
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+from library.query_budget import get_query_budget
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Cumulative histogram with a single "view" label"""
+
+    def __init__(self, name: str, documentation: str, buckets: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # view: [count per bucket (+Inf last), sum]
+        self.values = {}
+
+    def observe(self, view: str, value: float) -> None:
+        with self.lock:
+            counts, total = self.values.setdefault(
+                view, ([0] * (len(self.buckets) + 1), [0])
+            )
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def clear(self) -> None:
+        with self.lock:
+            self.values.clear()
+
+    def render(self) -> list:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self.lock:
+            values = {
+                view: (list(counts), total[0])
+                for view, (counts, total) in self.values.items()
+            }
+
+        for view, (counts, total) in sorted(values.items()):
+            label = view.replace("\\", "\\\\").replace('"', '\\"')
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{view="{label}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{self.name}_sum{{view="{label}"}} {total}')
+            lines.append(f'{self.name}_count{{view="{label}"}} {cumulative}')
+
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    "library_request_duration_seconds",
+    "Total time of sampled requests",
+    DURATION_BUCKETS,
+)
+DB_DURATION = Histogram(
+    "library_db_duration_seconds",
+    "Time spent in SQL queries per sampled request",
+    DURATION_BUCKETS,
+)
+RENDER_DURATION = Histogram(
+    "library_render_duration_seconds",
+    "Time spent rendering responses of sampled requests",
+    DURATION_BUCKETS,
+)
+SERIALIZER_DURATION = Histogram(
+    "library_serializer_duration_seconds",
+    "Time spent in serializer.data (without queries) per sampled request",
+    DURATION_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "library_db_queries",
+    "Number of SQL queries per sampled request",
+    QUERY_BUCKETS,
+)
+HISTOGRAMS = (
+    REQUEST_DURATION,
+    DB_DURATION,
+    SERIALIZER_DURATION,
+    RENDER_DURATION,
+    DB_QUERIES,
+)
+
+# metrics of the sampled request being served, the context follows the
+# request into the threads of the async ORM
+current_metrics = ContextVar("current_metrics", default=None)
+
+
+def resolve_view(view_func, method: str) -> tuple:
+    """
+    Name of a view (ViewSet.action for viewsets, class or function name
+    otherwise) and its query budget
+    """
+    cls = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+    if cls is None:
+        return f"{view_func.__module__}.{view_func.__name__}", None
+
+    action = (getattr(view_func, "actions", None) or {}).get(method.lower())
+    if action:
+        return f"{cls.__name__}.{action}", get_query_budget(cls, action)
+
+    return cls.__name__, get_query_budget(cls, method.lower())
+
+
+class RequestMetrics:
+    """Timings of a single sampled request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.view = "unresolved"
+        self.query_budget = None
+        self.queries = 0
+        self.db = 0.0
+        self.render_start = None
+        self.render = 0.0
+        self.serializer = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+    def rendered(self, response) -> None:
+        self.render = time.perf_counter() - self.render_start
+
+    def server_timing(self, total: float) -> str:
+        app = max(total - self.db - self.serializer - self.render, 0)
+        return ", ".join(
+            [
+                f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries"',
+                f"serializer;dur={self.serializer * 1000:.2f}",
+                f"app;dur={app * 1000:.2f}",
+                f"render;dur={self.render * 1000:.2f}",
+                f"total;dur={total * 1000:.2f}",
+            ]
+        )
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    return metrics(execute, sql, params, many, context)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """
+    Add record_query() to the execute wrappers of every connection (the
+    primary and the replicas, in any thread), connected to
+    connection_created by LibraryConfig
+    """
+    if record_query not in connection.execute_wrappers:
+        # outermost, execute_wrapper() contexts pop the last one
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@sync_and_async_middleware
+class MetricsMiddleware:
+    """
+    Runs in the mode of the handler: under ASGI with async middleware
+    after it, requests (and the native async views) don't go through a
+    thread for it
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # hooks of an async handler, sync ones would run in a thread
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+
+        request.metrics = metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+
+        return self.observe(request, response, metrics)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return await self.get_response(request)
+
+        request.metrics = metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+
+        return self.observe(request, response, metrics)
+
+    @staticmethod
+    def observe(request, response, metrics):
+        total = time.perf_counter() - metrics.start
+
+        response["Server-Timing"] = metrics.server_timing(total)
+        REQUEST_DURATION.observe(metrics.view, total)
+        DB_DURATION.observe(metrics.view, metrics.db)
+        SERIALIZER_DURATION.observe(metrics.view, metrics.serializer)
+        RENDER_DURATION.observe(metrics.view, metrics.render)
+        DB_QUERIES.observe(metrics.view, metrics.queries)
+        if metrics.query_budget is not None and metrics.queries > metrics.query_budget:
+            logger.warning(
+                "%s ran %d queries, budget is %d: %s",
+                metrics.view,
+                metrics.queries,
+                metrics.query_budget,
+                request.get_full_path(),
+            )
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = getattr(request, "metrics", None)
+        if metrics is not None:
+            metrics.view, metrics.query_budget = resolve_view(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        metrics = getattr(request, "metrics", None)
+        if metrics is not None:
+            metrics.render_start = time.perf_counter()
+            response.add_post_render_callback(metrics.rendered)
+
+        return response
+
+    # the async hooks shadow the sync ones on the instance
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return MetricsMiddleware.process_view(
+            self, request, view_func, view_args, view_kwargs
+        )
+
+    async def aprocess_template_response(self, request, response):
+        return MetricsMiddleware.process_template_response(self, request, response)
+
+
+class TimedSerializer:
+    """Serializer of a sampled request, times serializer.data"""
+
+    def __init__(self, serializer, metrics: RequestMetrics):
+        self.serializer = serializer
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self.serializer, name)
+
+    @property
+    def data(self):
+        start, db = time.perf_counter(), self.metrics.db
+        try:
+            return self.serializer.data
+        finally:
+            self.metrics.serializer += (
+                time.perf_counter() - start - (self.metrics.db - db)
+            )
+
+
+class SerializerTimingMixin:
+    """Times serializer.data of the sampled requests of a generic view"""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        metrics = getattr(self.request, "metrics", None)
+        # drf-spectacular inspects the serializer itself
+        if metrics is None or getattr(self, "swagger_fake_view", False):
+            return serializer
+
+        return TimedSerializer(serializer, metrics)
+
+
+class MetricsView(APIView):
+    """Histograms of the sampled requests in the Prometheus text format"""
+
+    permission_classes = (IsAdminUser,)
+    throttle_classes = ()
+
+    @extend_schema(exclude=True)
+    def get(self, request):
+        lines = []
+        for histogram in HISTOGRAMS:
+            lines.extend(histogram.render())
+
+        return HttpResponse(
+            "\n".join(lines) + "\n",
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
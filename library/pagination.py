@@ -0,0 +1,215 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class ValuesPaginator(Paginator):
+    """
+    Paginator of queryset.values(*fields) rows: related fields make values()
+    join their tables, and COUNT(*) would keep the joins (and miss the
+    indexes), so the rows are counted with count_queryset, the queryset
+    as it was before values()
+    """
+
+    def __init__(self, object_list, per_page, *args, count_queryset=None, **kwargs):
+        super().__init__(object_list, per_page, *args, **kwargs)
+        self.count_queryset = count_queryset
+
+    @cached_property
+    def count(self):
+        if self.count_queryset is None:
+            return super().count
+
+        return self.count_queryset.count()
+
+
+class ValuesPagination(PageNumberPagination):
+    """
+    Page number pagination of values() rows, a view that returns them
+    from get_queryset() keeps the queryset before values() in
+    count_queryset
+    """
+
+    count_queryset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_queryset = getattr(view, "count_queryset", None)
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, queryset, page_size):
+        return ValuesPaginator(queryset, page_size, count_queryset=self.count_queryset)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination: every page continues right after the last
+    row of the previous one, so there is no COUNT(*) and no OFFSET, and
+    deep pages cost the same as the first one.
+    The ordering must end with a unique field and should match an index,
+    fields of related rows (e.g. stats__borrowed_total) must be loaded with
+    select_related().
+    Only forward navigation is supported.
+    """
+
+    page_size = 10
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    ordering = ("id",)
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = [
+            (field.lstrip("-"), field.startswith("-")) for field in self.ordering
+        ]
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            values = self.decode_cursor(cursor, queryset.model)
+            queryset = queryset.filter(self.get_seek_filter(values))
+
+        page = list(queryset.order_by(*self.ordering)[: self.page_size + 1])
+        self.next_cursor = None
+        if len(page) > self.page_size:
+            page = page[: self.page_size]
+            self.next_cursor = self.encode_cursor(
+                [self.get_value(page[-1], field) for field, _ in self.fields]
+            )
+
+        return page
+
+    @staticmethod
+    def get_value(obj, field: str):
+        # rows of values() have the lookups as keys
+        if isinstance(obj, dict):
+            return obj[field]
+
+        for attr in field.split("__"):
+            obj = getattr(obj, attr)
+
+        return obj
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_seek_filter(self, values):
+        """
+        (a, b, id) > (x, y, z) spelled out as
+        a >= x AND (a > x OR (a = x AND b > y) OR (a = x AND b = y AND id > z)),
+        the leading a >= x lets the database start the index scan at x
+        """
+        seek = Q()
+        for position, (field, descending) in enumerate(self.fields):
+            condition = Q(
+                **{f"{field}__{'lt' if descending else 'gt'}": values[position]}
+            )
+            for previous_position, (previous, _) in enumerate(self.fields[:position]):
+                condition &= Q(**{previous: values[previous_position]})
+            seek |= condition
+
+        field, descending = self.fields[0]
+        return Q(**{f"{field}__{'lte' if descending else 'gte'}": values[0]}) & seek
+
+    def encode_cursor(self, values) -> str:
+        data = json.dumps(values, cls=DjangoJSONEncoder).encode()
+        return base64.urlsafe_b64encode(data).decode()
+
+    @staticmethod
+    def get_model_field(model, lookup: str):
+        for name in lookup.split("__"):
+            field = model._meta.get_field(name)
+            model = field.related_model
+
+        return field
+
+    def decode_cursor(self, cursor: str, model) -> list:
+        """
+        Values of a cursor converted by the model fields of the ordering,
+        a tampered cursor is a 404 instead of failing in the query
+        """
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+
+        try:
+            values = [
+                self.get_model_field(model, field).to_python(value)
+                for (field, _), value in zip(self.fields, values)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # ordering fields are never null, None can't be compared
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+
+        return values
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class KeysetPaginationMixin:
+    """
+    Lets clients of a viewset opt in to keyset pagination with
+    ?pagination=cursor, any other request keeps pagination_class
+    """
+
+    keyset_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            if self.keyset_pagination_class is not None and (
+                params.get("pagination") == "cursor" or "cursor" in params
+            ):
+                self._paginator = self.keyset_pagination_class()
+
+        return super().paginator
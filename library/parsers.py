@@ -0,0 +1,29 @@
+"""
+JSON parser backed by orjson, the counterpart of
+library.renderers.FastJSONRenderer. Bodies orjson can't parse (invalid
+JSON, integers over 64 bits, other charsets than UTF-8) are parsed
+again by DRF's JSONParser, so results and error messages don't change.
+"""
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from library.renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            # rejects NaN and Infinity like the strict json parser
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,34 @@
+"""
+Maximum number of SQL queries per view and action.
+
+Views declare their budget as query_budget = {action: queries}, where
+the action is the viewset action or the lowercased HTTP method for
+plain API views. Views of other packages are listed in QUERY_BUDGETS
+by class name instead. Budgets don't depend on the page size, so an
+N+1 query breaks them as soon as a page holds a few rows. Bulk actions
+run queries per item and have no budget, their tests check the queries
+per item instead.
+
+Queries are counted like assertNumQueries() does in a TestCase,
+savepoints of transaction.atomic() included, so production requests
+(where the outermost atomic() is BEGIN/COMMIT) stay below the budget.
+
+Budgets are enforced in tests (library.tests.query_budget) and
+checked on requests sampled by library.metrics, which log a warning
+when a request goes over budget.
+"""
+QUERY_BUDGETS = {
+    # customer by email (last_login isn't updated)
+    "TokenObtainPairView": {"post": 1},
+    "TokenRefreshView": {"post": 0},
+    "TokenVerifyView": {"post": 0},
+}
+
+
+def get_query_budget(view_class, action: str):
+    """Budget of a view for an action, None if there is none"""
+    budget = getattr(view_class, "query_budget", None)
+    if budget is None:
+        budget = QUERY_BUDGETS.get(view_class.__name__, {})
+
+    return budget.get(action)
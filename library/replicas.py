@@ -0,0 +1,173 @@
+"""
+Read replicas for the catalog and the borrowing history.
+
+The replica_actions (list and retrieve) of a viewset with
+ReplicaReadsMixin read from one of REPLICA_DATABASES, picked at random
+per request; everything else (writes, the reads of create and
+return_book, the admin, migrations) uses the primary. ReplicaRouter
+takes the alias from a context variable set for the duration of the
+request, so it follows the request into the threads of the async ORM.
+
+Replicas lag behind the primary. A user who wrote something (any
+successful unsafe request) reads from the primary for
+REPLICA_PIN_SECONDS afterwards, so they see their own borrowings and
+returns. The pins live in the default cache: with the in-process
+LocMemCache a pin only covers the worker that served the write, set
+REDIS_URL when there are several. Other users may see the write late.
+Responses that are cached (book lists and details) are filled from the
+primary with read_from_primary(): a miss right after an invalidation
+would otherwise store what a lagging replica has under the new version.
+
+Without REPLICA_DATABASES (the default) all queries go to the primary.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework import permissions
+
+# alias of the replica the current request reads from
+read_database = ContextVar("read_database", default=None)
+
+PIN_KEY = "replica:pinned:{}"
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        # rows loaded from a replica are saved to the primary
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+@contextmanager
+def read_from_primary():
+    """Reads of the block go to the primary, also in replica_actions"""
+    token = read_database.set(None)
+    try:
+        yield
+    finally:
+        read_database.reset(token)
+
+
+def pin_to_primary(user_id) -> None:
+    """Reads of the user go to the primary for REPLICA_PIN_SECONDS"""
+    if settings.REPLICA_DATABASES:
+        cache.set(PIN_KEY.format(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user) -> bool:
+    if user is None or user.id is None:
+        return False
+
+    return cache.get(PIN_KEY.format(user.id), False)
+
+
+def choose_replica(user):
+    """Alias of the replica for a read of the user, None for the primary"""
+    if not settings.REPLICA_DATABASES or is_pinned(user):
+        return None
+
+    return random.choice(settings.REPLICA_DATABASES)
+
+
+class ReplicaReadsMixin:
+    """Reads of the replica_actions of a viewset go to a replica"""
+
+    replica_actions = ("list", "retrieve")
+    replica_alias = None
+    replica_token = None
+    # AsyncReadOnlyView runs initial() in a thread, whose context isn't
+    # the one of the request, and calls use_replica() itself
+    defer_use_replica = False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        if self.action in self.replica_actions:
+            # the pin of the user is read from the cache
+            self.replica_alias = choose_replica(request.user)
+        if not self.defer_use_replica:
+            self.use_replica()
+
+    def use_replica(self) -> None:
+        """Reads of the current context go to the replica chosen in initial()"""
+        if self.replica_alias is not None and self.replica_token is None:
+            self.replica_token = read_database.set(self.replica_alias)
+
+    def dispatch(self, request, *args, **kwargs):
+        # finalize_response() is skipped when the view raises (a 500), the
+        # alias mustn't stay with the next requests of the thread
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            self.reset_read_database()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # AsyncReadOnlyView calls initial() and finalize_response() only
+        self.reset_read_database()
+
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def reset_read_database(self) -> None:
+        if self.replica_token is not None:
+            read_database.reset(self.replica_token)
+            self.replica_token = None
+
+
+@sync_and_async_middleware
+class ReadYourWritesMiddleware:
+    """
+    Pins the user of a successful unsafe request to the primary, after
+    AuthenticationMiddleware (DRF sets request.user when it authenticates).
+    Runs in the mode of the handler, under ASGI only writes go through a
+    thread for it
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        response = self.get_response(request)
+        if self.is_write(request, response):
+            self.pin(request)
+
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.is_write(request, response):
+            # a lazy user loads from the database, the cache is sync
+            await sync_to_async(self.pin)(request)
+
+        return response
+
+    @staticmethod
+    def is_write(request, response) -> bool:
+        return (
+            request.method not in permissions.SAFE_METHODS
+            and response.status_code < 400
+        )
+
+    @staticmethod
+    def pin(request) -> None:
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(user.id)
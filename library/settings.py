@@ -15,6 +15,8 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
+from library.database import get_database, get_replicas
+
 load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,18 +50,21 @@ INSTALLED_APPS = [
     "rest_framework",
     "debug_toolbar",
     "drf_spectacular",
+    "library",
     "user",
     "book",
     "borrowing",
 ]
 
 MIDDLEWARE = [
+    "library.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "library.replicas.ReadYourWritesMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -88,13 +93,38 @@ WSGI_APPLICATION = "library.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# SQLite by default, see library.database for PostgreSQL and pooling
 DATABASES = {
+    "default": get_database(os.environ, BASE_DIR),
+}
+DATABASES.update(get_replicas(os.environ, DATABASES["default"]))
+
+# list and retrieve of books and borrowings read from these, see
+# library.replicas
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["library.replicas.ReplicaRouter"]
+# seconds a user reads from the primary after a write
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
     }
 }
 
+if os.environ.get("REDIS_URL"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["REDIS_URL"],
+    }
+
+# Seconds to keep cached book list and detail responses
+BOOK_CACHE_TIMEOUT = int(os.environ.get("BOOK_CACHE_TIMEOUT", 300))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -139,15 +169,32 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# DRF's own (stdlib json) classes are rest_framework.renderers.JSONRenderer
+# and rest_framework.parsers.JSONParser, the default ones use orjson
+JSON_RENDERER = os.environ.get("JSON_RENDERER", "library.renderers.FastJSONRenderer")
+JSON_PARSER = os.environ.get("JSON_PARSER", "library.parsers.FastJSONParser")
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": (
+        JSON_RENDERER,
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        JSON_PARSER,
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_THROTTLE_CLASSES": [
         "rest_framework.throttling.AnonRateThrottle",
         "rest_framework.throttling.UserRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {"anon": "10000/day", "user": "10000/day"},
+    # request.user is a TokenUser built from the token claims, no
+    # database query per read, writes check the customer is still active
+    # (see user.authentication)
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.CustomerJWTAuthentication",
     ),
 }
 
@@ -173,7 +220,23 @@ SPECTACULAR_SETTINGS = {
 }
 
 SIMPLE_JWT = {
+    # a deactivated or deleted customer can read with a token issued before
+    # until it expires, writes and admin rights check the customer
+    # (user.authentication)
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60 * 24 * 5),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": False,
+    "TOKEN_OBTAIN_SERIALIZER": "user.serializers.CustomerTokenObtainPairSerializer",
 }
+
+# Seconds to keep a customer row cached for endpoints that need it
+USER_CACHE_TIMEOUT = int(os.environ.get("USER_CACHE_TIMEOUT", 60))
+
+# Active borrowings a customer may have at a time, 0 for no limit
+MAX_ACTIVE_BORROWINGS = int(os.environ.get("MAX_ACTIVE_BORROWINGS", 0))
+
+# Fine per overdue day is the daily fee of the book times this (borrowing.fines)
+FINE_MULTIPLIER = os.environ.get("FINE_MULTIPLIER", "2")
+
+# Share of requests with Server-Timing headers and metrics (library.metrics)
+METRICS_SAMPLE_RATE = float(os.environ.get("METRICS_SAMPLE_RATE", 0.01))
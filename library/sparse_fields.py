@@ -0,0 +1,150 @@
+"""
+Sparse fieldsets: ?fields=id,title returns only the listed fields and
+?expand=book keeps only the listed relations nested, the other ones are
+shown as their ids (?expand= for ids only). Without the parameters the
+representation doesn't change.
+
+The database work follows the representation: only() loads the columns
+behind the requested fields (plus the ones of version_fields and of the
+keyset ordering) and select_related() joins the nested relations only.
+"""
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Serializer taking fields= (names of the fields to keep) and expand=
+    (names of expandable_fields to keep nested, the others become
+    primary keys)
+    """
+
+    expandable_fields = ()
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sparse = fields is not None or expand is not None
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+        if expand is not None:
+            for name in set(self.expandable_fields) - set(expand):
+                if name in self.fields:
+                    self.fields[name] = serializers.PrimaryKeyRelatedField(
+                        read_only=True
+                    )
+
+
+class SparseFieldsMixin:
+    """
+    ?fields= and ?expand= for the sparse_fields_actions of a viewset, its
+    serializers must use SparseFieldsSerializerMixin and get_queryset()
+    should end with get_sparse_queryset()
+    """
+
+    sparse_fields_actions = ("list", "retrieve")
+    requested_fields = None
+    expanded_fields = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        if self.action not in self.sparse_fields_actions:
+            return
+
+        params = request.query_params
+        fields, expand = params.get("fields"), params.get("expand")
+        if not fields and expand is None:
+            return
+
+        serializer = self.get_serializer()
+        errors = {}
+        if fields:
+            self.requested_fields = [name for name in fields.split(",") if name]
+            unknown = set(self.requested_fields) - set(serializer.fields)
+            if unknown:
+                errors["fields"] = f"Unknown fields: {', '.join(sorted(unknown))}"
+
+        if expand is not None:
+            self.expanded_fields = [name for name in expand.split(",") if name]
+            unknown = set(self.expanded_fields) - set(serializer.expandable_fields)
+            if unknown:
+                errors["expand"] = f"Not expandable: {', '.join(sorted(unknown))}"
+
+        if errors:
+            raise ValidationError(errors)
+
+        # versions of relations that aren't shown (or loaded) don't count
+        relations = self.get_nested_relations(self.get_serializer())
+        self.version_fields = tuple(
+            field
+            for field in getattr(self, "version_fields", ())
+            if "." not in field or field.split(".")[0] in relations
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        if self.requested_fields is not None:
+            kwargs.setdefault("fields", self.requested_fields)
+        if self.expanded_fields is not None:
+            kwargs.setdefault("expand", self.expanded_fields)
+
+        return super().get_serializer(*args, **kwargs)
+
+    @staticmethod
+    def get_nested_relations(serializer) -> list:
+        return [
+            field.source
+            for field in serializer.fields.values()
+            if isinstance(field, serializers.BaseSerializer)
+        ]
+
+    def get_cursor_fields(self) -> list:
+        """Fields the last row of a keyset page gives the cursor from"""
+        return [field.lstrip("-") for field in getattr(self.paginator, "ordering", ())]
+
+    def get_sparse_queryset(self, queryset):
+        """
+        queryset with only() the columns of the requested fields and
+        select_related() for their nested relations, unchanged when the
+        request has no ?fields= or ?expand=
+        """
+        if self.requested_fields is None and self.expanded_fields is None:
+            return queryset
+
+        serializer = self.get_serializer()
+        model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+        relations = self.get_nested_relations(serializer)
+        columns = [
+            field for field in getattr(self, "version_fields", ()) if "." not in field
+        ]
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.BaseSerializer):
+                # select_related() can't follow a deferred relation
+                columns.append(field.source)
+                continue
+
+            source = field.source.split(".")[0]
+            if source in model_fields:
+                columns.append(source)
+            elif name in model_fields:
+                # e.g. cover shown with get_cover_display()
+                columns.append(name)
+            else:
+                # computed from columns we can't tell, load all of them
+                columns = None
+                break
+
+        for field in self.get_cursor_fields():
+            if "__" in field:
+                field = field.split("__")[0]
+                relations.append(field)
+            if columns is not None:
+                columns.append(field)
+
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+
+        return queryset if columns is None else queryset.only(*columns)
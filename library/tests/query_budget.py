@@ -0,0 +1,88 @@
+from django.db import connection
+
+from library.query_budget import get_query_budget
+
+
+class QueryLog(list):
+    """
+    Execute wrapper keeping the SQL of the queries of the connection, and
+    in columns the number of columns each of them returned
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.columns = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.append(sql)
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.columns.append(len(context["cursor"].description or ()))
+
+
+class QueryTestMixin:
+    def countQueries(self, func) -> QueryLog:
+        """Call func, returns the SQL of its queries"""
+        queries = QueryLog()
+        with connection.execute_wrapper(queries):
+            func()
+
+        return queries
+
+    def getWithQueries(self, url, params=None):
+        """Successful GET of url, returns the response and its queries"""
+        queries = QueryLog()
+        with connection.execute_wrapper(queries):
+            response = self.client.get(url, params)
+
+        self.assertEqual(response.status_code, 200)
+
+        return response, queries
+
+
+class QueryBudgetTestMixin(QueryTestMixin):
+    """Assertions for test cases of views with a query budget"""
+
+    def assertWithinQueryBudget(self, view_class, action: str, func):
+        """Call func and check its queries against the budget, returns the count"""
+        budget = get_query_budget(view_class, action)
+        self.assertIsNotNone(budget, f"{view_class.__name__}.{action} has no budget")
+
+        queries = self.countQueries(func)
+        self.assertLessEqual(
+            len(queries),
+            budget,
+            f"{view_class.__name__}.{action} ran {len(queries)} queries, "
+            f"budget is {budget}:\n" + "\n".join(queries),
+        )
+
+        return len(queries)
+
+    def assertConstantQueries(self, view_class, action: str, get_page):
+        """
+        Check that get_page(page_size) for page sizes from 1 to 100
+        stays within the budget and runs the same number of queries
+        """
+        counts = {
+            page_size: self.assertWithinQueryBudget(
+                view_class, action, lambda: get_page(page_size)
+            )
+            for page_size in (1, 10, 100)
+        }
+        self.assertEqual(
+            len(set(counts.values())), 1, f"queries by page size: {counts}"
+        )
+
+    def assertQueriesPerItem(self, per_item: int, func):
+        """
+        Check that func(items) for 1 and 10 items runs the same queries
+        plus per_item queries for every item (bulk actions, which have
+        no budget)
+        """
+        counts = {
+            items: len(self.countQueries(lambda: func(items))) for items in (1, 10)
+        }
+        self.assertEqual(
+            counts[10] - counts[1], 9 * per_item, f"queries by item count: {counts}"
+        )
@@ -0,0 +1,118 @@
+import tempfile
+from pathlib import Path
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+
+from library.database import SQLITE_PRAGMAS, get_database, get_replicas
+
+BASE_DIR = Path("/srv/library")
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    def test_sqlite_by_default(self):
+        database = get_database({}, BASE_DIR)
+
+        self.assertEqual(database["ENGINE"], "django.db.backends.sqlite3")
+        self.assertEqual(database["NAME"], BASE_DIR / "db.sqlite3")
+        self.assertEqual(database["PRAGMAS"], SQLITE_PRAGMAS)
+
+    def test_sqlite_without_tuning(self):
+        database = get_database({"SQLITE_TUNING": "false"}, BASE_DIR)
+
+        self.assertEqual(database["PRAGMAS"], {})
+
+    def test_postgresql(self):
+        database = get_database(
+            {
+                "DB_ENGINE": "postgresql",
+                "POSTGRES_DB": "catalog",
+                "POSTGRES_HOST": "db",
+                "DB_CONN_MAX_AGE": "300",
+            },
+            BASE_DIR,
+        )
+
+        self.assertEqual(database["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(database["NAME"], "catalog")
+        self.assertEqual(database["HOST"], "db")
+        self.assertEqual(database["CONN_MAX_AGE"], 300)
+        self.assertTrue(database["CONN_HEALTH_CHECKS"])
+        self.assertNotIn("POOL_OPTIONS", database)
+
+    def test_postgresql_pool(self):
+        database = get_database(
+            {"DB_ENGINE": "postgresql", "DB_POOL_SIZE": "5"}, BASE_DIR
+        )
+
+        self.assertEqual(database["ENGINE"], "dj_db_conn_pool.backends.postgresql")
+        self.assertEqual(database["POOL_OPTIONS"]["POOL_SIZE"], 5)
+        self.assertEqual(database["POOL_OPTIONS"]["MAX_OVERFLOW"], 5)
+        # connections go back to the pool after every request
+        self.assertEqual(database["CONN_MAX_AGE"], 0)
+
+    def test_no_replicas_by_default(self):
+        self.assertEqual(get_replicas({}, get_database({}, BASE_DIR)), {})
+
+    def test_postgresql_replicas(self):
+        environ = {
+            "DB_ENGINE": "postgresql",
+            "POSTGRES_HOST": "db",
+            "POSTGRES_REPLICA_HOSTS": "replica-a, replica-b",
+        }
+        replicas = get_replicas(environ, get_database(environ, BASE_DIR))
+
+        self.assertEqual(list(replicas), ["replica1", "replica2"])
+        self.assertEqual(replicas["replica2"]["HOST"], "replica-b")
+        self.assertEqual(replicas["replica1"]["NAME"], "library")
+
+    def test_sqlite_replicas(self):
+        environ = {"SQLITE_REPLICA_NAMES": "/litefs/replica.sqlite3"}
+        replicas = get_replicas(environ, get_database(environ, BASE_DIR))
+
+        self.assertEqual(replicas["replica1"]["NAME"], "/litefs/replica.sqlite3")
+        self.assertEqual(replicas["replica1"]["PRAGMAS"], SQLITE_PRAGMAS)
+
+
+class SqlitePragmasTests(SimpleTestCase):
+    def get_pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def connect(self, pragmas):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        wrapper = DatabaseWrapper(
+            {
+                **connection.settings_dict,
+                "NAME": str(Path(directory.name) / "db.sqlite3"),
+                "PRAGMAS": pragmas,
+            },
+            alias="pragmas",
+        )
+        self.addCleanup(wrapper.close)
+
+        with CaptureQueriesContext(wrapper) as captured:
+            wrapper.ensure_connection()
+
+        self.assertEqual(len(captured), 0)
+        return wrapper
+
+    def test_pragmas_on_new_connections(self):
+        wrapper = self.connect(SQLITE_PRAGMAS)
+
+        self.assertEqual(self.get_pragma(wrapper, "journal_mode"), "wal")
+        # NORMAL
+        self.assertEqual(self.get_pragma(wrapper, "synchronous"), 1)
+        self.assertEqual(
+            self.get_pragma(wrapper, "mmap_size"), SQLITE_PRAGMAS["mmap_size"]
+        )
+        self.assertEqual(self.get_pragma(wrapper, "busy_timeout"), 5000)
+
+    def test_no_pragmas(self):
+        wrapper = self.connect({})
+
+        self.assertEqual(self.get_pragma(wrapper, "journal_mode"), "delete")
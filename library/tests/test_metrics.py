@@ -0,0 +1,158 @@
+import time
+from unittest import mock
+
+from asgiref.sync import SyncToAsync, iscoroutinefunction
+from django.core.handlers.asgi import ASGIHandler
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from borrowing.serializers import BorrowingListSerializer
+from borrowing.tests.test_veiws import create_book, create_borrowing, create_user
+from borrowing.views import BorrowingViewSet
+from library.metrics import HISTOGRAMS, Histogram, MetricsMiddleware
+
+METRICS_URL = reverse("metrics")
+
+
+@override_settings(METRICS_SAMPLE_RATE=1)
+class MetricsMiddlewareTests(APITestCase):
+    def setUp(self):
+        for histogram in HISTOGRAMS:
+            histogram.clear()
+
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="pass1234"
+        )
+        self.borrowing = create_borrowing(create_book(), create_user())
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("borrowing:borrowing-list"))
+
+        timings = dict(
+            part.strip().split(";", 1) for part in response["Server-Timing"].split(",")
+        )
+        self.assertEqual(set(timings), {"db", "serializer", "app", "render", "total"})
+        self.assertRegex(timings["db"], r'^dur=[\d.]+;desc="\d+ queries"$')
+
+    def test_serializer_timing(self):
+        to_representation = BorrowingListSerializer.to_representation
+
+        def slow_to_representation(serializer, data):
+            time.sleep(0.02)
+            return to_representation(serializer, data)
+
+        with mock.patch.object(
+            BorrowingListSerializer, "to_representation", slow_to_representation
+        ):
+            response = self.client.get(reverse("borrowing:borrowing-list"))
+
+        timings = dict(
+            part.strip().split(";", 1) for part in response["Server-Timing"].split(",")
+        )
+        self.assertGreaterEqual(float(timings["serializer"].split("=")[1]), 20)
+        self.assertIn(
+            "library_serializer_duration_seconds_count"
+            '{view="BorrowingViewSet.list"} 1',
+            self.client.get(METRICS_URL).content.decode(),
+        )
+
+    def test_metrics_per_view_and_action(self):
+        self.client.post(
+            reverse("borrowing:borrowing-return", args=[self.borrowing.id]),
+            {"actual_return_date": "2023-03-28"},
+        )
+
+        response = self.client.get(METRICS_URL)
+        content = response.content.decode()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn("# TYPE library_request_duration_seconds histogram", content)
+        self.assertIn(
+            "library_request_duration_seconds_count"
+            '{view="BorrowingViewSet.return_book"} 1',
+            content,
+        )
+        self.assertIn(
+            'library_db_queries_bucket{view="BorrowingViewSet.return_book"', content
+        )
+
+    def test_warning_over_query_budget(self):
+        budget = {**BorrowingViewSet.query_budget, "list": 1}
+
+        with mock.patch.object(BorrowingViewSet, "query_budget", budget):
+            with self.assertLogs("library.metrics", "WARNING") as logs:
+                self.client.get(reverse("borrowing:borrowing-list"))
+
+        self.assertIn(
+            "BorrowingViewSet.list ran 2 queries, budget is 1", logs.output[0]
+        )
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_requests_out_of_sample(self):
+        response = self.client.get(reverse("borrowing:borrowing-list"))
+        content = self.client.get(METRICS_URL).content.decode()
+
+        self.assertNotIn("Server-Timing", response)
+        self.assertNotIn("BorrowingViewSet", content)
+
+    def test_metrics_for_user(self):
+        self.client.force_authenticate(self.borrowing.user)
+
+        response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(
+    METRICS_SAMPLE_RATE=1, MIDDLEWARE=["library.metrics.MetricsMiddleware"]
+)
+class AsyncMetricsMiddlewareTests(TransactionTestCase):
+    def setUp(self):
+        for histogram in HISTOGRAMS:
+            histogram.clear()
+        create_book()
+
+    def test_no_thread_under_asgi(self):
+        handler = ASGIHandler()
+
+        self.assertNotIsInstance(handler._middleware_chain, SyncToAsync)
+
+    def test_mode_of_get_response(self):
+        async def get_response(request):
+            pass
+
+        self.assertTrue(iscoroutinefunction(MetricsMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(MetricsMiddleware(lambda request: None)))
+
+    async def test_native_async_view(self):
+        response = await self.async_client.get(reverse("book:book-async-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+        self.assertIn(
+            'library_request_duration_seconds_count{view="BookAsyncView"} 1',
+            "\n".join(HISTOGRAMS[0].render()),
+        )
+
+
+class HistogramTests(SimpleTestCase):
+    def test_render_cumulative_buckets(self):
+        histogram = Histogram("test_seconds", "Test", (0.1, 1))
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe("View.list", value)
+
+        self.assertEqual(
+            histogram.render()[2:],
+            [
+                'test_seconds_bucket{view="View.list",le="0.1"} 2',
+                'test_seconds_bucket{view="View.list",le="1"} 3',
+                'test_seconds_bucket{view="View.list",le="+Inf"} 4',
+                'test_seconds_sum{view="View.list"} 2.65',
+                'test_seconds_count{view="View.list"} 4',
+            ],
+        )
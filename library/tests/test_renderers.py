@@ -0,0 +1,259 @@
+import datetime
+import io
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from book.models import Book
+from borrowing.fines import compute_fines
+from borrowing.tests.test_veiws import create_borrowing
+from library.parsers import FastJSONParser
+from library.renderers import FastJSONRenderer
+from user.serializers import CustomerTokenObtainPairSerializer
+
+TODAY = timezone.localdate()
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def assertRendersLikeJSONRenderer(self, data, accepted_media_type=None):
+        self.assertEqual(
+            FastJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type),
+        )
+
+    def test_types(self):
+        self.assertRendersLikeJSONRenderer(
+            {
+                "str": "Ünïcode “title” 📚",
+                "separators": "line paragraph ",
+                "escapes": '"quoted"\\\n\t\x00',
+                "int": 2**63 - 1,
+                "float": 0.1234,
+                "bool": [True, False, None],
+                "decimal": Decimal("10.50"),
+                "date": datetime.date(2023, 1, 31),
+                "datetime": datetime.datetime(2023, 1, 31, 12, 30, 15, 123456),
+                "utc": datetime.datetime(
+                    2023, 1, 31, 12, 30, tzinfo=datetime.timezone.utc
+                ),
+                "aware": datetime.datetime(
+                    2023,
+                    1,
+                    31,
+                    tzinfo=datetime.timezone(datetime.timedelta(hours=3)),
+                ),
+                "time": datetime.time(12, 30, 0, 500),
+                "timedelta": datetime.timedelta(days=1, seconds=30),
+                "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+                "lazy": gettext_lazy("This field is required."),
+                "tuple": (1, 2),
+                "set": {3},
+                "bytes": b"bytes",
+                1: "int key",
+            }
+        )
+
+    def test_falls_back_to_json(self):
+        self.assertRendersLikeJSONRenderer({"big": 2**64})
+        self.assertRendersLikeJSONRenderer(
+            {"id": 1, "title": "Test"}, "application/json; indent=4"
+        )
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_unsupported_type(self):
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({"object": object()})
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def parse(self, parser, body: bytes, encoding="utf-8"):
+        return parser.parse(io.BytesIO(body), parser_context={"encoding": encoding})
+
+    def assertParsesLikeJSONParser(self, body: bytes, encoding="utf-8"):
+        self.assertEqual(
+            self.parse(FastJSONParser(), body, encoding),
+            self.parse(JSONParser(), body, encoding),
+        )
+
+    def test_parse(self):
+        self.assertParsesLikeJSONParser(
+            '{"title": "Ünïcode", "ids": [1, 2], "fee": 1.5}'.encode()
+        )
+        self.assertParsesLikeJSONParser(b'{"big": 18446744073709551616}')
+        self.assertParsesLikeJSONParser(
+            '{"title": "Latin-1 é"}'.encode("latin-1"), "latin-1"
+        )
+
+    def test_errors(self):
+        for body in (b"{", b'{"fee": NaN}', b""):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as expected:
+                    self.parse(JSONParser(), body)
+                with self.assertRaises(ParseError) as error:
+                    self.parse(FastJSONParser(), body)
+
+                self.assertEqual(str(error.exception), str(expected.exception))
+
+
+class GoldenOutputTests(APITestCase):
+    """Every endpoint renders the same bytes as DRF's JSONRenderer would"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="pass1234"
+        )
+        self.customer = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="pass1234",
+            first_name="Ünïcode",
+        )
+        self.book = Book.objects.create(
+            title="Line separated “title”",
+            author="Test author",
+            cover=Book.Cover.SOFT,
+            inventory=5,
+            daily_fee=Decimal("10.50"),
+        )
+        self.borrowing = create_borrowing(self.book, self.customer)
+        self.returned = create_borrowing(self.book, self.customer)
+        self.returned.actual_return_date = datetime.date(2023, 1, 20)
+        self.returned.save()
+        compute_fines()
+
+    def assertGolden(self, response):
+        self.assertEqual(
+            response.content,
+            JSONRenderer().render(
+                response.data,
+                response.accepted_media_type,
+                response.renderer_context,
+            ),
+        )
+
+    def test_book_endpoints(self):
+        self.client.force_authenticate(self.customer)
+        for url, params in (
+            (reverse("book:book-list"), {}),
+            (reverse("book:book-list"), {"q": "title"}),
+            (reverse("book:book-list"), {"ordering": "popularity"}),
+            (reverse("book:book-list"), {"pagination": "cursor", "page_size": 1}),
+            (reverse("book:book-detail", args=[self.book.id]), {}),
+            (reverse("book:book-detail", args=[0]), {}),
+        ):
+            with self.subTest(url=url, **params):
+                self.assertGolden(self.client.get(url, params))
+
+        self.client.force_authenticate(self.admin)
+        self.assertGolden(self.client.get(reverse("book:book-cache-stats")))
+        self.assertGolden(
+            self.client.post(
+                reverse("book:book-list"),
+                {"title": "New", "author": "Author", "cover": 1, "inventory": 1},
+                format="json",
+            )
+        )
+
+    def test_borrowing_endpoints(self):
+        self.client.force_authenticate(self.customer)
+        for url, params in (
+            (reverse("borrowing:borrowing-list"), {}),
+            (reverse("borrowing:borrowing-list"), {"is_active": "true"}),
+            (reverse("borrowing:borrowing-list"), {"pagination": "cursor"}),
+            (reverse("borrowing:borrowing-detail", args=[self.borrowing.id]), {}),
+            (reverse("borrowing:borrowing-overdue"), {}),
+        ):
+            with self.subTest(url=url, **params):
+                self.assertGolden(self.client.get(url, params))
+
+        for url, data in (
+            (
+                reverse("borrowing:borrowing-list"),
+                {
+                    "book": self.book.id,
+                    "borrow_date": TODAY,
+                    "expected_return_date": TODAY,
+                },
+            ),
+            (
+                reverse("borrowing:borrowing-return", args=[self.borrowing.id]),
+                {"actual_return_date": TODAY},
+            ),
+            (
+                reverse("borrowing:borrowing-bulk"),
+                {
+                    "items": [
+                        {
+                            "book": self.book.id,
+                            "borrow_date": TODAY,
+                            "expected_return_date": TODAY,
+                        },
+                        {"book": 0},
+                    ],
+                    "all_or_nothing": False,
+                },
+            ),
+            (
+                reverse("borrowing:borrowing-return-bulk"),
+                {"ids": [self.borrowing.id, 0], "actual_return_date": TODAY},
+            ),
+        ):
+            with self.subTest(url=url):
+                self.assertGolden(self.client.post(url, data, format="json"))
+
+    def test_async_endpoints(self):
+        self.client.force_authenticate(self.customer)
+        for sync, asynchronous in (
+            ("book:book-list", "book:book-async-list"),
+            ("borrowing:borrowing-list", "borrowing:borrowing-async-list"),
+        ):
+            with self.subTest(url=asynchronous):
+                self.assertEqual(
+                    self.client.get(reverse(asynchronous)).content,
+                    self.client.get(reverse(sync)).content,
+                )
+
+    def test_user_endpoints(self):
+        token = CustomerTokenObtainPairSerializer.get_token(self.customer)
+        for url, data in (
+            (
+                reverse("user:register"),
+                {"email": "new@example.com", "password": "12345"},
+            ),
+            (reverse("user:register"), {"email": "invalid"}),
+            (
+                reverse("user:token_obtain_pair"),
+                {"email": "test@example.com", "password": "pass1234"},
+            ),
+            (reverse("user:token_refresh"), {"refresh": str(token)}),
+            (reverse("user:token_verify"), {"token": "invalid"}),
+        ):
+            with self.subTest(url=url):
+                self.assertGolden(self.client.post(url, data, format="json"))
+
+        self.client.force_authenticate(self.customer)
+        self.assertGolden(self.client.get(reverse("user:manage")))
+
+    def test_errors(self):
+        self.assertGolden(self.client.get(reverse("borrowing:borrowing-list")))
+
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(
+            reverse("borrowing:borrowing-list"),
+            "{invalid",
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertGolden(response)
@@ -0,0 +1,296 @@
+import copy
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import SyncToAsync
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from book.models import Book
+from borrowing.models import Borrowing
+from borrowing.tests.test_veiws import create_book, create_borrowing, create_user
+from borrowing.views import BorrowingViewSet
+from library.replicas import PIN_KEY, ReplicaRouter, read_database
+
+BORROWING_URL = reverse("borrowing:borrowing-list")
+
+
+def book_url(book_id):
+    return reverse("book:book-detail", args=[book_id])
+
+
+def borrowing_url(borrowing_id):
+    return reverse("borrowing:borrowing-detail", args=[borrowing_id])
+
+
+def replicate(*objects):
+    """Copies of rows of the primary in the replica, without signals"""
+    for obj in objects:
+        type(obj).objects.using("replica").bulk_create([copy.copy(obj)])
+
+
+class ReplicaTestCase(APITestCase):
+    """A second SQLite database, "replica", next to the test database"""
+
+    # the runner only knows the configured databases, "replica" is added
+    # before the class resolves "__all__"
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        connections.settings["replica"] = {
+            **connections["default"].settings_dict,
+            "NAME": str(Path(cls.directory.name) / "replica.sqlite3"),
+        }
+        primary, replica = connections["default"], connections["replica"]
+        primary.ensure_connection()
+        replica.ensure_connection()
+        # the schema of the migrated test database
+        primary.connection.backup(replica.connection)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+        cls.directory.cleanup()
+
+
+@override_settings(REPLICA_DATABASES=["replica"])
+class ReplicaReadsTests(ReplicaTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.book = create_book()
+        self.borrowing = create_borrowing(self.book, self.user)
+        replicate(self.user, self.book, self.book.stats, self.borrowing)
+        # the replica lags behind the primary
+        Book.objects.filter(id=self.book.id).update(title="Updated title")
+        self.client.force_authenticate(self.user)
+
+    def get(self, url):
+        with CaptureQueriesContext(
+            connections["default"]
+        ) as primary, CaptureQueriesContext(connections["replica"]) as replica:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(primary), len(replica)
+
+    def borrow(self):
+        response = self.client.post(
+            BORROWING_URL,
+            {
+                "borrow_date": "2023-01-01",
+                "expected_return_date": "2023-01-02",
+                "book": self.book.id,
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response
+
+    def test_cached_book_list_from_primary(self):
+        response, _, replica = self.get(reverse("book:book-list"))
+
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"][0]["title"], "Updated title")
+        self.assertEqual(replica, 0)
+
+        response, primary, replica = self.get(reverse("book:book-list"))
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual((primary, replica), (0, 0))
+
+    def test_cache_miss_after_invalidation_from_primary(self):
+        self.client.force_authenticate(None)
+        book = Book.objects.get(id=self.book.id)
+        book.title = "Skin Game"
+        # invalidates the cached book
+        book.save()
+
+        for cache_status in ("MISS", "HIT"):
+            response, _, _ = self.get(book_url(self.book.id))
+
+            self.assertEqual(response["X-Cache"], cache_status)
+            self.assertEqual(response.data["title"], "Skin Game")
+
+    def test_async_book_retrieve_from_replica(self):
+        response = self.client.get(
+            reverse("book:book-async-detail", args=[self.book.id])
+        )
+
+        self.assertEqual(response.json()["title"], "Test title")
+        self.assertIsNone(read_database.get())
+
+    def test_borrowing_list_from_replica(self):
+        create_borrowing(self.book, self.user)
+        response, primary, _ = self.get(BORROWING_URL)
+
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["book"]["title"], "Test title")
+        self.assertEqual(primary, 0)
+
+    def test_borrowing_retrieve_from_replica(self):
+        response, primary, _ = self.get(borrowing_url(self.borrowing.id))
+
+        self.assertEqual(response.data["book"]["title"], "Test title")
+        self.assertEqual(primary, 0)
+
+    def test_async_list_from_replica(self):
+        create_borrowing(self.book, self.user)
+        response = self.client.get(reverse("borrowing:borrowing-async-list"))
+
+        self.assertEqual(response.json()["count"], 1)
+
+    def test_writes_to_primary(self):
+        self.borrow()
+
+        self.assertEqual(Borrowing.objects.using("default").count(), 2)
+        self.assertEqual(Borrowing.objects.using("replica").count(), 1)
+
+    def test_return_book_on_primary(self):
+        borrowing = create_borrowing(self.book, self.user)
+        response = self.client.post(
+            reverse("borrowing:borrowing-return", args=[borrowing.id]),
+            {"actual_return_date": "2023-01-02"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        borrowing.refresh_from_db()
+        self.assertIsNotNone(borrowing.actual_return_date)
+
+    def test_reads_after_write_from_primary(self):
+        self.borrow()
+
+        response, _, replica = self.get(BORROWING_URL)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(replica, 0)
+
+        response = self.client.get(
+            reverse("book:book-async-detail", args=[self.book.id])
+        )
+        self.assertEqual(response.json()["title"], "Updated title")
+
+    def test_other_users_read_from_replica(self):
+        self.borrow()
+        self.client.force_authenticate(None)
+
+        response = self.client.get(
+            reverse("book:book-async-detail", args=[self.book.id])
+        )
+
+        self.assertEqual(response.json()["title"], "Test title")
+
+    def test_pin_expires(self):
+        self.borrow()
+        cache.delete(PIN_KEY.format(self.user.id))
+
+        response, _, _ = self.get(BORROWING_URL)
+
+        self.assertEqual(response.data["count"], 1)
+
+    def test_failed_write_does_not_pin(self):
+        response = self.client.post(BORROWING_URL, {"book": self.book.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response, _, _ = self.get(BORROWING_URL)
+
+        self.assertEqual(response.data["count"], 1)
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_without_replicas(self):
+        response, _, replica = self.get(book_url(self.book.id))
+
+        self.assertEqual(response.data["title"], "Updated title")
+        self.assertEqual(replica, 0)
+        self.borrow()
+        self.assertIsNone(cache.get(PIN_KEY.format(self.user.id)))
+
+    def test_server_error_resets_replica(self):
+        with mock.patch.object(
+            BorrowingViewSet, "get_serializer", side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                self.client.get(BORROWING_URL)
+
+        self.assertIsNone(read_database.get())
+
+    def test_outside_requests_on_primary(self):
+        self.assertIsNone(read_database.get())
+        self.assertEqual(Book.objects.get(id=self.book.id).title, "Updated title")
+
+    def test_rows_from_replica_saved_to_primary(self):
+        book = Book.objects.using("replica").get(id=self.book.id)
+        book.inventory = 1
+        book.save()
+
+        self.assertEqual(Book.objects.using("default").get(id=book.id).inventory, 1)
+        self.assertEqual(Book.objects.using("replica").get(id=book.id).inventory, 5)
+
+
+class ReplicaRouterTests(APITestCase):
+    def test_router(self):
+        router = ReplicaRouter()
+        token = read_database.set("replica1")
+        self.addCleanup(read_database.reset, token)
+
+        self.assertEqual(router.db_for_read(Book), "replica1")
+        self.assertEqual(router.db_for_write(Book), "default")
+
+
+# the debug toolbar middleware is sync only
+ASYNC_MIDDLEWARE = [
+    path
+    for path in settings.MIDDLEWARE
+    if path != "debug_toolbar.middleware.DebugToolbarMiddleware"
+]
+
+
+@override_settings(MIDDLEWARE=ASYNC_MIDDLEWARE)
+class AsyncMiddlewareTests(SimpleTestCase):
+    def test_no_thread_under_asgi(self):
+        handler = ASGIHandler()
+
+        self.assertNotIsInstance(handler._middleware_chain, SyncToAsync)
+
+
+@override_settings(MIDDLEWARE=ASYNC_MIDDLEWARE, REPLICA_DATABASES=["replica"])
+class AsyncReadYourWritesTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.book = create_book()
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    async def test_write_pins_user(self):
+        response = await self.async_client.post(
+            BORROWING_URL,
+            {
+                "borrow_date": "2023-01-01",
+                "expected_return_date": "2023-01-02",
+                "book": self.book.id,
+            },
+            headers=self.headers,
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(cache.get(PIN_KEY.format(self.user.id)))
+
+    async def test_read_does_not_pin_user(self):
+        response = await self.async_client.get(
+            reverse("borrowing:borrowing-overdue"), headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(cache.get(PIN_KEY.format(self.user.id)))
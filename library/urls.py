@@ -22,11 +22,14 @@ from drf_spectacular.views import (
     SpectacularRedocView,
 )
 
+from library.metrics import MetricsView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("users/", include("user.urls", namespace="user")),
     path("books/", include("book.urls", namespace="book")),
     path("borrowings/", include("borrowing.urls", namespace="borrowing")),
+    path("api/metrics/", MetricsView.as_view(), name="metrics"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/doc/swagger/",
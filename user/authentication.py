@@ -0,0 +1,47 @@
+"""
+JWT authentication of the API.
+
+request.user is a TokenUser built from the token claims, so reads of
+customers run no query for it. Unsafe requests, and every request with
+the is_staff or is_superuser claim, also check the claims against the
+customer (through user.cache, invalidated on save and delete): a
+deactivated, deleted or demoted customer can't use a token issued
+before to write or to reach admin endpoints, though reads of customers
+stay possible until the token expires.
+"""
+from rest_framework import permissions
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+
+from user.cache import get_customer
+
+
+class CustomerJWTAuthentication(JWTStatelessUserAuthentication):
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is None:
+            return result
+
+        user, _ = result
+        if request.method in permissions.SAFE_METHODS and not (
+            user.is_staff or user.is_superuser
+        ):
+            return result
+
+        customer = get_customer(user.id)
+        if customer is None:
+            raise AuthenticationFailed(
+                "User is inactive or deleted", code="user_inactive"
+            )
+
+        # claims are copied into refreshed tokens, a demoted admin would
+        # keep the rights until the refresh token expires
+        if (customer.is_staff, customer.is_superuser) != (
+            user.is_staff,
+            user.is_superuser,
+        ):
+            raise AuthenticationFailed(
+                "User permissions have changed", code="user_permissions_changed"
+            )
+
+        return result
@@ -0,0 +1,30 @@
+"""
+Short-lived cache of Customer rows.
+
+Requests are authenticated from JWT claims only (request.user is a
+TokenUser), endpoints that need the full row load it through here.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+CUSTOMER_KEY = "user:customer:{}"
+
+
+def get_customer(user_id):
+    """Customer with given id or None if there is no such active customer"""
+    key = CUSTOMER_KEY.format(user_id)
+    customer = cache.get(key)
+    if customer is None:
+        customer = get_user_model().objects.filter(id=user_id, is_active=True).first()
+        if customer is not None:
+            cache.set(key, customer, timeout=settings.USER_CACHE_TIMEOUT)
+
+    return customer
+
+
+def invalidate_customer(user_id) -> None:
+    key = CUSTOMER_KEY.format(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
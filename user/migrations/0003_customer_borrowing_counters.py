@@ -0,0 +1,61 @@
+# Generated by Django 4.2.4 on 2026-10-18 05:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def count_borrowings(apps, schema_editor):
+    Customer = apps.get_model("user", "Customer")
+    Borrowing = apps.get_model("borrowing", "Borrowing")
+
+    counts = (
+        Borrowing.objects.filter(
+            user_id=OuterRef("id"), actual_return_date__isnull=True
+        )
+        .order_by()
+        .values("user_id")
+    )
+    Customer.objects.update(
+        active_borrowings_count=Coalesce(
+            Subquery(counts.annotate(count=Count("id")).values("count")), 0
+        ),
+        overdue_borrowings_count=Coalesce(
+            Subquery(
+                counts.filter(expected_return_date__lt=timezone.localdate())
+                .annotate(count=Count("id"))
+                .values("count")
+            ),
+            0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user", "0002_customer_updated_at"),
+        ("borrowing", "0005_borrowing_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customer",
+            name="active_borrowings_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Number of borrowings that are not returned yet",
+            ),
+        ),
+        migrations.AddField(
+            model_name="customer",
+            name="overdue_borrowings_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Number of active borrowings past their expected return date",
+            ),
+        ),
+        migrations.RunPython(count_borrowings, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,13 @@
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext as _
 
 
+COUNTER_FIELDS = ("active_borrowings_count", "overdue_borrowings_count")
+
+
 class UserManager(BaseUserManager):
     """Define a model manager for User model with no username field."""
 
@@ -41,12 +45,42 @@ class UserManager(BaseUserManager):
 class Customer(AbstractUser):
     username = None
     email = models.EmailField(_("email address"), unique=True)
+    updated_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        help_text="Time of the last change (used for ETag and Last-Modified)",
+    )
+    # maintained by borrowing.counters, rebuilt by reconcile_borrowing_counters
+    active_borrowings_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of borrowings that are not returned yet",
+    )
+    overdue_borrowings_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of active borrowings past their expected return date",
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
     objects = UserManager()
 
+    def save(self, *args, **kwargs):
+        self.updated_at = timezone.now()
+        if kwargs.get("update_fields") is None and not self._state.adding:
+            # counters only change with F() updates, an instance loaded
+            # earlier (e.g. from user.cache) must not write them back
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COUNTER_FIELDS
+            ]
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "updated_at"}
+        super().save(*args, **kwargs)
+
     @property
     def full_name(self):
         return self.first_name + " " + self.last_name
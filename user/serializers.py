@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 
 class CustomerSerializer(serializers.ModelSerializer):
@@ -34,3 +35,29 @@ class CustomerSerializer(serializers.ModelSerializer):
             user.save()
 
         return user
+
+
+class CustomerDetailSerializer(CustomerSerializer):
+    class Meta(CustomerSerializer.Meta):
+        fields = CustomerSerializer.Meta.fields + (
+            "active_borrowings_count",
+            "overdue_borrowings_count",
+        )
+        read_only_fields = CustomerSerializer.Meta.read_only_fields + (
+            "active_borrowings_count",
+            "overdue_borrowings_count",
+        )
+
+
+class CustomerTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        """
+        Put permission-relevant fields into the token, so requests can be
+        authenticated without loading the user (see TokenUser)
+        """
+        token = super().get_token(user)
+        token["is_staff"] = user.is_staff
+        token["is_superuser"] = user.is_superuser
+
+        return token
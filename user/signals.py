@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.cache import invalidate_customer
+from user.models import Customer
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def drop_cached_customer(sender, instance, **kwargs):
+    invalidate_customer(instance.id)
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+from library.tests.query_budget import QueryBudgetTestMixin
+
+from ..views import CreateCustomerView, ManageCustomerView
+
+
+class UserQueryBudgetTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="pass1234"
+        )
+
+    def test_register(self):
+        self.assertWithinQueryBudget(
+            CreateCustomerView,
+            "post",
+            lambda: self.client.post(
+                reverse("user:register"),
+                {"email": "new@example.com", "password": "pass1234"},
+            ),
+        )
+
+    def test_manage(self):
+        self.client.force_authenticate(self.user)
+        url = reverse("user:manage")
+
+        self.assertWithinQueryBudget(
+            ManageCustomerView, "get", lambda: self.client.get(url)
+        )
+        self.assertWithinQueryBudget(
+            ManageCustomerView,
+            "patch",
+            lambda: self.client.patch(url, {"first_name": "Test"}),
+        )
+
+    def test_token(self):
+        credentials = {"email": "test@example.com", "password": "pass1234"}
+        response = self.client.post(reverse("user:token_obtain_pair"), credentials)
+
+        self.assertWithinQueryBudget(
+            TokenObtainPairView,
+            "post",
+            lambda: self.client.post(reverse("user:token_obtain_pair"), credentials),
+        )
+        self.assertWithinQueryBudget(
+            TokenRefreshView,
+            "post",
+            lambda: self.client.post(
+                reverse("user:token_refresh"), {"refresh": response.data["refresh"]}
+            ),
+        )
@@ -1,11 +1,20 @@
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from book.models import Book
 
 CREATE_URL = reverse("user:register")
 MANAGE_URL = reverse("user:manage")
+TOKEN_URL = reverse("user:token_obtain_pair")
+BORROWING_URL = reverse("borrowing:borrowing-list")
 
 
 class CustomerViewTests(TestCase):
@@ -32,3 +41,188 @@ class CustomerViewTests(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["email"], user.email)
+
+
+class StatelessTokenViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="pass1234", is_staff=True
+        )
+        response = self.client.post(
+            TOKEN_URL, {"email": "test@example.com", "password": "pass1234"}
+        )
+        self.access = response.data["access"]
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access}")
+
+    def test_token_contains_permission_claims(self):
+        token = AccessToken(self.access)
+
+        self.assertEqual(token["user_id"], self.user.id)
+        self.assertTrue(token["is_staff"])
+        self.assertFalse(token["is_superuser"])
+
+    def test_authenticated_request_does_not_load_user(self):
+        # claims of admins are checked against the cached customer
+        self.client.get(BORROWING_URL)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(BORROWING_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user_table = f'FROM "{get_user_model()._meta.db_table}"'
+        self.assertFalse(
+            [query for query in queries.captured_queries if user_table in query["sql"]]
+        )
+
+    def test_manage_user_is_served_from_cache(self):
+        self.client.get(MANAGE_URL)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(MANAGE_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["email"], self.user.email)
+
+    def test_manage_user_sees_own_update(self):
+        self.client.get(MANAGE_URL)
+        self.client.patch(MANAGE_URL, {"first_name": "New name"})
+
+        response = self.client.get(MANAGE_URL)
+
+        self.assertEqual(response.data["first_name"], "New name")
+
+    def test_manage_inactive_user(self):
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(MANAGE_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class RevokedCustomerTokenTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="pass1234"
+        )
+        self.book = Book.objects.create(
+            title="Test title",
+            author="Test author",
+            cover=Book.Cover.HARD,
+            inventory=5,
+            daily_fee=Decimal("1.00"),
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+    def borrow(self):
+        return self.client.post(
+            BORROWING_URL,
+            {
+                "book": self.book.id,
+                "borrow_date": "2023-01-01",
+                "expected_return_date": "2023-01-02",
+            },
+        )
+
+    def test_active_customer_writes(self):
+        self.assertEqual(self.borrow().status_code, status.HTTP_201_CREATED)
+
+    def test_inactive_customer_cannot_write(self):
+        # cached by an earlier write
+        self.borrow()
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.borrow()
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data["detail"].code, "user_inactive")
+        self.assertEqual(self.book.borrowings.count(), 1)
+
+    def test_deleted_customer_cannot_write(self):
+        self.user.delete()
+
+        response = self.borrow()
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data["detail"].code, "user_inactive")
+
+    def test_inactive_customer_reads_until_token_expires(self):
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(BORROWING_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class DemotedAdminTokenTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="pass1234"
+        )
+        response = self.client.post(
+            TOKEN_URL, {"email": "admin@example.com", "password": "pass1234"}
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def demote(self):
+        self.admin.is_staff = False
+        self.admin.is_superuser = False
+        self.admin.save()
+
+    def create_book(self):
+        return self.client.post(
+            reverse("book:book-list"),
+            {
+                "title": "Test title",
+                "author": "Test author",
+                "cover": Book.Cover.HARD,
+                "inventory": 5,
+                "daily_fee": "1.00",
+            },
+        )
+
+    def test_admin_writes(self):
+        self.assertEqual(self.create_book().status_code, status.HTTP_201_CREATED)
+
+    def test_demoted_admin_cannot_write(self):
+        # cached by an earlier write
+        self.create_book()
+        self.demote()
+
+        response = self.create_book()
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data["detail"].code, "user_permissions_changed")
+        self.assertEqual(Book.objects.count(), 1)
+
+    def test_demoted_admin_cannot_export(self):
+        url = reverse("borrowing:borrowing-export")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.demote()
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data["detail"].code, "user_permissions_changed")
+
+    def test_customer_reads_without_query(self):
+        customer = get_user_model().objects.create_user(
+            email="test@example.com", password="pass1234"
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(customer)}"
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse("book:book-list"))
+
+        self.assertFalse(
+            any("user_customer" in query["sql"] for query in context.captured_queries)
+        )
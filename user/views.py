@@ -1,8 +1,11 @@
 from drf_spectacular.utils import extend_schema_view, extend_schema
 from rest_framework import generics
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import IsAuthenticated
 
-from user.serializers import CustomerSerializer
+from library.metrics import SerializerTimingMixin
+from user.cache import get_customer
+from user.serializers import CustomerSerializer, CustomerDetailSerializer
 
 
 @extend_schema_view(
@@ -11,15 +14,16 @@ from user.serializers import CustomerSerializer
         description="Create a new customer with provided details.",
     ),
 )
-class CreateCustomerView(generics.CreateAPIView):
+class CreateCustomerView(SerializerTimingMixin, generics.CreateAPIView):
     serializer_class = CustomerSerializer
+    query_budget = {"post": 2}
 
 
 @extend_schema_view(
     get=extend_schema(
         summary="Retrieve the current user",
-        description="Retrieve credentials of the current authenticated user."
-        "information.",
+        description="Retrieve credentials of the current authenticated user, "
+        "with numbers of active and overdue borrowings.",
     ),
     put=extend_schema(
         summary="Update the current user",
@@ -30,9 +34,15 @@ class CreateCustomerView(generics.CreateAPIView):
         description="Partial update credentials of the current authenticated " "user.",
     ),
 )
-class ManageCustomerView(generics.RetrieveUpdateAPIView):
-    serializer_class = CustomerSerializer
+class ManageCustomerView(SerializerTimingMixin, generics.RetrieveUpdateAPIView):
+    serializer_class = CustomerDetailSerializer
     permission_classes = (IsAuthenticated,)
+    query_budget = {"get": 1, "put": 2, "patch": 2}
 
     def get_object(self):
-        return self.request.user
+        # request.user is built from the token, load the full row
+        customer = get_customer(self.request.user.id)
+        if customer is None:
+            raise AuthenticationFailed("User not found")
+
+        return customer